@@ -0,0 +1,337 @@
+"""
+Benchmark of the research index at growing corpus sizes. For each size it generates a
+synthetic 10-K-like corpus with random embeddings, then builds and loads every index
+configuration. It reports build and load time, on-disk size, resident memory,
+single-query and batched-query latency, and recall@k against exact search:
+
+    PYTHONPATH=src python -m scripts.bench_retrieval --sizes 10000,100000 --output bench.json
+
+Embeddings are drawn, not requested, so no OpenAI calls are made and query latency
+excludes embedding the query. They are clustered and carry most of their energy in the
+leading components, like text-embedding-3 vectors, so truncating them behaves the way it
+does on real filings. Each configuration is built and measured in fresh processes, so
+one configuration's memory does not show up in the next one's RSS. Runs with the same
+options and seed produce the same corpora, so the JSON output can be compared across
+releases.
+"""
+
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from importlib import metadata
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+import click
+import numpy as np
+
+from scripts.fakes import WORDS
+from scripts.loadtest import PERCENTILES, summarize
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+# Name -> (quantization, first-stage dimensions); "faiss" is the LangChain store.
+CONFIGS: dict[str, tuple[str | None, int | None]] = {
+    "faiss": (None, None),
+    "two_stage-none": ("none", None),
+    "two_stage-fp16-512": ("fp16", 512),
+    "two_stage-int8-256": ("int8", 256),
+    "two_stage-int8-128": ("int8", 128),
+}
+ITEMS = ("1", "1A", "2", "3", "7", "7A", "8")
+CHUNK = 50_000
+
+
+def synthetic_documents(size: int, seed: int) -> Iterator[Any]:
+    """10-K-like chunks: ticker, fiscal year and item heading, then filler prose."""
+    from langchain_core.documents import Document
+
+    rng = random.Random(seed)
+    for i in range(size):
+        ticker = f"T{i % 500:03d}"
+        year = 2015 + i % 10
+        item = ITEMS[i % len(ITEMS)]
+        words = " ".join(rng.choice(WORDS) for _ in range(80))
+        yield Document(
+            page_content=f"{ticker} Form 10-K {year}, Item {item}: {words}.",
+            metadata={"company": ticker, "cik": str(i), "date": f"{year}-12-31", "item": item},
+        )
+
+
+def synthetic_vectors(path: Path, size: int, dim: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors whose energy decays over the dimensions, written to `path`."""
+    from financial_analysis.rag.index import normalize
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(10, size // 100), dim), dtype=np.float32)
+    decay = np.linspace(2.0, 0.2, dim, dtype=np.float32)
+    vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(size, dim))
+    for start in range(0, size, CHUNK):
+        count = min(CHUNK, size - start)
+        noise = rng.standard_normal((count, dim), dtype=np.float32)
+        vectors[start : start + count] = normalize(
+            (centers[rng.integers(len(centers), size=count)] + noise) * decay
+        )
+    vectors.flush()
+    return vectors
+
+
+def synthetic_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Queries near random corpus vectors, as a question is near the chunk that answers it."""
+    from financial_analysis.rag.index import normalize
+
+    rng = np.random.default_rng(seed + 1)
+    picks = np.sort(rng.choice(len(vectors), size=count, replace=False))
+    noise = rng.standard_normal((count, vectors.shape[1]), dtype=np.float32) * 0.05
+    return normalize(vectors[picks] + noise)
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground truth: the top `k` positions by exact inner product over the full vectors."""
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK):
+        scores = queries @ np.asarray(vectors[start : start + CHUNK]).T
+        top = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+        best_scores = np.hstack([best_scores, np.take_along_axis(scores, top, axis=1)])
+        best = np.hstack([best, top + start])
+        keep = np.argsort(-best_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        best = np.take_along_axis(best, keep, axis=1)
+    return best
+
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    hits = [len(set(row[row >= 0]) & set(truth)) for row, truth in zip(found, exact, strict=True)]
+    return round(sum(hits) / (k * len(exact)), 4)
+
+
+def rss_bytes() -> int:
+    """Current resident set size, or the peak where /proc is not available."""
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def package_version() -> str:
+    try:
+        return metadata.version("financialanalysis")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def disk_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class UnusedEmbeddings:
+    """Stands in for the embeddings model; the benchmark only searches by vector."""
+
+    def embed_query(self, text: str) -> list[float]:
+        raise RuntimeError("The retrieval benchmark searches by vector only.")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("The retrieval benchmark searches by vector only.")
+
+
+def build(config: str, path: Path, vectors_path: Path, size: int, seed: int) -> float:
+    """Builds one configuration at `path` and returns the seconds it took."""
+    quantization, dim = CONFIGS[config]
+    vectors = np.load(vectors_path, mmap_mode="r")
+    started = time.perf_counter()
+    if quantization is None:
+        # What FAISS.from_texts builds, without holding the vectors as Python lists.
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        flat = faiss.IndexFlatL2(vectors.shape[1])
+        for start in range(0, size, CHUNK):
+            flat.add(np.ascontiguousarray(vectors[start : start + CHUNK]))
+        ids = [str(i) for i in range(size)]
+        docstore = InMemoryDocstore(dict(zip(ids, synthetic_documents(size, seed), strict=True)))
+        store = FAISS(UnusedEmbeddings(), flat, docstore, dict(enumerate(ids)))  # type: ignore[arg-type]
+        store.save_local(str(path))
+    else:
+        from financial_analysis.rag.index import TwoStageIndex
+
+        TwoStageIndex.build(path, vectors, synthetic_documents(size, seed), dim, quantization)
+    return time.perf_counter() - started
+
+
+def latencies(search: Callable[[np.ndarray], Any], queries: np.ndarray, batch: int) -> list[float]:
+    samples = []
+    for start in range(0, len(queries), batch):
+        rows = queries[start : start + batch]
+        started = time.perf_counter()
+        search(rows)
+        samples.append((time.perf_counter() - started) * 1000 / len(rows))
+    return samples
+
+
+def measure(
+    config: str, path: Path, queries_path: Path, exact_path: Path, k: int, batch: int
+) -> dict[str, Any]:
+    """Loads one configuration the way the research agent does and queries it."""
+    from financial_analysis.rag.index import load_index
+
+    queries = np.load(queries_path)
+    exact = np.load(exact_path)
+    before = rss_bytes()
+    started = time.perf_counter()
+    index: Any = load_index(path, UnusedEmbeddings())  # type: ignore[arg-type]
+    load_seconds = time.perf_counter() - started
+    loaded = rss_bytes()
+
+    if CONFIGS[config][0] is None:
+
+        def positions(rows: np.ndarray) -> np.ndarray:
+            return index.index.search(np.ascontiguousarray(rows), k)[1]
+    else:
+
+        def positions(rows: np.ndarray) -> np.ndarray:
+            return index.search_positions(rows, k)[0]
+
+    single = latencies(lambda rows: index.similarity_search_by_vector(rows[0], k=k), queries, 1)
+    batched = latencies(positions, queries, batch)
+    found = np.vstack([positions(queries[s : s + batch]) for s in range(0, len(queries), batch)])
+    return {
+        "load_seconds": round(load_seconds, 4),
+        "rss_loaded_bytes": loaded - before,
+        "rss_after_queries_bytes": rss_bytes() - before,
+        "single_query_ms": summarize(single),
+        "batched_query_ms": summarize(batched),
+        f"recall_at_{k}": recall_at_k(found, exact),
+    }
+
+
+def in_child(fn: Callable[..., Any], *args: Any) -> Any:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def print_results(results: list[dict[str, Any]], k: int) -> None:
+    header = (
+        f"{'size':>9} {'config':<20}{'build s':>9}{'load s':>9}{'disk MB':>10}{'rss MB':>9}"
+        f"{'1q p50 ms':>11}{'batch p50':>11}{f'recall@{k}':>10}"
+    )
+    click.echo(f"\n{header}")
+    for r in results:
+        click.echo(
+            f"{r['size']:>9} {r['config']:<20}{r['build_seconds']:>9.2f}{r['load_seconds']:>9.3f}"
+            f"{r['disk_bytes'] / 2**20:>10.1f}{r['rss_loaded_bytes'] / 2**20:>9.1f}"
+            f"{r['single_query_ms']['p50']:>11.3f}{r['batched_query_ms']['p50']:>11.3f}"
+            f"{r[f'recall_at_{k}']:>10.3f}"
+        )
+
+
+@click.command()
+@click.option("--sizes", default="10000,100000,1000000", help="Comma-separated chunk counts.")
+@click.option(
+    "--configs",
+    default=",".join(CONFIGS),
+    help=f"Comma-separated index configurations, out of {', '.join(CONFIGS)}.",
+)
+@click.option("--full-dim", default=1536, help="Embedding dimensions (text-embedding-3-small).")
+@click.option("--queries", "n_queries", default=200, help="Queries per configuration.")
+@click.option("--batch", default=32, help="Queries per batched search.")
+@click.option("-k", "k", default=10, help="Documents retrieved per query.")
+@click.option("--seed", default=0, help="Seed for the corpora and queries.")
+@click.option("--workdir", type=click.Path(), default=None, help="Keep the indexes here.")
+@click.option("--output", type=click.Path(), default=None, help="Write the results as JSON.")
+def main(
+    sizes: str,
+    configs: str,
+    full_dim: int,
+    n_queries: int,
+    batch: int,
+    k: int,
+    seed: int,
+    workdir: str | None,
+    output: str | None,
+) -> None:
+    """Builds, loads and queries every index configuration at every corpus size."""
+    names = [name.strip() for name in configs.split(",")]
+    unknown = sorted(set(names) - set(CONFIGS))
+    if unknown:
+        raise click.BadParameter(f"Unknown configurations: {', '.join(unknown)}.")
+    root = Path(workdir or tempfile.mkdtemp(prefix="alphasynth-bench-"))
+    results = []
+    try:
+        for size in (int(s) for s in sizes.split(",")):
+            corpus = root / str(size)
+            corpus.mkdir(parents=True, exist_ok=True)
+            logging.info(f"Generating {size} chunks of {full_dim} dimensions in {corpus}")
+            vectors = synthetic_vectors(corpus / "corpus.npy", size, full_dim, seed)
+            queries = synthetic_queries(vectors, min(n_queries, size), seed)
+            np.save(corpus / "queries.npy", queries)
+            np.save(corpus / "exact.npy", exact_neighbors(vectors, queries, k))
+            del vectors
+            for name in names:
+                path = corpus / name
+                shutil.rmtree(path, ignore_errors=True)
+                logging.info(f"{size} chunks: building {name}")
+                build_seconds = in_child(build, name, path, corpus / "corpus.npy", size, seed)
+                logging.info(f"{size} chunks: measuring {name}")
+                measured = in_child(
+                    measure, name, path, corpus / "queries.npy", corpus / "exact.npy", k, batch
+                )
+                quantization, dim = CONFIGS[name]
+                results.append(
+                    {
+                        "size": size,
+                        "config": name,
+                        "quantization": quantization,
+                        "dim": min(dim or full_dim, full_dim),
+                        "build_seconds": round(build_seconds, 3),
+                        "disk_bytes": disk_bytes(path),
+                        **measured,
+                    }
+                )
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_results(results, k)
+    if output:
+        import faiss
+
+        report = {
+            "version": package_version(),
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "machine": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "numpy": np.__version__,
+                "faiss": faiss.__version__,
+            },
+            "options": {
+                "full_dim": full_dim,
+                "queries": n_queries,
+                "batch": batch,
+                "k": k,
+                "seed": seed,
+                "percentiles": list(PERCENTILES),
+            },
+            "results": results,
+        }
+        Path(output).write_text(json.dumps(report, indent=2))
+        logging.info(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
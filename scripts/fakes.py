@@ -0,0 +1,273 @@
+"""
+Local stand-ins for the services the agents call, so the API can be exercised offline:
+an OpenAI-compatible HTTP server for chat completions and embeddings, and in-process
+replacements for `yf.download`, `yf.Ticker(...).info` and the DuckDuckGo search tool.
+Latencies and completion sizes are drawn from seeded distributions.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+WORDS = (
+    *("revenue", "margin", "guidance", "growth", "demand", "supply", "chain", "regulatory"),
+    *("outlook", "valuation", "earnings", "dividend", "buyback", "competition", "pricing"),
+    *("inflation", "rates", "cloud", "hardware", "services", "segment", "quarter"),
+    *("forecast", "risk", "liquidity", "leverage", "momentum"),
+)
+
+SECTIONS = (
+    *("Key Risks", "Business Overview", "Red Flags", "Important Numbers"),
+    *("Executive Summary", "Key Observations", "Investment Thesis", "Risk Summary"),
+    "Suggested Next Steps",
+)
+
+RISK_ASSESSMENT = {
+    "risk_score": 42,
+    "risk_drivers": ["Valuation", "Regulation", "Competition"],
+    "confidence_level": "Medium",
+    "quantitative_flag": "Neutral",
+}
+
+
+@dataclass
+class Latency:
+    """Log-normal latency with the given median (ms); `sigma` controls the tail."""
+
+    median_ms: float
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+
+@dataclass
+class FakeProfile:
+    """The latency and size distributions of every stand-in."""
+
+    chat: Latency = field(default_factory=lambda: Latency(800, 0.5))
+    embeddings: Latency = field(default_factory=lambda: Latency(60, 0.3))
+    completion_tokens: int = 250
+    completion_tokens_sd: float = 80
+    embedding_dim: int = 256
+    download: Latency = field(default_factory=lambda: Latency(250, 0.4))
+    ticker_info: Latency = field(default_factory=lambda: Latency(300, 0.4))
+    search: Latency = field(default_factory=lambda: Latency(700, 0.6))
+    seed: int = 0
+
+
+def hashed_embedding(text: str, dim: int) -> list[float]:
+    """A deterministic bag-of-words embedding, so similar texts get similar vectors."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in text.lower().split():
+        digest = zlib.crc32(token.encode())
+        vector[digest % dim] += 1.0 if digest & 0x80000000 else -1.0
+    norm = float(np.linalg.norm(vector))
+    return (vector / norm if norm else vector).tolist()
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    server: "FakeOpenAI"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.path.endswith("/chat/completions"):
+            response = self.server.chat(body)
+        elif self.path.endswith("/embeddings"):
+            response = self.server.embed(body)
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """
+    Answers `/v1/chat/completions` and `/v1/embeddings` like the OpenAI API. Prompts that
+    ask for the risk JSON schema get a valid risk assessment; other prompts get filler
+    text of a sampled length.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, profile: FakeProfile, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), _OpenAIHandler)
+        self.profile = profile
+        self.requests = 0
+        self._rng = random.Random(profile.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def _draw(self, latency: Latency) -> tuple[float, random.Random]:
+        with self._lock:
+            self.requests += 1
+            delay = latency.sample(self._rng)
+            return delay, random.Random(self._rng.random())
+
+    def chat(self, body: dict[str, Any]) -> dict[str, Any]:
+        delay, rng = self._draw(self.profile.chat)
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        if "risk_score" in prompt:
+            content = json.dumps(RISK_ASSESSMENT)
+        else:
+            mean, sd = self.profile.completion_tokens, self.profile.completion_tokens_sd
+            tokens = max(1, int(rng.gauss(mean, sd)))
+            content = " ".join(rng.choice(WORDS) for _ in range(tokens * 3 // 4)) + "."
+            # Answer in the requested format, so the model cascades accept the answer.
+            headings = [h for h in SECTIONS if h in prompt]
+            if headings:
+                content = "Recommendation: Hold\n" + "".join(
+                    f"## {heading}\n{content}\n" for heading in headings
+                )
+        time.sleep(delay)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def embed(self, body: dict[str, Any]) -> dict[str, Any]:
+        delay, _ = self._draw(self.profile.embeddings)
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        time.sleep(delay)
+        dim = body.get("dimensions") or self.profile.embedding_dim
+        data = [
+            {"object": "embedding", "index": i, "embedding": hashed_embedding(str(text), dim)}
+            for i, text in enumerate(inputs)
+        ]
+        tokens = sum(len(str(text)) // 4 for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True).start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeMarketData:
+    """Replaces `yf.download` and `yf.Ticker` with synthetic, per-ticker deterministic data."""
+
+    def __init__(self, profile: FakeProfile) -> None:
+        self.profile = profile
+        self._rng = random.Random(profile.seed + 1)
+        self._lock = threading.Lock()
+
+    def _sleep(self, latency: Latency) -> None:
+        with self._lock:
+            delay = latency.sample(self._rng)
+        time.sleep(delay)
+
+    def download(self, ticker: str, period: str = "60d", **_: Any) -> pd.DataFrame:
+        self._sleep(self.profile.download)
+        days = int(period.rstrip("d")) if period.endswith("d") else 60
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+        index = pd.bdate_range(end=pd.Timestamp("2024-06-28"), periods=days)
+        return pd.DataFrame(
+            {
+                "Open": close,
+                "High": close * 1.01,
+                "Low": close * 0.99,
+                "Close": close,
+                "Volume": rng.integers(1_000_000, 5_000_000, days),
+            },
+            index=index,
+        )
+
+    def ticker(self, ticker: str) -> Any:
+        market = self
+
+        class _Ticker:
+            @property
+            def info(self) -> dict[str, Any]:
+                market._sleep(market.profile.ticker_info)
+                return {
+                    "sector": "Technology",
+                    "marketCap": 1_000_000_000 + zlib.crc32(ticker.encode()),
+                    "forwardPE": 25.0,
+                }
+
+        return _Ticker()
+
+
+class FakeSearch:
+    """Replaces the DuckDuckGo search tool with a few synthetic headlines per query."""
+
+    def __init__(self, profile: FakeProfile) -> None:
+        self.profile = profile
+        self._rng = random.Random(profile.seed + 2)
+        self._lock = threading.Lock()
+
+    def run(self, query: str, *_: Any, **__: Any) -> str:
+        with self._lock:
+            delay = self.profile.search.sample(self._rng)
+        time.sleep(delay)
+        rng = random.Random(query)
+        return " ".join(
+            f"Headline {i}: {' '.join(rng.choice(WORDS) for _ in range(12)).capitalize()}."
+            for i in range(5)
+        )
+
+
+@contextmanager
+def offline_sources(profile: FakeProfile) -> Iterator[tuple[FakeMarketData, FakeSearch]]:
+    """Routes yfinance and DuckDuckGo calls made in this process to the stand-ins."""
+    market, search = FakeMarketData(profile), FakeSearch(profile)
+    with ExitStack() as stack:
+        stack.enter_context(patch("yfinance.download", market.download))
+        stack.enter_context(patch("yfinance.Ticker", market.ticker))
+        stack.enter_context(
+            patch(
+                "langchain_community.tools.DuckDuckGoSearchRun.run",
+                lambda _tool, query, *a, **kw: search.run(query),
+            )
+        )
+        yield market, search
@@ -0,0 +1,247 @@
+"""
+Offline load test of the `/analyze` API. OpenAI, yfinance and DuckDuckGo are replaced by
+the stand-ins in `scripts/fakes.py`, the research index is a synthetic corpus served by the
+retrieval sidecar, and the app runs under uvicorn on a local port:
+
+    PYTHONPATH=src python -m scripts.loadtest --requests 200 --concurrency 16
+
+It reports throughput, p50/p95/p99 request latency and the per-span and per-stage
+breakdown returned with `X-Debug-Timings`. Runs with the same options and seed are
+comparable, so orchestration changes can be measured on one box.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import click
+import httpx
+import numpy as np
+
+from scripts.fakes import WORDS, FakeOpenAI, FakeProfile, Latency, offline_sources
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+for noisy in ("httpx", "financial_analysis"):
+    logging.getLogger(noisy).setLevel(logging.WARNING)
+
+PERCENTILES = (50, 95, 99)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    values = np.percentile(samples, PERCENTILES)
+    return {
+        "count": len(samples),
+        "mean": round(float(np.mean(samples)), 4),
+        **{f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, values, strict=True)},
+    }
+
+
+def synthetic_corpus(size: int, tickers: list[str], seed: int) -> tuple[list[str], list[dict]]:
+    rng = random.Random(seed)
+    texts, metadatas = [], []
+    for i in range(size):
+        ticker = tickers[i % len(tickers)]
+        words = " ".join(rng.choice(WORDS) for _ in range(120))
+        texts.append(f"{ticker} annual report item {i}: {words}.")
+        metadatas.append({"company": ticker, "cik": str(i), "date": "2024-01-01"})
+    return texts, metadatas
+
+
+def start_retrieval(
+    fake: FakeOpenAI, socket_path: Path, tickers: list[str], corpus_size: int, seed: int
+) -> Any:
+    from langchain_community.vectorstores import FAISS
+    from langchain_openai import OpenAIEmbeddings
+
+    from financial_analysis.rag.sidecar import RetrievalServer
+
+    embeddings = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        base_url=fake.base_url,
+        api_key="sk-fake",
+        check_embedding_ctx_length=False,
+    )
+    texts, metadatas = synthetic_corpus(corpus_size, tickers, seed)
+    vectorstore = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+    server = RetrievalServer(vectorstore, socket_path)
+    server.start()
+    return server
+
+
+def start_app(port: int) -> Any:
+    import uvicorn
+
+    from financial_analysis.api.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def drive(
+    base_url: str, requests: int, concurrency: int, tickers: list[str], deadline_ms: int | None
+) -> tuple[list[dict[str, Any]], float]:
+    client = httpx.Client(
+        base_url=base_url,
+        timeout=300,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+    def one(i: int) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            "query": f"What are the main risks for this company? (load test {i})",
+            "company": tickers[i % len(tickers)],
+            "allow_stale": False,
+        }
+        if deadline_ms is not None:
+            body["deadline_ms"] = deadline_ms
+        started = time.perf_counter()
+        response = client.post("/analyze", json=body, headers={"X-Debug-Timings": "1"})
+        seconds = time.perf_counter() - started
+        data = response.json() if response.status_code == 200 else {}
+        return {
+            "status": response.status_code,
+            "seconds": seconds,
+            "timings": data.get("timings") or {},
+            "missing": sorted(data.get("missing") or {}),
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    return results, time.perf_counter() - started
+
+
+def report(results: list[dict[str, Any]], wall: float) -> dict[str, Any]:
+    ok = [r for r in results if r["status"] == 200]
+    spans: dict[str, list[float]] = {}
+    for r in ok:
+        for name, seconds in r["timings"].items():
+            spans.setdefault(name, []).append(seconds)
+    statuses: dict[str, int] = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    return {
+        "requests": len(results),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "statuses": statuses,
+        "partial": sum(1 for r in ok if r["missing"]),
+        "latency": summarize([r["seconds"] for r in ok]),
+        "spans": {name: summarize(samples) for name, samples in sorted(spans.items())},
+    }
+
+
+def print_report(summary: dict[str, Any]) -> None:
+    click.echo(
+        f"\n{summary['requests']} requests in {summary['wall_seconds']}s "
+        f"({summary['throughput_rps']} req/s), statuses {summary['statuses']}, "
+        f"{summary['partial']} partial"
+    )
+    header = f"{'span':<28}{'count':>7}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES)
+    click.echo(header)
+    rows = [("request", summary["latency"]), *summary["spans"].items()]
+    for name, stats in rows:
+        if stats:
+            values = "".join(f"{stats[f'p{p}']:>10.3f}" for p in PERCENTILES)
+            click.echo(f"{name:<28}{stats['count']:>7}{values}")
+
+
+@click.command()
+@click.option("--requests", "n_requests", default=100, help="Total /analyze requests.")
+@click.option("--concurrency", default=8, help="Requests in flight at once.")
+@click.option("--tickers", default=10, help="Number of distinct synthetic tickers.")
+@click.option("--corpus-size", default=500, help="Documents in the synthetic research index.")
+@click.option("--deadline-ms", type=int, default=None, help="Per-request deadline.")
+@click.option("--chat-latency-ms", default=800.0, help="Median chat completion latency.")
+@click.option("--chat-sigma", default=0.5, help="Log-normal sigma of the chat latency.")
+@click.option("--completion-tokens", default=250, help="Mean completion length in tokens.")
+@click.option("--embedding-latency-ms", default=60.0, help="Median embeddings latency.")
+@click.option("--market-latency-ms", default=250.0, help="Median yfinance call latency.")
+@click.option("--search-latency-ms", default=700.0, help="Median news search latency.")
+@click.option("--seed", default=0, help="Seed for every sampled latency and text.")
+@click.option("--output", type=click.Path(), default=None, help="Write the report as JSON.")
+def main(
+    n_requests: int,
+    concurrency: int,
+    tickers: int,
+    corpus_size: int,
+    deadline_ms: int | None,
+    chat_latency_ms: float,
+    chat_sigma: float,
+    completion_tokens: int,
+    embedding_latency_ms: float,
+    market_latency_ms: float,
+    search_latency_ms: float,
+    seed: int,
+    output: str | None,
+) -> None:
+    """Runs the API against local stand-ins and reports latency percentiles."""
+    profile = FakeProfile(
+        chat=Latency(chat_latency_ms, chat_sigma),
+        embeddings=Latency(embedding_latency_ms, 0.3),
+        completion_tokens=completion_tokens,
+        completion_tokens_sd=completion_tokens / 3,
+        download=Latency(market_latency_ms, 0.4),
+        ticker_info=Latency(market_latency_ms, 0.4),
+        search=Latency(search_latency_ms, 0.6),
+        seed=seed,
+    )
+    symbols = [f"T{i:03d}" for i in range(tickers)]
+    workdir = Path(tempfile.mkdtemp(prefix="alphasynth-loadtest-"))
+    fake = FakeOpenAI(profile)
+    fake.start()
+    os.environ.update(
+        {
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": fake.base_url,
+            "ALPHASYNTH_STATE_DIR": str(workdir / "state"),
+            "ALPHASYNTH_RETRIEVAL_SOCKET": str(workdir / "retrieval.sock"),
+            "ALPHASYNTH_JOB_WORKERS": "0",
+        }
+    )
+    os.environ.pop("ALPHASYNTH_WATCHLIST", None)
+
+    logging.info(f"Building a {corpus_size}-document synthetic index in {workdir}")
+    retrieval = start_retrieval(fake, workdir / "retrieval.sock", symbols, corpus_size, seed)
+    try:
+        with offline_sources(profile):
+            port = free_port()
+            server = start_app(port)
+            logging.info(f"Sending {n_requests} requests at concurrency {concurrency}")
+            results, wall = drive(
+                f"http://127.0.0.1:{port}", n_requests, concurrency, symbols, deadline_ms
+            )
+            server.should_exit = True
+    finally:
+        retrieval.stop()
+        fake.stop()
+
+    summary = report(results, wall)
+    summary["openai_requests"] = fake.requests
+    print_report(summary)
+    if output:
+        Path(output).write_text(json.dumps(summary, indent=2))
+        logging.info(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
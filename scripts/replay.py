@@ -0,0 +1,104 @@
+"""
+Replays recorded `/analyze` traffic against the current build without calling OpenAI,
+yfinance or DuckDuckGo. Record in production with
+
+    ALPHASYNTH_CASSETTE_MODE=record ALPHASYNTH_CASSETTE_PATH=traffic.db uvicorn ...
+
+then replay the recorded requests, serving every external call from the cassette:
+
+    PYTHONPATH=src python -m scripts.replay --cassette traffic.db --latency recorded
+
+Each request is sent again with a fresh report store. The report compares latencies with
+the recorded ones and counts syntheses that differ from the recorded output, e.g. because
+a prompt changed and its LLM call is no longer in the cassette.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import click
+import httpx
+
+from scripts.loadtest import free_port, start_app, summarize
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+for noisy in ("httpx", "financial_analysis"):
+    logging.getLogger(noisy).setLevel(logging.WARNING)
+
+
+@click.command()
+@click.option("--cassette", "cassette_path", required=True, type=click.Path(exists=True))
+@click.option(
+    "--latency",
+    type=click.Choice(["recorded", "zero"]),
+    default="recorded",
+    help="Serve calls after their recorded latency or at once.",
+)
+@click.option("--concurrency", default=4, help="Requests in flight at once.")
+@click.option("--output", type=click.Path(), default=None, help="Write the report as JSON.")
+def main(cassette_path: str, latency: str, concurrency: int, output: str | None) -> None:
+    """Replays the /analyze requests recorded in a cassette and compares the results."""
+    workdir = Path(tempfile.mkdtemp(prefix="alphasynth-replay-"))
+    os.environ.update(
+        {
+            "ALPHASYNTH_CASSETTE_MODE": "replay",
+            "ALPHASYNTH_CASSETTE_PATH": str(Path(cassette_path).resolve()),
+            "ALPHASYNTH_CASSETTE_LATENCY": latency,
+            "ALPHASYNTH_STATE_DIR": str(workdir / "state"),
+            "ALPHASYNTH_JOB_WORKERS": "0",
+        }
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+    os.environ.pop("ALPHASYNTH_WATCHLIST", None)
+
+    from financial_analysis.core.cassette import Cassette
+
+    recorded = Cassette(cassette_path, mode="replay").entries("analyze")
+    if not recorded:
+        raise click.ClickException(f"{cassette_path} has no recorded /analyze requests.")
+
+    port = free_port()
+    server = start_app(port)
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300)
+
+    def one(entry: tuple[dict[str, Any], float]) -> dict[str, Any]:
+        payload, recorded_seconds = entry
+        request = {**payload["request"], "allow_stale": False}
+        response = client.post("/analyze", json=request)
+        data = response.json() if response.status_code == 200 else {}
+        return {
+            "status": response.status_code,
+            "seconds": response.elapsed.total_seconds(),
+            "recorded_seconds": recorded_seconds,
+            "same_output": data.get("synthesis") == payload["synthesis"],
+            "missing": sorted(data.get("missing") or {}),
+            "detail": None if data else response.text[:300],
+        }
+
+    logging.info(f"Replaying {len(recorded)} requests at concurrency {concurrency}")
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, recorded))
+    server.should_exit = True
+
+    ok = [r for r in results if r["status"] == 200]
+    summary = {
+        "requests": len(results),
+        "failed": len(results) - len(ok),
+        "changed_output": sum(1 for r in ok if not r["same_output"]),
+        "partial": sum(1 for r in ok if r["missing"]),
+        "latency": summarize([r["seconds"] for r in ok]),
+        "recorded_latency": summarize([r["recorded_seconds"] for r in ok]),
+        "failures": [r["detail"] for r in results if r["status"] != 200][:10],
+    }
+    click.echo(json.dumps(summary, indent=2))
+    if output:
+        Path(output).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from pathlib import Path
 
 import click
 
+from financial_analysis.rag.embeddings import embedding_spec
 from scripts.vector_store import build_vectorstore
 from scripts.loader import load_research_dataset
 
@@ -22,7 +23,25 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     help="The company to filter the dataset by.",
 )
 @click.option("--sample-size", default=50, help="The number of samples to load.")
-def main(data_path, filter_company, sample_size):
+@click.option(
+    "--dim",
+    type=int,
+    default=None,
+    help="Build a two-stage index whose first stage keeps this many dimensions.",
+)
+@click.option(
+    "--quantization",
+    type=click.Choice(["none", "fp16", "int8"]),
+    default=None,
+    help="Build a two-stage index whose first stage stores vectors at this precision.",
+)
+@click.option(
+    "--embedding-provider",
+    type=click.Choice(["openai", "hashing"]),
+    default=None,
+    help="Embed with this provider instead of ALPHASYNTH_EMBEDDING_PROVIDER.",
+)
+def main(data_path, filter_company, sample_size, dim, quantization, embedding_provider):
     """
     Main function to set up the data and build the vector store.
     """
@@ -48,7 +67,13 @@ def main(data_path, filter_company, sample_size):
                     "DataFrame is empty after loading/filtering. Cannot build vector store."
                 )
             else:
-                build_vectorstore(df, persist_path=str(target_path))
+                build_vectorstore(
+                    df,
+                    persist_path=str(target_path),
+                    dim=dim,
+                    quantization=quantization,
+                    spec=embedding_spec(embedding_provider) if embedding_provider else None,
+                )
                 logging.info(
                     f"Vector store successfully created at '{target_path}'! "
                     f"You can now run the API."
@@ -3,13 +3,41 @@ import os
 import pandas as pd
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 
+from financial_analysis.core.config import get_settings
+from financial_analysis.rag.embeddings import (
+    EmbeddingSpec,
+    embedding_spec,
+    get_embedding_model,
+    write_info,
+)
+from financial_analysis.rag.index import TwoStageIndex
 
-def build_vectorstore(df: pd.DataFrame, persist_path: str = "vectorstore") -> FAISS:
+
+def build_vectorstore(
+    df: pd.DataFrame,
+    persist_path: str = "vectorstore",
+    dim: int | None = None,
+    quantization: str | None = None,
+    oversample: int = 10,
+    spec: EmbeddingSpec | None = None,
+) -> FAISS | TwoStageIndex:
+    """
+    Embeds the 'text' column and saves a FAISS store at `persist_path`. With `dim` or
+    `quantization` ('none', 'fp16' or 'int8'), a two-stage index is built instead: a
+    first stage over vectors truncated to `dim` and quantized, rescoring `oversample`
+    times k candidates against the full vectors kept on disk.
+
+    `spec` defaults to the configured embeddings (`ALPHASYNTH_EMBEDDING_*`) and is
+    recorded with the index.
+    """
     load_dotenv()
+    settings = get_settings()
+    spec = spec or embedding_spec(
+        settings.embedding_provider, settings.embedding_model, settings.embedding_dim
+    )
 
-    if not os.getenv("OPENAI_API_KEY"):
+    if spec.provider == "openai" and not os.getenv("OPENAI_API_KEY"):
         raise OSError("ERROR: OPENAI_API_KEY environment variable is not set.")
 
     if "text" not in df.columns:
@@ -23,21 +51,35 @@ def build_vectorstore(df: pd.DataFrame, persist_path: str = "vectorstore") -> FA
 
     metadatas = df[metadata_cols].fillna("").to_dict(orient="records")
 
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-small", openai_api_key=os.getenv("OPENAI_API_KEY")
-    )
+    embeddings = get_embedding_model(spec)
 
     try:
         test = embeddings.embed_query("hello")
         print(f"Embedding test ok: vector dimension is {len(test)}")
     except Exception as e:
         raise RuntimeError(
-            f"Failed to test OpenAI embeddings. Check API key/model access. Error: {e}"
+            f"Failed to test {spec.provider} embeddings. Check API key/model access. Error: {e}"
+        )
+    spec = EmbeddingSpec(spec.provider, spec.model, len(test))
+
+    if dim is not None or quantization is not None:
+        index = TwoStageIndex.from_texts(
+            persist_path,
+            texts,
+            embeddings,
+            metadatas=metadatas,
+            dim=dim,
+            quantization=quantization or "none",
+            oversample=oversample,
+            info=spec.info(),
         )
+        print(f"Two-stage index saved at: {persist_path} ({index.metadata})")
+        return index
 
     vectorstore = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
 
     vectorstore.save_local(persist_path)
+    write_info(persist_path, spec)
     print("Vectorstore saved at:", persist_path)
 
     return vectorstore
@@ -0,0 +1,149 @@
+import re
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from ..core.fingerprint import fingerprint
+from ..core.tokens import estimate_tokens
+from .market import MarketResult
+
+MAX_FACT_CHARS = 240
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+_HAS_NUMBER = re.compile(r"\d")
+_BULLISH = ("bullish", "positive", "upside", "beat", "growth", "strong", "upgrade", "rally")
+_BEARISH = ("bearish", "negative", "downside", "miss", "decline", "weak", "downgrade", "lawsuit")
+_FLAG_SENTIMENT = {"Price_Above_MA_Bullish": "bullish", "Price_Below_MA_Bearish": "bearish"}
+
+
+class Digest(BaseModel):
+    """
+    A compact, structured stand-in for one gathering agent's prose, built without another
+    LLM call: its key facts, the numbers it rests on, a sentiment label and the ids of the
+    sources behind it. Risk and synthesis read digests instead of the full prose.
+    """
+
+    source: str
+    facts: list[str] = []
+    numbers: dict[str, Any] = {}
+    sentiment: str | None = None
+    source_ids: list[str] = []
+    error: str | None = None
+
+    def header(self) -> str:
+        lines = [f"## {self.source.capitalize()}"]
+        if self.error is not None:
+            lines.append(f"Error: {self.error}")
+        if self.sentiment is not None:
+            lines.append(f"Sentiment: {self.sentiment}")
+        numbers = [f"{name}={value}" for name, value in self.numbers.items() if value is not None]
+        if numbers:
+            lines.append(f"Numbers: {', '.join(numbers)}")
+        if self.source_ids:
+            lines.append(f"Sources: {', '.join(self.source_ids)}")
+        return "\n".join(lines)
+
+
+def _clean(line: str) -> str:
+    text = _BULLET.sub("", line).replace("**", "").replace("__", "").strip()
+    if len(text) > MAX_FACT_CHARS:
+        text = text[:MAX_FACT_CHARS].rsplit(" ", 1)[0] + "..."
+    return text
+
+
+def extract_facts(text: str) -> list[str]:
+    """
+    The bullet points of a markdown answer, or its sentences if it has none. Facts that
+    carry a figure come first, since they are the hardest to recover from a summary.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    bullets = [line for line in lines if _BULLET.match(line)]
+    if bullets:
+        candidates = bullets
+    else:
+        prose = " ".join(line for line in lines if not line.lstrip().startswith("#"))
+        candidates = _SENTENCE.split(prose)
+    facts: list[str] = []
+    for candidate in candidates:
+        fact = _clean(candidate)
+        if fact and not fact.endswith(":") and fact not in facts:
+            facts.append(fact)
+    return sorted(facts, key=lambda fact: not _HAS_NUMBER.search(fact))
+
+
+def label_sentiment(text: str) -> str:
+    """'bullish', 'bearish', 'mixed' or 'neutral', from the wording of an analysis."""
+    lowered = text.lower()
+    bullish = sum(lowered.count(word) for word in _BULLISH)
+    bearish = sum(lowered.count(word) for word in _BEARISH)
+    if bullish and bearish and min(bullish, bearish) * 2 >= max(bullish, bearish):
+        return "mixed"
+    if bullish > bearish:
+        return "bullish"
+    if bearish > bullish:
+        return "bearish"
+    return "neutral"
+
+
+def research_digest(
+    analysis: str, documents: Sequence[Document], error: str | None = None
+) -> Digest:
+    source_ids = []
+    for document in documents:
+        label = "-".join(
+            str(document.metadata[key]) for key in ("company", "date") if key in document.metadata
+        )
+        chunk = document.id or fingerprint(document.page_content)[:8]
+        source_ids.append(f"{label}:{chunk}" if label else chunk)
+    if error is not None:
+        return Digest(source="research", error=error, source_ids=source_ids)
+    return Digest(source="research", facts=extract_facts(analysis), source_ids=source_ids)
+
+
+def market_digest(market: MarketResult) -> Digest:
+    if market.error is not None:
+        return Digest(source="market", error=market.error)
+    numbers = {**market.features(), "sector": market.sector, "market_cap": market.market_cap}
+    sentiment = _FLAG_SENTIMENT.get(market.quantitative_flag, "neutral")
+    facts = extract_facts(market.interpretation) if market.interpretation else []
+    return Digest(
+        source="market",
+        facts=facts,
+        numbers={name: value for name, value in numbers.items() if value != "N/A"},
+        sentiment=sentiment,
+        source_ids=[f"{market.ticker}@{market.as_of}"] if market.as_of else [market.ticker],
+    )
+
+
+def news_digest(analysis: str, snippets: Sequence[str], error: str | None = None) -> Digest:
+    source_ids = [fingerprint(" ".join(snippet.lower().split()))[:8] for snippet in snippets]
+    if error is not None:
+        return Digest(source="news", error=error, source_ids=source_ids)
+    return Digest(
+        source="news",
+        facts=extract_facts(analysis),
+        sentiment=label_sentiment(analysis),
+        source_ids=source_ids,
+    )
+
+
+def render_digests(digests: Sequence[Digest], max_tokens: int) -> list[str]:
+    """
+    Renders each digest within a shared budget of about `max_tokens` tokens. Headers
+    (errors, sentiment, numbers, sources) are always kept; facts are then added one per
+    digest in turn, most important first, while they fit.
+    """
+    sections = [[digest.header()] for digest in digests]
+    used = sum(estimate_tokens(section[0]) for section in sections)
+    for rank in range(max((len(digest.facts) for digest in digests), default=0)):
+        for digest, section in zip(digests, sections, strict=True):
+            if rank >= len(digest.facts):
+                continue
+            line = f"- {digest.facts[rank]}"
+            cost = estimate_tokens(line) + 1
+            if used + cost <= max_tokens:
+                section.append(line)
+                used += cost
+    return ["\n".join(section) for section in sections]
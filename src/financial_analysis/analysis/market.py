@@ -1,105 +1,273 @@
-import os
+import logging
 from typing import Any
 
 import pandas as pd
-import yfinance as yf
-from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
+from pydantic import BaseModel
 
-load_dotenv()
+from ..core.cache import Cache, make_cache
+from ..core.cassette import cassette_call
+from ..core.clients import get_chat_model
+from ..core.deadline import check_deadline, clamp_timeout
+from ..core.llm import invoke_llm
+from ..core.metrics import timed
+from ..core.resilience import upstream
 
+logger = logging.getLogger(__name__)
 
-class MarketAgent:
-    def __init__(self, llm_model: str = "gpt-4o-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OSError("OPENAI_API_KEY environment variable is not set.")
 
-        self.llm = ChatOpenAI(model=llm_model, api_key=SecretStr(api_key))
+class NoMarketData(RuntimeError):
+    """yfinance answered without any price history."""
+
+
+class MarketResult(BaseModel):
+    """
+    Raw indicators and fundamentals for one ticker, carried alongside the text that is
+    handed to downstream agents so they can work from the numbers directly.
+    """
+
+    ticker: str
+    last_price: float | None = None
+    ret_5d: float | None = None
+    ma_20: float | None = None
+    as_of: str | None = None
+    sector: str | None = "N/A"
+    market_cap: int | float | str | None = "N/A"
+    forward_pe: int | float | str | None = "N/A"
+    summary: str = ""
+    interpretation: str | None = None
+    error: str | None = None
+    text: str = ""
+
+    @property
+    def quantitative_flag(self) -> str:
+        """Price vs. 20-day moving average, computed from the raw indicators."""
+        if self.error is not None or self.last_price is None:
+            return "Error"
+        if not self.ma_20:
+            return "Neutral"
+        if self.last_price > self.ma_20:
+            return "Price_Above_MA_Bullish"
+        if self.last_price < self.ma_20:
+            return "Price_Below_MA_Bearish"
+        return "Neutral"
+
+    def features(self) -> dict[str, Any]:
+        """Numeric features derived deterministically from the indicators."""
+        price_vs_ma = None
+        if self.last_price is not None and self.ma_20:
+            price_vs_ma = round(self.last_price / self.ma_20 - 1, 4)
+        return {
+            "last_price": self.last_price,
+            "ret_5d": self.ret_5d,
+            "ma_20": self.ma_20,
+            "price_vs_ma_20": price_vs_ma,
+            "forward_pe": self.forward_pe if isinstance(self.forward_pe, int | float) else None,
+            "as_of": self.as_of,
+            "quantitative_flag": self.quantitative_flag,
+        }
+
+    def render_summary(self) -> str:
+        mc_str = self.market_cap
+        if isinstance(mc_str, int | float):
+            mc_str = f"${mc_str:,.0f}"
+
+        return f"""
+Market Analysis for {self.ticker}:
+- Current Price: ${self.last_price or 0.0:.2f}
+- 5-Day Return: {(self.ret_5d or 0.0) * 100:.2f}%
+- 20-Day Moving Average: ${self.ma_20 or 0.0:.2f}
+- Sector: {self.sector}
+- Market Cap: {mc_str}
+- Forward P/E: {self.forward_pe}
+"""
+
+
+def encode_frame(df: Any) -> dict[str, Any] | None:
+    """Daily bars as JSON for the cassette; anything but a DataFrame is recorded as None."""
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return {
+        "columns": [str(column) for column in df.columns],
+        "index": [str(label) for label in df.index],
+        "data": df.to_numpy().tolist(),
+    }
+
 
-    def load_market(self, ticker: str, period: str = "60d") -> pd.DataFrame:
+def decode_frame(data: dict[str, Any] | None) -> pd.DataFrame:
+    if data is None:
+        return pd.DataFrame()
+    return pd.DataFrame(
+        data["data"], columns=data["columns"], index=pd.to_datetime(pd.Index(data["index"]))
+    )
+
+
+class MarketAgent:
+    def __init__(
+        self,
+        llm_model: str = "gpt-4o-mini",
+        cache_ttl: float = 300.0,
+        fundamentals_ttl: float = 6 * 3600.0,
+    ):
+        """
+        Price history is cached per ticker for `cache_ttl` seconds and fundamentals,
+        which change far less often, for `fundamentals_ttl` seconds.
+        """
+        self.llm = get_chat_model(llm_model)
+        self.bars_cache: Cache[pd.DataFrame] = make_cache("market_bars", cache_ttl)
+        self.fundamentals_cache: Cache[dict[str, Any]] = make_cache(
+            "market_fundamentals", fundamentals_ttl
+        )
+
+    @timed("load_market")
+    def load_market(self, ticker: str, period: str = "60d", refresh: bool = False) -> pd.DataFrame:
         """
         Fetches historical market data for a single ticker and cleans the columns.
         Uses a 60-day period for more robust 20-day MA calculation.
+        Served from the cache unless `refresh` is set; empty results are not cached.
         """
+        import yfinance as yf
 
-        df = yf.download(
-            ticker, period=period, interval="1d", progress=False, multi_level_index=False
-        )
+        def fetch() -> pd.DataFrame:
+            df = upstream("yfinance").call(
+                yf.download,
+                ticker,
+                period=period,
+                interval="1d",
+                progress=False,
+                multi_level_index=False,
+                timeout=clamp_timeout(10.0),
+            )
+            # Checked outside the breaker: an unknown or delisted ticker also comes back
+            # empty, and bad tickers must not cut off market data for every ticker.
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                raise NoMarketData(f"yfinance returned no data for {ticker}.")
+            return df
 
-        if not isinstance(df, pd.DataFrame) or df.empty:
-            return pd.DataFrame()
+        def download() -> pd.DataFrame:
+            try:
+                df = cassette_call(
+                    "yfinance.download",
+                    (ticker, period),
+                    fetch,
+                    encode_frame,
+                    decode_frame,
+                )
+            except NoMarketData:
+                return pd.DataFrame()
+            if df.empty:
+                return df
+            df.columns = ["_".join(col.lower().split(" ")) for col in df.columns]
+            return df
 
-        df.columns = ["_".join(col.lower().split(" ")) for col in df.columns]
-        return df
+        cache_key = f"{ticker.upper()}|{period}"
+        if refresh:
+            df = download()
+            if not df.empty:
+                self.bars_cache.set(cache_key, df)
+        else:
+            df = self.bars_cache.get_or_compute(
+                cache_key, download, cacheable=lambda df: not df.empty
+            )
+        return df.copy()
 
-    def analyze_ticker(self, ticker: str) -> str:
+    @timed("fetch_fundamentals")
+    def fetch_fundamentals(self, ticker: str, refresh: bool = False) -> dict[str, Any]:
+        """
+        Fetches sector, market cap and forward P/E. Falls back to 'N/A' values on errors,
+        which are not cached.
+        """
+        import yfinance as yf
+
+        cached = None if refresh else self.fundamentals_cache.get(ticker.upper())
+        if cached is not None:
+            return dict(cached)
+
+        fundamentals: dict[str, Any] = {"sector": "N/A", "market_cap": "N/A", "forward_pe": "N/A"}
+        try:
+            check_deadline()
+            info = cassette_call(
+                "yfinance.info",
+                ticker,
+                lambda: upstream("yfinance").call(lambda: yf.Ticker(ticker).info),
+            )
+            fundamentals = {
+                "sector": info.get("sector", "N/A"),
+                "market_cap": info.get("marketCap", "N/A"),
+                "forward_pe": info.get("forwardPE", "N/A"),
+            }
+        except Exception as e:
+            logger.warning(f"Could not fetch fundamentals for {ticker}: {e}", exc_info=True)
+            return fundamentals
+
+        self.fundamentals_cache.set(ticker.upper(), fundamentals)
+        return dict(fundamentals)
+
+    def analyze(self, ticker: str, interpret: bool = True) -> MarketResult:
+        """
+        Computes indicators and fundamentals for a ticker and, unless `interpret` is False,
+        asks the LLM for a short quant-style interpretation of them.
+        """
         try:
             df = self.load_market(ticker, period="60d")
         except Exception as e:
-            return f"**CRITICAL ERROR FETCHING MARKET DATA FOR {ticker}: {e}**"
+            error = f"**CRITICAL ERROR FETCHING MARKET DATA FOR {ticker}: {e}**"
+            return MarketResult(ticker=ticker, error=error, text=error)
 
         if df.empty:
-            return f"No market data found for {ticker} (Check ticker name and connectivity). \
+            error = f"No market data found for {ticker} (Check ticker name and connectivity). \
             Data frame was empty."
+            return MarketResult(ticker=ticker, error=error, text=error)
 
         price_col = "close"
 
         if price_col not in df.columns:
-            return (
+            error = (
                 f"Market data fetched for {ticker} but could not find the required '{price_col}' \
             column after cleaning."
             )
+            return MarketResult(ticker=ticker, error=error, text=error)
 
         df["ret_5d"] = df[price_col].pct_change(periods=5).fillna(0)
 
         df["ma_20"] = df[price_col].rolling(window=20).mean()
 
         last: pd.Series = df.tail(1).iloc[0]
+        last_index = df.index[-1]
+        as_of = last_index.strftime("%Y-%m-%d") if hasattr(last_index, "strftime") else None
 
-        indicators: dict[str, float] = {
-            "last_price": last.get(price_col, 0.0),
-            "ret_5d": last.get("ret_5d", 0.0),
-            "ma_20": last.get("ma_20", 0.0) if pd.notna(last.get("ma_20")) else 0.0,
-        }
-
-        fundamentals: dict[str, Any] = {"sector": "N/A", "market_cap": "N/A", "forward_pe": "N/A"}
-        try:
-            ticker_obj = yf.Ticker(ticker)
-            info = ticker_obj.info
-            fundamentals = {
-                "sector": info.get("sector", "N/A"),
-                "market_cap": info.get("marketCap", "N/A"),
-                "forward_pe": info.get("forwardPE", "N/A"),
-            }
-        except Exception as e:
-            print(f"Warning: Could not fetch fundamentals for {ticker}. Error: {e}")
+        fundamentals = self.fetch_fundamentals(ticker)
 
-        mc_str = fundamentals["market_cap"]
-        if isinstance(mc_str, (int, float)):
-            mc_str = f"${mc_str:,.0f}"
+        result = MarketResult(
+            ticker=ticker,
+            last_price=float(last.get(price_col, 0.0)),
+            ret_5d=float(last.get("ret_5d", 0.0)),
+            ma_20=float(last["ma_20"]) if pd.notna(last.get("ma_20")) else 0.0,
+            as_of=as_of,
+            **fundamentals,
+        )
+        result.summary = result.render_summary()
+        result.text = result.summary
 
-        market_summary = f"""
-Market Analysis for {ticker}:
-- Current Price: ${indicators["last_price"]:.2f}
-- 5-Day Return: {indicators["ret_5d"] * 100:.2f}%
-- 20-Day Moving Average: ${indicators["ma_20"]:.2f}
-- Sector: {fundamentals["sector"]}
-- Market Cap: {mc_str}
-- Forward P/E: {fundamentals["forward_pe"]}
-"""
+        if interpret:
+            result.interpretation = self.interpret(result)
+            result.text = result.interpretation
+        return result
 
+    @timed("interpret_market")
+    def interpret(self, result: MarketResult) -> str:
+        """Asks the LLM to interpret an already computed market summary."""
         prompt = f"""
 Given this market and fundamental summary, act as a financial quant.
 Write a concise interpretation (3-4 sentences) and highly actionable trading-research style bullet
 points (2-3):
-\n\n{market_summary}
+\n\n{result.summary}
 """
         try:
-            return str(self.llm.invoke([HumanMessage(content=prompt)]).content)
+            return invoke_llm(self.llm, prompt)
         except Exception as e:
             return (
-                f"LLM analysis failed for market summary. Raw data:\n{market_summary}\nError: {e}"
+                f"LLM analysis failed for market summary. Raw data:\n{result.summary}\nError: {e}"
             )
+
+    def analyze_ticker(self, ticker: str) -> str:
+        return self.analyze(ticker).text
@@ -1,54 +1,194 @@
-import os
-
-from dotenv import load_dotenv
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
-
-load_dotenv()
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from itertools import zip_longest
+
+from ..core.cache import Cache, make_cache
+from ..core.cassette import cassette_call
+from ..core.clients import get_chat_model
+from ..core.deadline import check_deadline, clamp_timeout, deadline_scope
+from ..core.fingerprint import fingerprint
+from ..core.llm import invoke_llm
+from ..core.metrics import timed
+from ..core.resilience import upstream
+from ..core.tokens import truncate_to_budget
+
+NO_RESULT_SENTINEL = "No good DuckDuckGo Search Result was found"
+ANALYSIS_FAILED = "LLM analysis failed for news sentiment."
+QUERY_TEMPLATES = (
+    "latest {company} stock financial news and headlines past 7 days",
+    "{company} quarterly earnings results guidance",
+    "{company} regulatory investigation lawsuit antitrust",
+    "{company} CEO management leadership changes",
+)
+_SNIPPET_BOUNDARY = re.compile(r"\n+|(?<=[.!?])\s+(?=[A-Z0-9\"'])")
+
+
+def split_snippets(search_output: str) -> list[str]:
+    """
+    Splits raw search output into individual snippets and drops duplicates,
+    keeping the first occurrence of each.
+    """
+    snippets: list[str] = []
+    seen: set[str] = set()
+    for part in _SNIPPET_BOUNDARY.split(search_output):
+        snippet = part.strip()
+        if not snippet or snippet == NO_RESULT_SENTINEL:
+            continue
+        normalized = " ".join(snippet.lower().split())
+        if normalized not in seen:
+            seen.add(normalized)
+            snippets.append(snippet)
+    return snippets
+
+
+def merge_snippets(results: list[list[str]]) -> list[str]:
+    """Interleaves per-query snippets so every query is represented, then deduplicates."""
+    interleaved = [s for group in zip_longest(*results) for s in group if s is not None]
+    return split_snippets("\n".join(interleaved))
+
+
+def snippet_fingerprint(snippets: list[str]) -> str:
+    """Fingerprints a set of snippets independently of their order and whitespace."""
+    return fingerprint(sorted({" ".join(s.lower().split()) for s in snippets}))
 
 
 class NewsAgent:
-    def __init__(self, llm_model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        llm_model: str = "gpt-4o-mini",
+        cache_ttl: float = 900.0,
+        analysis_ttl: float = 24 * 3600.0,
+        query_timeout: float = 8.0,
+        token_budget: int = 1500,
+        search_workers: int = 16 * (len(QUERY_TEMPLATES) + 1),
+    ):
         """
         Initializes the NewsAgent with the cost-efficient gpt-4o-mini model.
+
+        Fetched snippets are cached per company for `cache_ttl` seconds, and the LLM
+        analysis is cached per snippet fingerprint for `analysis_ttl` seconds. Searches
+        slower than `query_timeout` seconds are dropped, and the merged snippets are cut
+        to roughly `token_budget` tokens before they reach the LLM. `search_workers`
+        bounds the searches running at once across all concurrent requests.
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OSError("OPENAI_API_KEY environment variable is not set.")
-        self.llm = ChatOpenAI(model=llm_model, api_key=SecretStr(api_key))
-        self.search_tool = DuckDuckGoSearchRun()
+        self.llm = get_chat_model(llm_model)
+        from langchain_community.tools import DuckDuckGoSearchRun
 
-    def fetch_live_news(self, company: str) -> str:
+        self.search_tool = DuckDuckGoSearchRun()
+        self.news_cache: Cache[list[str]] = make_cache("news_search", cache_ttl)
+        self.analysis_cache: Cache[str] = make_cache("news_analysis", analysis_ttl)
+        self.query_timeout = query_timeout
+        self.token_budget = token_budget
+        self.executor = ThreadPoolExecutor(
+            max_workers=search_workers, thread_name_prefix="news-search"
+        )
+
+    def queries_for(self, company: str, ticker: str | None = None) -> list[str]:
+        """Focused search queries for a company: general, earnings, regulatory, management."""
+        queries = [template.format(company=company) for template in QUERY_TEMPLATES]
+        if ticker and ticker.strip().lower() != company.strip().lower():
+            queries.insert(1, f"{ticker} stock news today")
+        return queries
+
+    def search_all(self, queries: list[str]) -> tuple[list[list[str]], list[str]]:
+        """
+        Runs the queries concurrently and waits at most `query_timeout` seconds in total,
+        or less if the request deadline is closer.
+        Returns the snippets of every query that answered in time and the errors of the rest.
+        """
+        timeout = clamp_timeout(self.query_timeout) or 0.0
+        deadline = time.monotonic() + timeout
+        duckduckgo = upstream("duckduckgo")
+
+        def search(query: str) -> str:
+            # The query deadline counts from submission, so a search still queued behind
+            # other requests' searches when it passes is skipped rather than run late.
+            with deadline_scope(deadline):
+                check_deadline()
+                return cassette_call(
+                    "search", query, partial(duckduckgo.call, self.search_tool.run, query)
+                )
+
+        futures = [
+            self.executor.submit(contextvars.copy_context().run, search, query)
+            for query in queries
+        ]
+        done, not_done = wait(futures, timeout=timeout)
+
+        results: list[list[str]] = []
+        errors: list[str] = []
+        for query, future in zip(queries, futures, strict=True):
+            if future in not_done:
+                future.cancel()
+                errors.append(f"'{query}' timed out after {timeout:.1f}s")
+            elif future.exception() is not None:
+                errors.append(str(future.exception()))
+            else:
+                results.append(split_snippets(future.result()))
+        return results, errors
+
+    @timed("fetch_live_news")
+    def fetch_live_news(
+        self, company: str, ticker: str | None = None, refresh: bool = False
+    ) -> str:
         """
         Invokes the DuckDuckGo Search tool to fetch current financial news snippets.
 
-        Searches for the last 7 days to ensure relevance and adds the 'stock' term.
+        Several focused queries run in parallel; their snippets are merged, deduplicated
+        and truncated to the token budget. Results are served from the per-company cache
+        unless `refresh` is set.
         """
-
-        query = f"latest {company} stock financial news and headlines past 7 days"
+        cache_key = f"{company}|{ticker or ''}".strip().lower()
+        cached = None if refresh else self.news_cache.get(cache_key)
+        if cached is not None:
+            return "\n".join(cached)
 
         try:
-            search_output = self.search_tool.run(query)
-
-            if not search_output.strip():
-                return f"No relevant news snippets found for {company} in the past 7 days."
-            return search_output
+            results, errors = self.search_all(self.queries_for(company, ticker))
         except Exception as e:
             return f"Error fetching news with DuckDuckGo: {e}"
 
-    def top_headlines_for(self, company: str) -> str | list[str | dict]:
+        if not results:
+            return f"Error fetching news with DuckDuckGo: {'; '.join(errors)}"
+
+        snippets = truncate_to_budget(merge_snippets(results), self.token_budget)
+        if not snippets:
+            return f"No relevant news snippets found for {company} in the past 7 days."
+        self.news_cache.set(cache_key, snippets)
+        return "\n".join(snippets)
+
+    def top_headlines_for(self, company: str, ticker: str | None = None) -> str:
         """
         Fetches live news and asks the LLM to analyze the sentiment and impact.
         """
-        search_data = self.fetch_live_news(company)
+        search_data = self.fetch_live_news(company, ticker)
 
         if search_data.startswith("Error fetching news") or search_data.startswith(
             "No relevant news snippets"
         ):
             return search_data
 
+        return self.analyze_news(company, search_data)
+
+    @timed("analyze_news")
+    def analyze_news(self, company: str, search_data: str) -> str:
+        """
+        Asks the LLM to analyze already fetched snippets. The analysis is cached per
+        snippet fingerprint, so it only re-runs when the snippets change.
+        """
+        analysis_key = (
+            f"{company.strip().lower()}:{snippet_fingerprint(split_snippets(search_data))}"
+        )
+        return self.analysis_cache.get_or_compute(
+            analysis_key,
+            lambda: self._analyze(company, search_data),
+            cacheable=lambda analysis: not analysis.startswith(ANALYSIS_FAILED),
+        )
+
+    def _analyze(self, company: str, search_data: str) -> str:
         prompt = f"""
             You are a highly professional financial sentiment analyst.
             Here is the raw, current web search output containing recent news items and
@@ -71,6 +211,6 @@ class NewsAgent:
         """
 
         try:
-            return str(self.llm.invoke([HumanMessage(content=prompt)]).content)
+            return invoke_llm(self.llm, prompt)
         except Exception as e:
-            return f"LLM analysis failed for news sentiment. Raw data:\n{search_data}\nError: {e}"
+            return f"{ANALYSIS_FAILED} Raw data:\n{search_data}\nError: {e}"
@@ -1,37 +1,90 @@
-import os
+from collections.abc import Sequence
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pydantic import SecretStr
+
+from ..core.cache import Cache, make_cache
+from ..core.cascade import ModelCascade, missing_sections
+from ..core.cassette import CassetteEmbeddings
+from ..core.clients import get_chat_model
+from ..core.fingerprint import fingerprint
+from ..core.llm import invoke_llm
+from ..core.metrics import timed
+from ..rag.embeddings import EmbeddingMismatch, embedding_spec, get_embedding_model
+from ..rag.sidecar import RetrievalClient
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+    from ..rag.index import TwoStageIndex
+
+
+ANALYSIS_SECTIONS = (
+    "Key Risks",
+    "Business Overview",
+    "Red Flags",
+    "Important Numbers",
+)
+
+
+def chunk_id(document: Document) -> str:
+    """Stable identifier of a retrieved chunk: its docstore id, or a hash of its content."""
+    return document.id or fingerprint(document.page_content, document.metadata)
 
 
 class ResearchAgent:
-    def __init__(self, index_path: str = "vectorstore") -> None:
+    def __init__(
+        self,
+        index_path: str = "vectorstore",
+        cache_ttl: float = 3600.0,
+        retrieval_socket: str | None = None,
+        retrieval_timeout: float = 10.0,
+        analyst_models: Sequence[str] = ("gpt-4o",),
+        max_fast_prompt_tokens: int | None = None,
+        embedding_provider: str = "openai",
+        embedding_model: str | None = None,
+        embedding_dim: int | None = None,
+    ) -> None:
+        """
+        With `retrieval_socket`, searches go to the retrieval sidecar listening there
+        instead of an index loaded into this process. `analyst_models` is the model
+        cascade for the final analysis, cheapest first; an analysis missing one of the
+        requested sections is asked of the next model. The index must have been built
+        with the `embedding_*` provider, model and dimensions.
+        """
         package_root = Path(__file__).resolve().parent.parent
         final_index_path = package_root / "rag" / index_path
         final_index_path_str = str(final_index_path)
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OSError("OPENAI_API_KEY environment variable is not set.")
-        secret_api_key = SecretStr(api_key)
+        self.analyst = ModelCascade("research", analyst_models, max_fast_prompt_tokens)
+        self.llm_summarizer = get_chat_model("gpt-3.5-turbo")
+        self.embedding_spec = embedding_spec(embedding_provider, embedding_model, embedding_dim)
+        self.embeddings = get_embedding_model(self.embedding_spec)
+        self.retrieval_cache: Cache[list[Document]] = make_cache("retrieval", cache_ttl)
 
-        self.llm_analyst = ChatOpenAI(model="gpt-4o", api_key=secret_api_key)
-        self.llm_summarizer = ChatOpenAI(model="gpt-3.5-turbo", api_key=secret_api_key)
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small", openai_api_key=secret_api_key
-        )
+        self.vectorstore: FAISS | TwoStageIndex | RetrievalClient
+        if retrieval_socket:
+            self.vectorstore = RetrievalClient(retrieval_socket, timeout=retrieval_timeout)
+        else:
+            self.vectorstore = self._load_index(final_index_path_str)
+
+    @property
+    def llm_analyst(self) -> Any:
+        """The strongest model of the analysis cascade."""
+        return self.analyst.strongest
+
+    def _load_index(self, final_index_path_str: str) -> "FAISS | TwoStageIndex":
+        from ..rag.index import load_index
 
         try:
-            self.vectorstore = FAISS.load_local(
+            return load_index(
                 final_index_path_str,
-                embeddings=self.embeddings,
-                allow_dangerous_deserialization=True,
+                CassetteEmbeddings(self.embeddings, self.embedding_spec.model),
+                self.embedding_spec,
             )
+        except EmbeddingMismatch:
+            raise
         except Exception as e:
             print(
                 f"Failed to load FAISS vector store from {final_index_path_str}. \
@@ -47,16 +100,23 @@ class ResearchAgent:
             )
             raise FileNotFoundError(f"FAISS index not found or corrupt at {final_index_path_str}")
 
+    @timed("retrieve_documents")
     def retrieve_documents(self, query: str, k: int) -> list[Document]:
-        """Retrieve top-k most relevant 10-K chunks."""
-        return self.vectorstore.similarity_search(query, k=k)
+        """Retrieve top-k most relevant 10-K chunks, reusing cached results for repeat queries."""
+        documents = self.retrieval_cache.get_or_compute(
+            f"{k}|{query}", lambda: self.vectorstore.similarity_search(query, k=k)
+        )
+        return list(documents)
 
+    @timed("summarize_chunk")
     def summarize_chunk(self, chunk_text: str) -> str:
         """
         Summarize a long 10-K chunk by splitting it into smaller sub-chunks
         and summarizing them individually for better context fitting.
         """
 
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=2000, chunk_overlap=100, separators=["\n\n", "\n", " ", ""]
         )
@@ -69,7 +129,7 @@ class ResearchAgent:
             prompt = f"Summarize the key points of this 10-K section (Part {i + 1} \
             of {len(sub_chunks)}) concisely for a financial analyst:\n\n{sub}"
             try:
-                summary = str(self.llm_summarizer.invoke([HumanMessage(content=prompt)]).content)
+                summary = invoke_llm(self.llm_summarizer, prompt)
                 summaries.append(summary)
             except Exception as e:
                 print(f"Warning: Summarization failed for a sub-chunk. Error: {e}")
@@ -80,7 +140,11 @@ class ResearchAgent:
     def analyze(self, query: str, k: int = 4) -> str:
         """Run retrieval + LLM reasoning with summarization."""
         results = self.retrieve_documents(query, k=k)
+        return self.analyze_documents(query, results)
 
+    @timed("analyze_documents")
+    def analyze_documents(self, query: str, results: list[Document]) -> str:
+        """Summarize already retrieved chunks and answer the query from them."""
         summarized_texts: list[str] = []
         for r in results:
             company = r.metadata.get("company", "UNKNOWN")
@@ -107,6 +171,8 @@ Provide:
 * **Important Numbers or Trends**: (Reference quantifiable data or strategic trends)
 """
         try:
-            return str(self.llm_analyst.invoke([HumanMessage(content=prompt)]).content)
+            return self.analyst.invoke(
+                prompt, lambda analysis: missing_sections(analysis, ANALYSIS_SECTIONS)
+            )
         except Exception as e:
             return f"Final analysis failed: {e}. Raw data summarized:\n\n{doc_text}"
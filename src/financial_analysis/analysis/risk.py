@@ -1,14 +1,17 @@
 import json
-import os
+import logging
 import re
+from collections.abc import Sequence
 from typing import Annotated, Any
 
-from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from pydantic import BaseModel, Field, SecretStr
+from pydantic import BaseModel, Field
 
-load_dotenv()
+from ..core.cascade import ModelCascade
+from ..core.llm import invoke_llm, json_schema_format
+from ..core.metrics import RISK_ASSESSMENTS, timed
+from .market import MarketResult
+
+logger = logging.getLogger(__name__)
 
 
 class RiskAssessment(BaseModel):
@@ -47,22 +50,97 @@ class RiskAssessment(BaseModel):
     ]
 
 
+CONFIDENCE_LEVELS = ("Low", "Medium", "High")
+RISK_FORMAT = json_schema_format(RiskAssessment)
+MAX_REPAIR_CHARS = 4000
+
+
+def parse_assessment(response_text: str) -> RiskAssessment:
+    """Validates the JSON object in an LLM response, ignoring any text around it."""
+    json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
+    if not json_match:
+        raise ValueError(
+            f"LLM response did not contain a valid JSON object. Raw response: {response_text}"
+        )
+    return RiskAssessment(**json.loads(json_match.group(0)))
+
+
 class RiskAgent:
-    def __init__(self, llm_model: str = "gpt-4o-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OSError("OPENAI_API_KEY environment variable is not set.")
+    def __init__(
+        self,
+        models: Sequence[str] = ("gpt-4o-mini",),
+        max_fast_prompt_tokens: int | None = None,
+        min_confidence: str = "Low",
+    ):
+        """
+        `models` is the model cascade, cheapest first. An assessment that does not parse,
+        or whose confidence is below `min_confidence`, is asked of the next model.
+        """
+        if min_confidence not in CONFIDENCE_LEVELS:
+            raise ValueError(f"min_confidence must be one of {', '.join(CONFIDENCE_LEVELS)}.")
+        self.cascade = ModelCascade("risk", models, max_fast_prompt_tokens)
+        self.min_confidence = min_confidence
+
+    @property
+    def llm(self) -> Any:
+        """The strongest model of the cascade."""
+        return self.cascade.strongest
+
+    @llm.setter
+    def llm(self, llm: Any) -> None:
+        self.cascade.strongest = llm
+
+    def repair(self, response_text: str, error: Exception) -> RiskAssessment:
+        """Asks the cheapest model, once, to fix an assessment that failed validation."""
+        prompt = f"""
+            This risk assessment JSON failed validation:
+            {response_text[:MAX_REPAIR_CHARS]}
 
-        self.llm = ChatOpenAI(model=llm_model, api_key=SecretStr(api_key))
+            Validation error:
+            {str(error)[:MAX_REPAIR_CHARS]}
 
+            Return the corrected JSON object, changing only what the error requires.
+            """
+        return parse_assessment(invoke_llm(self.cascade.llms[0], prompt, RISK_FORMAT))
+
+    def check_assessment(self, response_text: str) -> str | None:
+        try:
+            assessment = parse_assessment(response_text)
+        except Exception as e:
+            return f"invalid assessment: {e}"
+        confidence = CONFIDENCE_LEVELS.index(assessment.confidence_level)
+        if confidence < CONFIDENCE_LEVELS.index(self.min_confidence):
+            return f"{assessment.confidence_level.lower()} confidence"
+        return None
+
+    @timed("compute_risk")
     def compute_risk(
-        self, research_summary: str, market_summary: str, news_summary: str
+        self,
+        research_summary: str,
+        market_summary: str,
+        news_summary: str,
+        market: MarketResult | None = None,
     ) -> dict[str, Any]:
         """
         Computes a structured risk assessment based on combined inputs.
         Returns a dictionary based on the RiskAssessment Pydantic model.
+
+        The model answers in JSON bound to the `RiskAssessment` schema. An answer that still
+        fails validation gets one repair attempt; if that fails too, the result carries no
+        score, only the error.
+
+        When the raw `market` result is given, the quantitative flag and the numeric market
+        features are computed in code instead of being read back from the market prose.
         """
-        schema_json = json.dumps(RiskAssessment.model_json_schema(), indent=2)
+        if market is not None:
+            features = json.dumps(market.features())
+            market_summary = f"{market_summary}\n\nComputed Indicators: {features}"
+            flag_task = f"""**Quantitative Flag**: Already computed from the raw indicators.
+                Use exactly '{market.quantitative_flag}'."""
+        else:
+            flag_task = """**Quantitative Flag**: Extract a simple flag from the Market Analysis.
+                Look for price vs. 20-Day Moving Average: 'Price_Below_MA_Bearish',
+                'Price_Above_MA_Bullish', or 'Neutral'."""
         prompt = f"""
             You are an Investment Risk Evaluator AI. Your task is to synthesize the provided
             Research, Market, and News summaries to produce a structured, machine-readable
@@ -88,42 +166,40 @@ class RiskAgent:
             2.  **Risk Drivers**: List the top 5 most critical, distinct risk factors.
             3.  **Confidence Level**: State your confidence in the assessment:
                 'High', 'Medium', or 'Low'.
-            4.  **Quantitative Flag**: Extract a simple flag from the Market Analysis.
-                Look for price vs. 20-Day Moving Average: 'Price_Below_MA_Bearish',
-                'Price_Above_MA_Bullish', or 'Neutral'.
+            4.  {flag_task}
 
-            Format your entire response STRICTLY as a single JSON object matching
-            the following schema:
-            {schema_json}
+            Answer with the JSON object only: risk_score, risk_drivers, confidence_level
+            and quantitative_flag.
             """
         try:
-            response_text = str(self.llm.invoke([HumanMessage(content=prompt)]).content)
-
-            json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
-            if json_match:
-                json_string = json_match.group(0)
-                risk_data = json.loads(json_string)
-
-                validated_risk = RiskAssessment(**risk_data)
-                return validated_risk.model_dump()
-            raise ValueError(
-                f"LLM response did not contain a valid JSON object. Raw response: {response_text}"
-            )
-
+            response_text = self.cascade.invoke(prompt, self.check_assessment, RISK_FORMAT)
         except Exception as e:
-            error_message = f"Error in Risk Agent LLM or parsing: {e}"
-            print(f"CRITICAL ERROR: {error_message}")
-
-            return {
-                "risk_score": 75,
-                "risk_drivers": [
-                    "Risk calculation failed due to error.",
-                    "Manual review required.",
-                    "High LLM error risk.",
-                    "Data integrity concern.",
-                    "Returning default risk.",
-                ],
-                "confidence_level": "Low",
-                "quantitative_flag": "Error",
-                "error": error_message,
-            }
+            RISK_ASSESSMENTS.inc("error")
+            return self.failed(f"Error in Risk Agent LLM call: {e}", market)
+        try:
+            validated_risk = parse_assessment(response_text)
+            RISK_ASSESSMENTS.inc("parsed")
+        except ValueError as parse_error:
+            try:
+                validated_risk = self.repair(response_text, parse_error)
+                RISK_ASSESSMENTS.inc("repaired")
+            except Exception as e:
+                RISK_ASSESSMENTS.inc("invalid")
+                return self.failed(f"Error parsing Risk Agent output: {e}", market)
+
+        if market is not None:
+            validated_risk.quantitative_flag = market.quantitative_flag
+            return {**validated_risk.model_dump(), "market_features": market.features()}
+        return validated_risk.model_dump()
+
+    @staticmethod
+    def failed(error_message: str, market: MarketResult | None) -> dict[str, Any]:
+        """A result without an assessment, so that no made-up score reaches the report."""
+        logger.error(f"Risk assessment failed: {error_message}")
+        return {
+            "risk_score": None,
+            "risk_drivers": [],
+            "confidence_level": "Low",
+            "quantitative_flag": market.quantitative_flag if market is not None else "Error",
+            "error": error_message,
+        }
@@ -1,21 +1,50 @@
-import os
+import re
+from collections.abc import Sequence
+from typing import Any
 
-from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
+from ..core.cascade import ModelCascade, missing_sections
+from ..core.metrics import timed
 
-load_dotenv()
+REQUIRED_SECTIONS = (
+    "Executive Summary",
+    "Key Observations",
+    "Investment Thesis",
+    "Risk Summary",
+    "Suggested Next Steps",
+)
+_RECOMMENDATION = re.compile(r"Recommendation:?\s*\**\s*(Buy|Hold|Sell)\b", re.IGNORECASE)
+
+
+def check_note(note: str) -> str | None:
+    """Why an analyst note does not follow the requested format, if it does not."""
+    if not _RECOMMENDATION.search(note):
+        return "no recommendation"
+    return missing_sections(note, REQUIRED_SECTIONS)
 
 
 class SynthAgent:
-    def __init__(self, llm_model: str = "gpt-4o-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OSError("OPENAI_API_KEY is not set")
-        self.llm = ChatOpenAI(model=llm_model, api_key=SecretStr(api_key))
+    def __init__(
+        self, models: Sequence[str] = ("gpt-4o-mini",), max_fast_prompt_tokens: int | None = None
+    ):
+        """
+        `models` is the model cascade, cheapest first. A note without a recommendation or
+        one of the required sections is asked of the next model.
+        """
+        self.cascade = ModelCascade("synth", models, max_fast_prompt_tokens)
+
+    @property
+    def llm(self) -> Any:
+        """The strongest model of the cascade."""
+        return self.cascade.strongest
+
+    @llm.setter
+    def llm(self, llm: Any) -> None:
+        self.cascade.strongest = llm
 
-    def synthesize(self, query: str, research: str, market: str, news: str, risk: str) -> str:
+    @timed("synthesize")
+    def synthesize(
+        self, query: str, research: str, market: str, news: str, risk: str | dict[str, Any]
+    ) -> str:
         prompt = f"""
 You are a senior investment analyst for a major fund. Your task is to produce a definitive,
 actionable analyst note that fully addresses the query: **'{query}'**.
@@ -53,7 +82,7 @@ appropriate headings and bullet points.
 - The tone should be professional, data-driven, and concise.
 """
         try:
-            return str(self.llm.invoke([HumanMessage(content=prompt)]).content)
+            return self.cascade.invoke(prompt, check_note)
         except Exception as e:
             return f"Synthesis LLM failed. Inputs were:\nResearch: {research}\nMarket: \
                 {market}\nNews: {news}\nRisk: {risk}\nError: {e}"
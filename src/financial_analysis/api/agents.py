@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import TYPE_CHECKING
+
+from ..core.config import Settings
+from ..core.lazy import Lazy
+
+if TYPE_CHECKING:
+    from ..analysis.market import MarketAgent
+    from ..analysis.news import NewsAgent
+    from ..analysis.research import ResearchAgent
+    from ..analysis.risk import RiskAgent
+    from ..analysis.synthesizer import SynthAgent
+
+
+class AgentRegistry:
+    """
+    Builds each agent on first use. Agent modules are imported by their factories, so
+    the app starts without loading the FAISS index or the agents' heavy dependencies, and
+    an agent that cannot be built (e.g. a missing index) only fails the work that needs it.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.research: Lazy[ResearchAgent] = Lazy(self._build_research, "research")
+        self.market: Lazy[MarketAgent] = Lazy(self._build_market, "market")
+        self.news: Lazy[NewsAgent] = Lazy(self._build_news, "news")
+        self.risk: Lazy[RiskAgent] = Lazy(self._build_risk, "risk")
+        self.synth: Lazy[SynthAgent] = Lazy(self._build_synth, "synth")
+
+    def _cascade(self, agent: str, default: str) -> list[str]:
+        return self.settings.llm_cascades.get(agent) or [default]
+
+    def _build_research(self) -> "ResearchAgent":
+        from ..analysis.research import ResearchAgent
+
+        return ResearchAgent(
+            cache_ttl=self.settings.research_cache_ttl,
+            retrieval_socket=self.settings.retrieval_socket,
+            retrieval_timeout=self.settings.retrieval_timeout,
+            embedding_provider=self.settings.embedding_provider,
+            embedding_model=self.settings.embedding_model,
+            embedding_dim=self.settings.embedding_dim,
+            analyst_models=self._cascade("research", "gpt-4o"),
+            max_fast_prompt_tokens=self.settings.llm_cascade_max_prompt_tokens.get("research"),
+        )
+
+    def _build_market(self) -> "MarketAgent":
+        from ..analysis.market import MarketAgent
+
+        return MarketAgent(
+            cache_ttl=self.settings.market_cache_ttl,
+            fundamentals_ttl=self.settings.fundamentals_cache_ttl,
+        )
+
+    def _build_news(self) -> "NewsAgent":
+        from ..analysis.news import QUERY_TEMPLATES, NewsAgent
+
+        return NewsAgent(
+            cache_ttl=self.settings.news_cache_ttl,
+            analysis_ttl=self.settings.news_analysis_ttl,
+            query_timeout=self.settings.news_query_timeout,
+            token_budget=self.settings.news_token_budget,
+            # Every pipeline worker may search with all queries, plus the ticker query.
+            search_workers=self.settings.pipeline_workers * (len(QUERY_TEMPLATES) + 1),
+        )
+
+    def _build_risk(self) -> "RiskAgent":
+        from ..analysis.risk import RiskAgent
+
+        return RiskAgent(
+            models=self._cascade("risk", "gpt-4o-mini"),
+            max_fast_prompt_tokens=self.settings.llm_cascade_max_prompt_tokens.get("risk"),
+            min_confidence=self.settings.risk_min_confidence,
+        )
+
+    def _build_synth(self) -> "SynthAgent":
+        from ..analysis.synthesizer import SynthAgent
+
+        return SynthAgent(
+            models=self._cascade("synth", "gpt-4o-mini"),
+            max_fast_prompt_tokens=self.settings.llm_cascade_max_prompt_tokens.get("synth"),
+        )
+
+    @property
+    def all(self) -> list[Lazy]:
+        return [self.research, self.market, self.news, self.risk, self.synth]
+
+    def status(self) -> dict[str, str]:
+        return {agent.name: agent.status() for agent in self.all}
+
+    @property
+    def failed(self) -> list[str]:
+        """Agents whose last build failed."""
+        return [agent.name for agent in self.all if agent.error is not None and not agent.loaded]
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the process can serve requests. Agents not built yet are built on first
+        use, so only a failed build of one of the `required_agents` makes it unready.
+        """
+        required = set(self.settings.required_agents)
+        return not any(name in required for name in self.failed)
+
+    def warmup(self) -> dict[str, str]:
+        """Builds every agent not built yet, concurrently, and returns their status."""
+
+        def build(agent: Lazy) -> None:
+            # A failure is recorded in the agent's status.
+            with suppress(Exception):
+                agent.get()
+
+        with ThreadPoolExecutor(max_workers=len(self.all), thread_name_prefix="warmup") as pool:
+            list(pool.map(build, self.all))
+        return self.status()
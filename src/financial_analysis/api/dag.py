@@ -0,0 +1,225 @@
+import contextvars
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+
+from ..core.deadline import DeadlineExceeded, check_deadline, deadline_scope
+from ..core.profiling import profile_span
+
+
+@dataclass(frozen=True)
+class Node:
+    """
+    One step of a DAG. `fn` is called with keyword arguments named after its `inputs`,
+    which are either outputs of other nodes or inputs given to `DagExecutor.run`.
+
+    With `allow_missing`, the node still runs when an upstream node failed and receives
+    None for that input. Under a run deadline, the node must finish within the first
+    `deadline_share` of the time budget, which leaves the rest to later nodes.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    timeout: float | None = None
+    allow_missing: bool = False
+    deadline_share: float = 1.0
+
+
+@dataclass
+class DagRun:
+    outputs: dict[str, Any] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class DagError(ValueError):
+    pass
+
+
+class _Attempt:
+    """A submitted node: when it started running, or that the DAG gave up on it first."""
+
+    def __init__(self, node: Node, submitted: float, share_deadline: float | None) -> None:
+        self.node = node
+        self.submitted = submitted
+        self.share_deadline = share_deadline
+        self.started: float | None = None
+        self.deadline: float | None = share_deadline
+        self.abandoned = False
+        self._lock = threading.Lock()
+
+    def start(self, timeout: float | None) -> bool:
+        """Starts the node's budget now, unless it was abandoned while queued."""
+        with self._lock:
+            if self.abandoned:
+                return False
+            self.started = time.monotonic()
+            if timeout is not None:
+                limits = [self.started + timeout, self.share_deadline]
+                self.deadline = min(at for at in limits if at is not None)
+            return True
+
+    def abandon(self) -> None:
+        with self._lock:
+            self.abandoned = True
+
+    def limits(self, timeout: float | None) -> tuple[float | None, float | None]:
+        """
+        When to give up on the node and when to look at it again. A queued node can only
+        miss its share of the run deadline; its own timeout is at least `timeout` away.
+        """
+        with self._lock:
+            if self.started is not None:
+                return self.deadline, self.deadline
+            wake = self.share_deadline
+            if timeout is not None:
+                queued = self.submitted + timeout
+                wake = queued if wake is None else min(wake, queued)
+            return self.share_deadline, wake
+
+
+class DagExecutor:
+    """
+    Runs every node as soon as all of its inputs are available, so independent nodes run
+    concurrently. Nodes exceeding their timeout or the run deadline are abandoned and
+    recorded as failed, and nodes depending on a failed node are skipped unless they accept
+    missing inputs. Each node runs under its own deadline, so the agent calls it makes are
+    bounded by it too. A node's timeout starts when a worker picks it up, not while it is
+    queued, and a node abandoned while queued never runs, so it frees its worker at once.
+    """
+
+    def __init__(
+        self,
+        nodes: list[Node],
+        external_inputs: tuple[str, ...] = (),
+        max_workers: int = 8,
+        default_timeout: float | None = None,
+    ) -> None:
+        self.nodes = {node.name: node for node in nodes}
+        if len(self.nodes) != len(nodes):
+            raise DagError("Node names must be unique.")
+        self.external_inputs = external_inputs
+        self.default_timeout = default_timeout
+        self._validate()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag")
+
+    def _validate(self) -> None:
+        known = set(self.nodes) | set(self.external_inputs)
+        for node in self.nodes.values():
+            unknown = set(node.inputs) - known
+            if unknown:
+                raise DagError(f"Node '{node.name}' depends on unknown inputs {sorted(unknown)}.")
+
+        resolved = set(self.external_inputs)
+        remaining = dict(self.nodes)
+        while remaining:
+            ready = [n for n in remaining.values() if set(n.inputs) <= resolved]
+            if not ready:
+                raise DagError(f"Cycle detected among nodes {sorted(remaining)}.")
+            for node in ready:
+                resolved.add(node.name)
+                del remaining[node.name]
+
+    def _timeout(self, node: Node) -> float | None:
+        return node.timeout if node.timeout is not None else self.default_timeout
+
+    def _limits(self, attempt: _Attempt) -> tuple[float | None, float | None]:
+        return attempt.limits(self._timeout(attempt.node))
+
+    @staticmethod
+    def _share_deadline(node: Node, run_started: float, deadline: float | None) -> float | None:
+        if deadline is None:
+            return None
+        return run_started + node.deadline_share * (deadline - run_started)
+
+    def _call(self, attempt: _Attempt, fn: Callable[[], Any]) -> Any:
+        if not attempt.start(self._timeout(attempt.node)):
+            raise DeadlineExceeded(f"{attempt.node.name} was abandoned before it started.")
+        with deadline_scope(attempt.deadline), profile_span(f"stage.{attempt.node.name}"):
+            check_deadline()
+            return fn()
+
+    def run(
+        self,
+        inputs: dict[str, Any] | None = None,
+        deadline: float | None = None,
+        on_complete: Callable[[str, Any], None] | None = None,
+    ) -> DagRun:
+        """
+        Runs the DAG. `deadline` is an optional `time.monotonic()` timestamp by which
+        the whole run must finish. `on_complete` is called with each node's name and
+        output as soon as the node succeeds.
+        """
+        values: dict[str, Any] = dict(inputs or {})
+        missing = set(self.external_inputs) - set(values)
+        if missing:
+            raise DagError(f"Missing external inputs {sorted(missing)}.")
+
+        result = DagRun()
+        pending = dict(self.nodes)
+        running: dict[Future, _Attempt] = {}
+        run_started = time.monotonic()
+
+        while pending or running:
+            for node in list(pending.values()):
+                failed = [name for name in node.inputs if name in result.errors]
+                if failed and not node.allow_missing:
+                    result.errors[node.name] = f"skipped: upstream {failed[0]} failed"
+                    del pending[node.name]
+                    continue
+                if not all(name in values or name in result.errors for name in node.inputs):
+                    continue
+
+                del pending[node.name]
+                submitted = time.monotonic()
+                share_deadline = self._share_deadline(node, run_started, deadline)
+                if share_deadline is not None and share_deadline <= submitted:
+                    result.errors[node.name] = "deadline exceeded before start"
+                    continue
+                attempt = _Attempt(node, submitted, share_deadline)
+                kwargs = {name: values.get(name) for name in node.inputs}
+                context = contextvars.copy_context()
+                future = self.executor.submit(
+                    context.run, self._call, attempt, partial(node.fn, **kwargs)
+                )
+                running[future] = attempt
+
+            if not running:
+                if pending:
+                    continue
+                break
+
+            now = time.monotonic()
+            wakes = [self._limits(attempt)[1] for attempt in running.values()]
+            wakes = [at for at in wakes if at is not None]
+            wait_for = max(0.0, min(wakes) - now) if wakes else None
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for future in list(running):
+                attempt = running[future]
+                node, give_up_at = attempt.node, self._limits(attempt)[0]
+                started = attempt.started if attempt.started is not None else attempt.submitted
+                if future in done:
+                    result.timings[node.name] = now - started
+                    error = future.exception()
+                    if error is None:
+                        values[node.name] = result.outputs[node.name] = future.result()
+                        if on_complete is not None:
+                            on_complete(node.name, future.result())
+                    else:
+                        result.errors[node.name] = f"{type(error).__name__}: {error}"
+                    del running[future]
+                elif give_up_at is not None and now >= give_up_at:
+                    attempt.abandon()
+                    future.cancel()
+                    result.timings[node.name] = now - started
+                    result.errors[node.name] = f"timed out after {now - started:.1f}s"
+                    del running[future]
+
+        return result
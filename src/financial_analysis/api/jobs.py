@@ -0,0 +1,222 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from .models import QueryIn
+from .reports import Report
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class Job(BaseModel):
+    id: str
+    status: str
+    request: QueryIn
+    stages: dict[str, Any] = {}
+    report: Report | None = None
+    error: str | None = None
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+
+
+class JobStore:
+    """
+    SQLite-backed job queue. A worker claims a job by taking a lease on it; a job whose
+    lease expired (its worker died or the app restarted) can be claimed again, up to
+    `max_attempts` times. Several processes can share one store.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        lease: float = 900.0,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                body TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_expires REAL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)"
+        )
+        self._conn.commit()
+
+    def create(self, q: QueryIn) -> Job:
+        now = self.clock()
+        job = Job(id=uuid.uuid4().hex, status="queued", request=q, created_at=now, updated_at=now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, body, created_at) VALUES (?, ?, ?, ?)",
+                (job.id, job.status, job.model_dump_json(), job.created_at),
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, status, attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job.model_validate_json(row[0]).model_copy(
+            update={"status": row[1], "attempts": row[2]}
+        )
+
+    def claim(self) -> Job | None:
+        """Leases the oldest runnable job to the caller, or returns None if there is none."""
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = 'failed'
+                WHERE status = 'running' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, self.max_attempts),
+            )
+            row = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                    ORDER BY created_at LIMIT 1
+                )
+                RETURNING body, attempts
+                """,
+                (now + self.lease, now),
+            ).fetchone()
+            self._conn.commit()
+        if row is None:
+            return None
+        return Job.model_validate_json(row[0]).model_copy(
+            update={"status": "running", "attempts": row[1], "updated_at": now}
+        )
+
+    def save(self, job: Job) -> None:
+        """Persists the job's progress; finished jobs release their lease."""
+        job.updated_at = self.clock()
+        lease_expires = job.updated_at + self.lease if job.status == "running" else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, body = ?, lease_expires = ? WHERE id = ?",
+                (job.status, job.model_dump_json(), lease_expires, job.id),
+            )
+            self._conn.commit()
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return dict.fromkeys(JOB_STATUSES, 0) | dict(rows)
+
+
+class JobRunner:
+    """
+    Runs queued jobs on `workers` threads. `run` executes one request and reports each
+    stage's output through its callback, which is persisted as the job's partial result.
+    With zero workers, jobs are only queued, for a separate worker process to run.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run: Callable[[QueryIn, Callable[[str, Any], None]], Report],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def submit(self, q: QueryIn) -> Job:
+        job = self.store.create(q)
+        self._wake.set()
+        return job
+
+    def run_next(self) -> Job | None:
+        """Claims and runs one job. Returns it, or None if nothing was runnable."""
+        job = self.store.claim()
+        if job is None:
+            return None
+
+        def on_stage(name: str, output: Any) -> None:
+            job.stages[name] = output
+            try:
+                self.store.save(job)
+            except Exception as e:
+                logger.warning(f"Could not persist stage {name} of job {job.id}: {e}")
+
+        try:
+            job.report = self.run(job.request, on_stage)
+            job.status = "done"
+        except Exception as e:
+            logger.warning(f"Job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        self.store.save(job)
+        return job
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_next()
+            except Exception as e:
+                logger.warning(f"Job worker error: {e}")
+                ran = None
+            if ran is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self) -> None:
+        """Runs the workers in the foreground, as a separate worker process does."""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            self.stop()
@@ -1,39 +1,297 @@
 import os
+import secrets
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import Any
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
-from financial_analysis.analysis.market import MarketAgent
-from financial_analysis.analysis.news import NewsAgent
-from financial_analysis.analysis.research import ResearchAgent
-from financial_analysis.analysis.risk import RiskAgent
-from financial_analysis.analysis.synthesizer import SynthAgent
+from ..core.cassette import get_cassette
+from ..core.clients import close_clients
+from ..core.config import get_settings
+from ..core.deadline import DeadlineExceeded, deadline_after
+from ..core.fingerprint import fingerprint
+from ..core.metrics import REGISTRY, collect_timings
+from ..core.profiling import ProfilerBusy, ProfileStore, profile_request
+from ..core.scheduler import Priority, get_scheduler, priority_scope
+from .agents import AgentRegistry
+from .jobs import Job, JobRunner, JobStore
+from .models import AnalyzeOut, JobOut, QueryIn
+from .pipeline import AnalysisPipeline, StageStore
+from .prefetch import WatchlistPrefetcher
+from .reports import MaterializedReports, Report, ReportStore, report_key
 
-from .models import QueryIn
+settings = get_settings()
 
-app = FastAPI(title="Financial RAG Orchestrator")
+agents = AgentRegistry(settings)
 
-research_agent = ResearchAgent()
-market_agent = MarketAgent()
-news_agent = NewsAgent()
-risk_agent = RiskAgent()
-synth_agent = SynthAgent()
+prefetcher = WatchlistPrefetcher(
+    settings.watchlist,
+    agents.market,
+    agents.news,
+    research_agent=agents.research if settings.prefetch_research_queries else None,
+    research_queries=settings.prefetch_research_queries,
+    interval=settings.prefetch_interval,
+    max_concurrency=settings.prefetch_concurrency,
+)
+
+
+pipeline = AnalysisPipeline(
+    agents.research,
+    agents.market,
+    agents.news,
+    agents.risk,
+    agents.synth,
+    StageStore(Path(settings.state_dir) / "stages.db", max_age=settings.stage_max_age),
+    node_timeout=settings.node_timeout,
+    max_workers=settings.pipeline_workers,
+    digest_token_budget=settings.digest_token_budget,
+)
+
+
+def run_pipeline(q: QueryIn, on_stage: Callable[[str, Any], None] | None = None) -> Report:
+    result = pipeline.run(q, on_stage=on_stage)
+    return Report(
+        key=report_key(q),
+        company=q.company,
+        query=q.query,
+        synthesis=result.synthesis,
+        input_fingerprint=result.input_fingerprint,
+        generated_at=time.time(),
+        complete=result.complete,
+        reused_stages=[name for name, record in result.stages.items() if record.reused],
+        missing=result.missing,
+    )
+
+
+reports = MaterializedReports(
+    ReportStore(
+        Path(settings.state_dir) / "reports.db",
+        max_reports=settings.max_reports,
+        hit_half_life=settings.report_hit_half_life,
+    ),
+    run_pipeline,
+    fresh_for=settings.report_fresh_for,
+    max_stale=settings.report_max_stale,
+)
+
+
+def run_job(q: QueryIn, on_stage: Callable[[str, Any], None]) -> Report:
+    report = run_pipeline(q, on_stage)
+    if report.complete:
+        reports.store.put(report)
+    return report
+
+
+jobs = JobRunner(
+    JobStore(
+        Path(settings.state_dir) / "jobs.db",
+        lease=settings.job_lease,
+        max_attempts=settings.job_max_attempts,
+    ),
+    run_job,
+    workers=settings.job_workers,
+)
+
+
+profiles = ProfileStore(Path(settings.state_dir) / "profiles", keep=settings.profile_keep)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    if settings.warmup_on_start:
+        threading.Thread(target=agents.warmup, name="agent-warmup", daemon=True).start()
+    if prefetcher.watchlist:
+        prefetcher.start()
+    jobs.start()
+    yield
+    jobs.stop(timeout=5)
+    prefetcher.stop(timeout=5)
+    close_clients()
+
+
+app = FastAPI(title="Financial RAG Orchestrator", lifespan=lifespan)
+
+
+def request_deadline_ms(q: QueryIn, header_ms: int | None) -> int | None:
+    """The tightest of the body, header and configured default deadlines."""
+    given = [ms for ms in (q.deadline_ms, header_ms) if ms is not None]
+    if given:
+        return min(given)
+    return settings.default_deadline_ms
+
+
+def analyze_out(report: Report, stale: bool = False) -> AnalyzeOut:
+    return AnalyzeOut(
+        synthesis=report.synthesis,
+        stale=stale,
+        generated_at=report.generated_at,
+        age_seconds=max(0.0, time.time() - report.generated_at),
+        input_fingerprint=report.input_fingerprint,
+        reused_stages=report.reused_stages,
+        missing=report.missing,
+    )
+
+
+def record_analysis(q: QueryIn, out: AnalyzeOut, seconds: float) -> None:
+    """In cassette record mode, keeps the request and its result for `scripts/replay.py`."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.recording:
+        request = q.model_dump()
+        cassette.put(
+            "analyze",
+            fingerprint(request),
+            {"request": request, "synthesis": out.synthesis, "stale": out.stale},
+            seconds,
+        )
+
+
+def check_profiling_access(token: str | None) -> None:
+    """Profiling must be enabled, and the token must match when one is configured."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=403, detail="Profiling is disabled.")
+    expected = settings.profiling_token
+    if expected and not secrets.compare_digest(token or "", expected):
+        raise HTTPException(status_code=403, detail="Invalid profiling token.")
 
 
 @app.post("/analyze")
-def analyze(q: QueryIn) -> dict:
+def analyze(
+    q: QueryIn,
+    x_request_deadline_ms: int | None = Header(default=None, gt=0),
+    x_debug_timings: bool = Header(default=False),
+    x_profile: str | None = Header(default=None),
+    profile: str | None = Query(default=None),
+) -> AnalyzeOut:
+    """
+    With `X-Debug-Timings: 1`, the response breaks down where the request spent its time.
+    With an `X-Profile` header or `?profile=` flag (if profiling is enabled), the report
+    is recomputed under the profiler and the response carries the profile's id.
+    """
+    profile_token = x_profile if x_profile is not None else profile
+    if profile_token is not None:
+        check_profiling_access(profile_token)
+    deadline_ms = request_deadline_ms(q, x_request_deadline_ms)
+    started = time.perf_counter()
     try:
-        research_out = research_agent.analyze(q.query, k=q.k)
-        market_out = market_agent.analyze_ticker(q.company)
-        news_out = news_agent.top_headlines_for(q.company)
-        risk_out = risk_agent.compute_risk(research_out, market_out, news_out)
-        final = synth_agent.synthesize(q.query, research_out, market_out, news_out, risk_out)
-        return {"synthesis": final}
+        with (
+            deadline_after(None if deadline_ms is None else deadline_ms / 1000),
+            priority_scope(Priority.INTERACTIVE),
+            collect_timings() as timings,
+            profile_request() if profile_token is not None else nullcontext() as request_profile,
+        ):
+            if request_profile is None:
+                report, stale = reports.serve(q)
+            else:
+                # Profiling a stored report would show nothing, so it is always recomputed.
+                report, stale = reports.recompute(q), False
+        out = analyze_out(report, stale)
+        if x_debug_timings:
+            out.timings = timings
+        if request_profile is not None:
+            profiles.save(request_profile)
+            out.profile_id = request_profile.id
+        record_analysis(q, out, time.perf_counter() - started)
+        return out
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    x_profile: str | None = Header(default=None),
+    token: str | None = Query(default=None),
+) -> dict[str, Any]:
+    """Wall, CPU and wait time per span and stage, and the costliest functions."""
+    check_profiling_access(x_profile if x_profile is not None else token)
+    summary = profiles.summary(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile {profile_id}")
+    return summary
+
+
+@app.get("/profiles/{profile_id}/download")
+def download_profile(
+    profile_id: str,
+    x_profile: str | None = Header(default=None),
+    token: str | None = Query(default=None),
+) -> FileResponse:
+    """The full cProfile dump, for `pstats`, snakeviz or similar viewers."""
+    check_profiling_access(x_profile if x_profile is not None else token)
+    path = profiles.stats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile {profile_id}")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@app.post("/jobs", status_code=202)
+def create_job(q: QueryIn) -> JobOut:
+    """Queues an analysis and returns its id immediately; poll `GET /jobs/{id}` for it."""
+    return job_out(jobs.submit(q))
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> JobOut:
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job_out(job)
+
+
+def job_out(job: Job) -> JobOut:
+    return JobOut(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        stages=job.stages,
+        report=analyze_out(job.report) if job.report is not None else None,
+        error=job.error,
+    )
+
+
+@app.post("/warmup")
+def warmup() -> dict[str, str]:
+    """Builds every agent that is not loaded yet and reports each one's status."""
+    return agents.warmup()
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """
+    Readiness probe: 503 if a required agent failed to build, 200 otherwise. Failed
+    optional agents are listed under `degraded`.
+    """
+    return JSONResponse(
+        {"ready": agents.ready, "agents": agents.status(), "degraded": agents.failed},
+        status_code=200 if agents.ready else 503,
+    )
+
+
+@app.get("/scheduler")
+def scheduler_stats() -> dict[str, Any]:
+    """Queue depth, in-flight calls and wait times of the LLM scheduler."""
+    return get_scheduler().stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Span, stage, LLM token and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run("financial_analysis.api.main:app", host="127.0.0.1", port=8000, reload=True)
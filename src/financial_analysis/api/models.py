@@ -1,7 +1,36 @@
-from pydantic import BaseModel
+from typing import Any
+
+from pydantic import BaseModel, Field
 
 
 class QueryIn(BaseModel):
     query: str
     company: str
+    company_name: str | None = None
     k: int = 4
+    interpret_market: bool = True
+    allow_stale: bool = True
+    deadline_ms: int | None = Field(default=None, gt=0)
+
+
+class AnalyzeOut(BaseModel):
+    synthesis: str
+    stale: bool = False
+    generated_at: float
+    age_seconds: float = 0.0
+    input_fingerprint: str
+    reused_stages: list[str] = []
+    missing: dict[str, str] = {}
+    timings: dict[str, float] | None = None
+    profile_id: str | None = None
+
+
+class JobOut(BaseModel):
+    id: str
+    status: str
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+    stages: dict[str, Any] = {}
+    report: AnalyzeOut | None = None
+    error: str | None = None
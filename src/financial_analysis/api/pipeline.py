@@ -0,0 +1,470 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from ..analysis.digest import Digest, market_digest, news_digest, render_digests, research_digest
+from ..analysis.market import MarketAgent, MarketResult
+from ..analysis.news import NewsAgent, snippet_fingerprint, split_snippets
+from ..analysis.research import ResearchAgent, chunk_id
+from ..analysis.risk import RiskAgent
+from ..analysis.synthesizer import SynthAgent
+from ..core.deadline import DeadlineExceeded, current_deadline
+from ..core.fingerprint import fingerprint
+from ..core.lazy import Lazy, resolve
+from ..core.metrics import STAGE_RESULTS, STAGE_SECONDS, record_span
+from .dag import DagExecutor, Node
+from .models import QueryIn
+
+logger = logging.getLogger(__name__)
+
+FAILURE_PREFIXES = (
+    "LLM analysis failed",
+    "Error fetching news",
+    "Final analysis failed",
+    "Synthesis LLM failed",
+)
+
+
+MISSING = "missing"
+
+
+def unavailable(label: str) -> str:
+    return f"[{label} unavailable: it failed or did not finish before the request deadline.]"
+
+
+def missing_market(ticker: str) -> MarketResult:
+    text = unavailable("Market analysis")
+    return MarketResult(ticker=ticker, error=text, text=text)
+
+
+def is_failure(output: Any) -> bool:
+    """Whether an agent output is one of the agents' fallback/error results."""
+    if isinstance(output, dict):
+        return "error" in output
+    return isinstance(output, str) and output.startswith(FAILURE_PREFIXES)
+
+
+class StageStore:
+    """
+    SQLite-backed store of stage outputs keyed by (stage, input fingerprint).
+    Outputs older than `max_age` seconds are ignored, and deleted on opening the store and
+    every `prune_every` writes after that.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_age: float = 7 * 24 * 3600.0,
+        clock: Callable[[], float] = time.time,
+        prune_every: int = 100,
+    ) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.clock = clock
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stages (
+                stage TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (stage, fingerprint)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS stages_created_at ON stages (created_at)")
+        self._prune()
+        self._conn.commit()
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM stages WHERE created_at < ?", (self.clock() - self.max_age,)
+        )
+
+    def get(self, stage: str, input_fingerprint: str) -> Any | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM stages WHERE stage = ? AND fingerprint = ?",
+                (stage, input_fingerprint),
+            ).fetchone()
+        if row is None or self.clock() - row[1] > self.max_age:
+            return None
+        return json.loads(row[0])
+
+    def put(self, stage: str, input_fingerprint: str, output: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (stage, fingerprint, output, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (stage, input_fingerprint, json.dumps(output), self.clock()),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM stages").fetchone()[0])
+
+
+class StageRecord(BaseModel):
+    fingerprint: str
+    reused: bool
+    ok: bool
+
+
+class StageRecords:
+    """
+    The stage records of one run, written by nodes running concurrently. Once a node is
+    closed, its writes are dropped: a gatherer the DAG gave up on keeps running on the
+    pool, and must not change the records that risk and synthesis already read.
+    """
+
+    # The DAG node each stage runs in.
+    NODES = {
+        "research": "research",
+        "market_data": "market",
+        "market_interpretation": "market",
+        "news_fetch": "news",
+        "news": "news",
+        "risk": "risk",
+        "synthesis": "synthesis",
+    }
+
+    def __init__(self) -> None:
+        self._records: dict[str, StageRecord] = {}
+        self._closed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def set(self, stage: str, record: StageRecord) -> None:
+        with self._lock:
+            if self.NODES.get(stage, stage) not in self._closed:
+                self._records[stage] = record
+
+    def close(self, *nodes: str) -> None:
+        with self._lock:
+            self._closed.update(nodes)
+
+    def snapshot(self) -> dict[str, StageRecord]:
+        with self._lock:
+            return dict(self._records)
+
+
+class PipelineResult(BaseModel):
+    research: str
+    market: MarketResult
+    news: str
+    risk: dict[str, Any]
+    synthesis: str
+    input_fingerprint: str
+    stages: dict[str, StageRecord]
+    timings: dict[str, float] = {}
+    missing: dict[str, str] = {}
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing and all(record.ok for record in self.stages.values())
+
+
+class AnalysisPipeline:
+    """
+    Runs the five agents as fingerprinted stages on a DAG. Cheap source stages (retrieval, market
+    data, news fetch) always run and fingerprint what they return; each LLM stage is keyed
+    by the fingerprints of its inputs and reuses its persisted output while they are
+    unchanged. A change therefore only re-executes the stages downstream of it.
+
+    Each gatherer also returns a `Digest` of its output. Risk and synthesis read the
+    digests, rendered within `digest_token_budget` tokens, instead of the full prose;
+    a budget of 0 passes them the prose.
+
+    Agents may be passed as `Lazy` values; each is then built by the first stage that
+    needs it, so an agent that cannot be built only fails its own stage.
+    """
+
+    def __init__(
+        self,
+        research_agent: ResearchAgent | Lazy[ResearchAgent],
+        market_agent: MarketAgent | Lazy[MarketAgent],
+        news_agent: NewsAgent | Lazy[NewsAgent],
+        risk_agent: RiskAgent | Lazy[RiskAgent],
+        synth_agent: SynthAgent | Lazy[SynthAgent],
+        store: StageStore,
+        node_timeout: float | None = None,
+        max_workers: int = 8,
+        digest_token_budget: int = 1200,
+    ) -> None:
+        self._research_agent = research_agent
+        self._market_agent = market_agent
+        self._news_agent = news_agent
+        self._risk_agent = risk_agent
+        self._synth_agent = synth_agent
+        self.store = store
+        self.digest_token_budget = digest_token_budget
+        self.dag = DagExecutor(
+            self.build_nodes(),
+            external_inputs=("q", "stages"),
+            max_workers=max_workers,
+            default_timeout=node_timeout,
+        )
+
+    @property
+    def research_agent(self) -> ResearchAgent:
+        return resolve(self._research_agent)
+
+    @property
+    def market_agent(self) -> MarketAgent:
+        return resolve(self._market_agent)
+
+    @property
+    def news_agent(self) -> NewsAgent:
+        return resolve(self._news_agent)
+
+    @property
+    def risk_agent(self) -> RiskAgent:
+        return resolve(self._risk_agent)
+
+    @property
+    def synth_agent(self) -> SynthAgent:
+        return resolve(self._synth_agent)
+
+    def _stage(
+        self,
+        stages: StageRecords,
+        name: str,
+        input_fingerprint: str,
+        compute: Callable[[], Any],
+        upstream_ok: bool = True,
+    ) -> Any:
+        cached = self.store.get(name, input_fingerprint)
+        if cached is not None:
+            STAGE_RESULTS.inc(name, "reused")
+            stages.set(name, StageRecord(fingerprint=input_fingerprint, reused=True, ok=True))
+            return cached
+
+        STAGE_RESULTS.inc(name, "computed")
+        output = compute()
+        ok = upstream_ok and not is_failure(output)
+        if ok:
+            self.store.put(name, input_fingerprint, output)
+        stages.set(name, StageRecord(fingerprint=input_fingerprint, reused=False, ok=ok))
+        return output
+
+    def research_stage(self, q: QueryIn, stages: StageRecords) -> tuple[str, str, Digest]:
+        documents = self.research_agent.retrieve_documents(q.query, k=q.k)
+        research_fp = fingerprint("research", q.query, [chunk_id(d) for d in documents])
+        research = self._stage(
+            stages,
+            "research",
+            research_fp,
+            lambda: self.research_agent.analyze_documents(q.query, documents),
+        )
+        error = research if is_failure(research) else None
+        return research, research_fp, research_digest(research, documents, error)
+
+    def market_stage(self, q: QueryIn, stages: StageRecords) -> tuple[MarketResult, str, Digest]:
+        market = self.market_agent.analyze(q.company, interpret=False)
+        market_fp = fingerprint(
+            "market", market.model_dump(exclude={"text", "interpretation", "summary"})
+        )
+        stages.set(
+            "market_data",
+            StageRecord(fingerprint=market_fp, reused=False, ok=market.error is None),
+        )
+        if q.interpret_market and market.error is None:
+            market.interpretation = self._stage(
+                stages,
+                "market_interpretation",
+                market_fp,
+                lambda: self.market_agent.interpret(market),
+            )
+            market.text = market.interpretation
+        return market, fingerprint(market_fp, q.interpret_market), market_digest(market)
+
+    def news_stage(self, q: QueryIn, stages: StageRecords) -> tuple[str, str, Digest]:
+        company = q.company_name or q.company
+        search_data = self.news_agent.fetch_live_news(company, ticker=q.company)
+        fetch_ok = not search_data.startswith(("Error fetching news", "No relevant news"))
+        news_fp = fingerprint(
+            "news",
+            company.strip().lower(),
+            snippet_fingerprint(split_snippets(search_data)) if fetch_ok else search_data,
+        )
+        stages.set(
+            "news_fetch",
+            StageRecord(fingerprint=news_fp, reused=False, ok=not is_failure(search_data)),
+        )
+        if not fetch_ok:
+            return search_data, news_fp, news_digest("", [], error=search_data)
+        snippets = split_snippets(search_data)
+        news = self._stage(
+            stages, "news", news_fp, lambda: self.news_agent.analyze_news(company, search_data)
+        )
+        error = news if is_failure(news) else None
+        return news, news_fp, news_digest(news, snippets, error)
+
+    def gathered_inputs(
+        self,
+        research: tuple[str, str, Digest] | None,
+        market: tuple[MarketResult, str, Digest] | None,
+        news: tuple[str, str, Digest] | None,
+    ) -> tuple[str, str, str]:
+        """The research, market and news inputs for risk and synthesis."""
+        research_text = research[0] if research else unavailable("Research analysis")
+        market_text = market[0].text if market else unavailable("Market analysis")
+        news_text = news[0] if news else unavailable("News analysis")
+        if self.digest_token_budget <= 0:
+            return research_text, market_text, news_text
+        digests = [
+            research[2] if research else Digest(source="research", error=research_text),
+            market[2] if market else Digest(source="market", error=market_text),
+            news[2] if news else Digest(source="news", error=news_text),
+        ]
+        rendered = render_digests(digests, self.digest_token_budget)
+        return rendered[0], rendered[1], rendered[2]
+
+    def risk_stage(
+        self,
+        q: QueryIn,
+        stages: StageRecords,
+        research: tuple[str, str, Digest] | None,
+        market: tuple[MarketResult, str, Digest] | None,
+        news: tuple[str, str, Digest] | None,
+    ) -> tuple[dict[str, Any], str]:
+        # Every gatherer has finished or been given up on by now.
+        stages.close("research", "market", "news")
+        gathered_ok = None not in (research, market, news) and all(
+            record.ok for record in stages.snapshot().values()
+        )
+        research_fp = research[1] if research else MISSING
+        market_result, market_fp = market[:2] if market else (missing_market(q.company), MISSING)
+        news_fp = news[1] if news else MISSING
+        research_text, market_text, news_text = self.gathered_inputs(research, market, news)
+
+        risk_fp = fingerprint("risk", research_fp, market_fp, news_fp, self.digest_token_budget)
+        risk = self._stage(
+            stages,
+            "risk",
+            risk_fp,
+            lambda: self.risk_agent.compute_risk(
+                research_text, market_text, news_text, market_result
+            ),
+            upstream_ok=gathered_ok,
+        )
+        return risk, risk_fp
+
+    def synthesis_stage(
+        self,
+        q: QueryIn,
+        stages: StageRecords,
+        research: tuple[str, str, Digest] | None,
+        market: tuple[MarketResult, str, Digest] | None,
+        news: tuple[str, str, Digest] | None,
+        risk: tuple[dict[str, Any], str] | None,
+    ) -> tuple[str, str]:
+        stages.close("research", "market", "news", "risk")
+        inputs_ok = None not in (research, market, news, risk) and all(
+            record.ok for record in stages.snapshot().values()
+        )
+        research_text, market_text, news_text = self.gathered_inputs(research, market, news)
+        risk_out, risk_fp = risk or ({"error": unavailable("Risk assessment")}, MISSING)
+
+        synthesis_fp = fingerprint("synthesis", q.query, risk_fp)
+        synthesis = self._stage(
+            stages,
+            "synthesis",
+            synthesis_fp,
+            lambda: self.synth_agent.synthesize(
+                q.query, research_text, market_text, news_text, risk_out
+            ),
+            upstream_ok=inputs_ok,
+        )
+        return synthesis, synthesis_fp
+
+    def build_nodes(self) -> list[Node]:
+        """
+        The research, market and news gatherers run concurrently; risk and synthesis wait
+        for them. Under a request deadline the gatherers get the first 60% of the budget and
+        risk the next 20%, so synthesis always has time left to report on what arrived.
+        """
+        gathered = ("research", "market", "news")
+        return [
+            Node("research", self.research_stage, ("q", "stages"), deadline_share=0.6),
+            Node("market", self.market_stage, ("q", "stages"), deadline_share=0.6),
+            Node("news", self.news_stage, ("q", "stages"), deadline_share=0.6),
+            Node(
+                "risk",
+                self.risk_stage,
+                ("q", "stages", *gathered),
+                allow_missing=True,
+                deadline_share=0.8,
+            ),
+            Node(
+                "synthesis",
+                self.synthesis_stage,
+                ("q", "stages", *gathered, "risk"),
+                allow_missing=True,
+            ),
+        ]
+
+    def run(
+        self, q: QueryIn, on_stage: Callable[[str, Any], None] | None = None
+    ) -> PipelineResult:
+        """
+        Runs the DAG under the deadline of the calling context, if any. Gatherers or risk
+        that fail or miss their share of the deadline are reported in `missing` and
+        synthesis goes ahead without them. `on_stage` receives each stage's output as
+        soon as it is available.
+        """
+
+        def stage_done(name: str, value: tuple[Any, ...]) -> None:
+            if on_stage is not None:
+                output = value[0]
+                on_stage(name, output.text if isinstance(output, MarketResult) else output)
+
+        stages = StageRecords()
+        dag_run = self.dag.run(
+            {"q": q, "stages": stages}, deadline=current_deadline(), on_complete=stage_done
+        )
+        logger.info(
+            "Pipeline timings for %s: %s",
+            q.company,
+            ", ".join(f"{name}={seconds:.2f}s" for name, seconds in dag_run.timings.items()),
+        )
+        for name, seconds in dag_run.timings.items():
+            STAGE_SECONDS.observe(seconds, name)
+            record_span(f"stage.{name}", seconds)
+        if "synthesis" not in dag_run.outputs:
+            error = dag_run.errors.get("synthesis", "")
+            if "timed out" in error or "deadline" in error:
+                raise DeadlineExceeded(f"Synthesis did not finish before the deadline: {error}")
+            raise RuntimeError(f"Analysis pipeline failed: {dag_run.errors}")
+
+        outputs = dag_run.outputs
+        synthesis, synthesis_fp = outputs["synthesis"]
+        research = outputs.get("research")
+        market = outputs.get("market")
+        news = outputs.get("news")
+        risk = outputs.get("risk")
+        return PipelineResult(
+            research=research[0] if research else unavailable("Research analysis"),
+            market=market[0] if market else missing_market(q.company),
+            news=news[0] if news else unavailable("News analysis"),
+            risk=risk[0] if risk else {"error": unavailable("Risk assessment")},
+            synthesis=synthesis,
+            input_fingerprint=synthesis_fp,
+            stages=stages.snapshot(),
+            timings=dag_run.timings,
+            missing=dict(dag_run.errors),
+        )
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from ..analysis.market import MarketAgent
+from ..analysis.news import NewsAgent
+from ..core.lazy import Lazy, resolve
+from ..core.scheduler import Priority, priority_scope
+
+logger = logging.getLogger(__name__)
+
+
+def parse_watchlist(entries: list[str]) -> list[tuple[str, str | None]]:
+    """Parses watchlist entries of the form 'AAPL' or 'AAPL:Apple' into (ticker, name) pairs."""
+    parsed: list[tuple[str, str | None]] = []
+    for entry in entries:
+        ticker, _, name = entry.partition(":")
+        if ticker.strip():
+            parsed.append((ticker.strip().upper(), name.strip() or None))
+    return parsed
+
+
+class WatchlistPrefetcher:
+    """
+    Refreshes market data, fundamentals and news for a watchlist on a fixed interval so
+    user-facing requests for those tickers find the agents' caches already warm.
+    """
+
+    def __init__(
+        self,
+        watchlist: list[str],
+        market_agent: MarketAgent | Lazy[MarketAgent],
+        news_agent: NewsAgent | Lazy[NewsAgent],
+        research_agent: Any | None = None,
+        research_queries: list[str] | None = None,
+        interval: float = 900.0,
+        max_concurrency: int = 8,
+        research_k: int = 4,
+    ) -> None:
+        self.watchlist = parse_watchlist(watchlist)
+        self._market_agent = market_agent
+        self._news_agent = news_agent
+        self._research_agent = research_agent
+        self.research_queries = research_queries or []
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.research_k = research_k
+        self.last_run: dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def market_agent(self) -> MarketAgent:
+        return resolve(self._market_agent)
+
+    @property
+    def news_agent(self) -> NewsAgent:
+        return resolve(self._news_agent)
+
+    @property
+    def research_agent(self) -> Any | None:
+        return resolve(self._research_agent)
+
+    def refresh_ticker(self, ticker: str, name: str | None = None) -> dict[str, bool]:
+        """Refreshes every cached input for one ticker. Returns which parts succeeded."""
+        status: dict[str, bool] = {}
+
+        bars = self.market_agent.load_market(ticker, period="60d", refresh=True)
+        status["market"] = not bars.empty
+        self.market_agent.fetch_fundamentals(ticker, refresh=True)
+        status["fundamentals"] = self.market_agent.fundamentals_cache.peek(ticker) is not None
+
+        company = name or ticker
+        news = self.news_agent.fetch_live_news(company, ticker=ticker, refresh=True)
+        status["news"] = not news.startswith(("Error fetching news", "No relevant news"))
+        if status["news"]:
+            self.news_agent.top_headlines_for(company, ticker=ticker)
+
+        if self.research_agent is not None:
+            for template in self.research_queries:
+                query = template.format(ticker=ticker, company=company)
+                self.research_agent.retrieve_documents(query, k=self.research_k)
+            status["research"] = True
+        return status
+
+    def _refresh_safely(self, ticker: str, name: str | None) -> dict[str, Any]:
+        try:
+            with priority_scope(Priority.PREFETCH):
+                return {"ok": True, **self.refresh_ticker(ticker, name)}
+        except Exception as e:
+            logger.warning(f"Prefetch failed for {ticker}: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def run_once(self) -> dict[str, Any]:
+        """Refreshes the whole watchlist with at most `max_concurrency` tickers in flight."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="prefetch"
+        ) as executor:
+            futures = {
+                ticker: executor.submit(self._refresh_safely, ticker, name)
+                for ticker, name in self.watchlist
+            }
+            results = {ticker: future.result() for ticker, future in futures.items()}
+
+        elapsed = time.perf_counter() - started
+        failed = sum(1 for r in results.values() if not r["ok"])
+        logger.info(f"Prefetched {len(results)} tickers in {elapsed:.1f}s ({failed} failed).")
+        self.last_run = {"finished_at": time.time(), "seconds": elapsed, "tickers": results}
+        return results
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="watchlist-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,228 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from ..core.fingerprint import fingerprint
+from ..core.metrics import REPORT_REQUESTS
+from .models import QueryIn
+
+logger = logging.getLogger(__name__)
+
+
+class Report(BaseModel):
+    key: str
+    company: str
+    query: str
+    synthesis: str
+    input_fingerprint: str
+    generated_at: float
+    hits: int = 0
+    complete: bool = True
+    reused_stages: list[str] = []
+    missing: dict[str, str] = {}
+
+
+def report_key(q: QueryIn) -> str:
+    """Identifies a materialized report by everything in the request that shapes it."""
+    return fingerprint(
+        q.company.strip().upper(),
+        " ".join(q.query.lower().split()),
+        q.k,
+        q.interpret_market,
+        (q.company_name or "").strip().lower(),
+    )
+
+
+def _log2_add(a: float, b: float) -> float:
+    """log2(2**a + 2**b), without overflowing."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+class ReportStore:
+    """
+    SQLite-backed store of materialized analyst reports. Once more than `max_reports`
+    are stored, the least popular reports are evicted. Popularity is the request count
+    decayed with a half-life of `hit_half_life` seconds, so reports that were popular
+    long ago make room for ones that are popular now. A `recent_share` of the store is
+    kept for the most recently stored reports, which gives new reports time to collect
+    requests before they compete on popularity.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_reports: int = 1000,
+        hit_half_life: float = 24 * 3600.0,
+        recent_share: float = 0.1,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_reports = max_reports
+        self.hit_half_life = hit_half_life
+        self.recent_share = recent_share
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        # `popularity` is log2 of the sum of 2**(t / hit_half_life) over request times t:
+        # comparing it ranks reports by their decayed request counts at any common time.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                generated_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                popularity REAL NOT NULL DEFAULT 0,
+                stored_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _request_weight(self) -> float:
+        return self.clock() / self.hit_half_life
+
+    def get(self, key: str) -> Report | None:
+        """Returns the stored report and counts the lookup as a request for it."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, hits, popularity FROM reports WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE reports SET hits = hits + 1, popularity = ? WHERE key = ?",
+                (_log2_add(row[2], self._request_weight()), key),
+            )
+            self._conn.commit()
+        report = Report.model_validate_json(row[0])
+        report.hits = row[1] + 1
+        return report
+
+    def put(self, report: Report) -> None:
+        """
+        Stores `report`. A new report is credited with the request that computed it; a
+        replaced one keeps its counts, since its lookup was already counted by `get`.
+        """
+        recent = min(self.max_reports - 1, max(1, int(self.max_reports * self.recent_share)))
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO reports (key, body, generated_at, hits, popularity, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    body = excluded.body, generated_at = excluded.generated_at
+                """,
+                (
+                    report.key,
+                    report.model_dump_json(),
+                    report.generated_at,
+                    report.hits + 1,
+                    self._request_weight(),
+                    self.clock(),
+                ),
+            )
+            self._conn.execute(
+                """
+                WITH popular AS (
+                    SELECT key FROM reports ORDER BY popularity DESC, stored_at DESC LIMIT ?
+                )
+                DELETE FROM reports
+                WHERE key NOT IN (SELECT key FROM popular)
+                AND key NOT IN (
+                    SELECT key FROM reports WHERE key NOT IN (SELECT key FROM popular)
+                    ORDER BY stored_at DESC LIMIT ?
+                )
+                """,
+                (self.max_reports - recent, recent),
+            )
+            self._conn.commit()
+
+    def most_requested(self, limit: int = 10) -> list[Report]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body, hits FROM reports ORDER BY popularity DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            Report.model_validate_json(body).model_copy(update={"hits": hits})
+            for body, hits in rows
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0])
+
+
+class MaterializedReports:
+    """
+    Serves reports stale-while-revalidate: fresh reports are returned as-is, reports older
+    than `fresh_for` seconds are returned immediately while a background recomputation
+    replaces them, and reports older than `max_stale` seconds are recomputed inline.
+    """
+
+    def __init__(
+        self,
+        store: ReportStore,
+        compute: Callable[[QueryIn], Report],
+        fresh_for: float = 900.0,
+        max_stale: float = 24 * 3600.0,
+        max_workers: int = 2,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.compute = compute
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._in_flight: set[str] = set()
+        self._lock = threading.Lock()
+
+    def serve(self, q: QueryIn) -> tuple[Report, bool]:
+        """Returns the report for the request and whether it is stale."""
+        key = report_key(q)
+        report = self.store.get(key)
+        if report is not None:
+            age = self.clock() - report.generated_at
+            if age <= self.fresh_for:
+                REPORT_REQUESTS.inc("fresh")
+                return report, False
+            if q.allow_stale and age <= self.max_stale:
+                REPORT_REQUESTS.inc("stale")
+                self.refresh_in_background(q)
+                return report, True
+        REPORT_REQUESTS.inc("computed")
+        return self.recompute(q), False
+
+    def recompute(self, q: QueryIn) -> Report:
+        report = self.compute(q)
+        if report.complete:
+            self.store.put(report)
+        return report
+
+    def refresh_in_background(self, q: QueryIn) -> bool:
+        """Schedules a recomputation unless one for the same report is already running."""
+        key = report_key(q)
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+        self.executor.submit(self._refresh, key, q)
+        return True
+
+    def _refresh(self, key: str, q: QueryIn) -> None:
+        try:
+            self.recompute(q)
+        except Exception as e:
+            logger.warning(f"Background report refresh failed for {q.company}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
@@ -0,0 +1,31 @@
+"""
+Runs queued analysis jobs in a separate process, sharing the API's job store:
+
+    python -m financial_analysis.api.worker --workers 4
+
+Set ALPHASYNTH_JOB_WORKERS=0 on the API to leave all jobs to such workers. With a shared
+cache (ALPHASYNTH_CACHE_URL), `--prefetch` also makes this process warm the watchlist for
+every API replica.
+"""
+
+import argparse
+import logging
+
+from .jobs import JobRunner
+from .main import jobs, prefetcher, run_job
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued AlphaSynth analysis jobs.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--prefetch", action="store_true", help="Also prefetch the watchlist.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.prefetch and prefetcher.watchlist:
+        prefetcher.start()
+    JobRunner(jobs.store, run_job, workers=args.workers).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import json
+import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from typing import Any, Generic, Protocol, TypeVar
+
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+
+from .cache_backend import CacheBackend, get_cache_backend
+from .config import get_settings
+from .deadline import DeadlineExceeded, clamp_timeout
+from .metrics import track_cache
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class Cache(Protocol[V]):
+    """What agents need from a cache; see `make_cache`."""
+
+    ttl: float
+    hits: int
+    misses: int
+
+    def get(self, key: str) -> V | None: ...
+
+    def peek(self, key: str) -> V | None: ...
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None: ...
+
+    def pop(self, key: str) -> V | None: ...
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], V],
+        cacheable: Callable[[V], bool] = ...,
+        ttl: float | None = None,
+    ) -> V: ...
+
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe in-memory cache whose entries expire `ttl` seconds after they were set.
+    The least recently used entry is evicted once `maxsize` entries are stored. A named
+    cache exports its hit and miss counts on `/metrics`.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+        name: str | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = _Flights()
+        if name is not None:
+            track_cache(name, self)
+
+    def get(self, key: str) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: str) -> V | None:
+        """The live value for `key`, without counting a lookup or refreshing its recency."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None and entry[0] > self.clock() else None
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None:
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], V],
+        cacheable: Callable[[V], bool] = lambda _: True,
+        ttl: float | None = None,
+    ) -> V:
+        """
+        Returns the cached value, or computes and caches it. Concurrent callers missing
+        the same key wait for a single computation instead of each running their own.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        with self._flights.lead(key, self.peek) as cached:
+            if cached is not None:
+                return cached
+            value = compute()
+            if cacheable(value):
+                self.set(key, value, ttl)
+            return value
+
+
+class _Flights:
+    """
+    The keys being computed in this process. One caller leads each key; callers missing
+    the same key wait for it without holding anything other keys need.
+    """
+
+    def __init__(self) -> None:
+        self._done: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lead(self, key: str, lookup: Callable[[str], V | None]) -> Iterator[V | None]:
+        """
+        Waits until no other caller is computing `key`, then yields its value if the last
+        leader stored one, or None if the caller should compute it.
+        """
+        while True:
+            with self._lock:
+                done = self._done.get(key)
+                if done is None:
+                    done = self._done[key] = threading.Event()
+                    break
+            done.wait()
+            value = lookup(key)
+            if value is not None:
+                yield value
+                return
+        try:
+            yield lookup(key)
+        finally:
+            with self._lock:
+                del self._done[key]
+            done.set()
+
+
+def _encode_frame(df: pd.DataFrame) -> dict[str, Any]:
+    index = df.index
+    dated = isinstance(index, pd.DatetimeIndex)
+    return {
+        "__type__": "DataFrame",
+        "columns": [str(column) for column in df.columns],
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+        "data": [_to_json(df[column].tolist()) for column in df.columns],
+        "index": [label.isoformat() for label in index] if dated else _to_json(index.tolist()),
+        "index_name": index.name,
+        "dates": dated,
+        "tz": str(index.tz) if dated and index.tz is not None else None,
+    }
+
+
+def _decode_frame(data: dict[str, Any]) -> pd.DataFrame:
+    if not data["dates"]:
+        index = pd.Index(data["index"], name=data["index_name"])
+    elif data["tz"] is None:
+        index = pd.DatetimeIndex(pd.to_datetime(data["index"]), name=data["index_name"])
+    else:
+        utc = pd.DatetimeIndex(pd.to_datetime(data["index"], utc=True), name=data["index_name"])
+        index = utc.tz_convert(data["tz"])
+    columns = {
+        column: pd.Series(values, index=index, dtype=dtype)
+        for column, dtype, values in zip(
+            data["columns"], data["dtypes"], data["data"], strict=True
+        )
+    }
+    return pd.DataFrame(columns, index=index, columns=data["columns"])
+
+
+def _to_json(value: Any) -> Any:
+    if value is None or isinstance(value, str | bool | int | float):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, list | tuple):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, pd.DataFrame):
+        return _encode_frame(value)
+    if isinstance(value, Document):
+        return {
+            "__type__": "Document",
+            "page_content": value.page_content,
+            "metadata": _to_json(value.metadata),
+            "id": value.id,
+        }
+    raise TypeError(f"Cannot store {type(value).__name__} in the shared cache.")
+
+
+def _from_json(data: dict[str, Any]) -> Any:
+    kind = data.get("__type__")
+    if kind == "DataFrame":
+        return _decode_frame(data)
+    if kind == "Document":
+        return Document(
+            page_content=data["page_content"], metadata=data["metadata"], id=data["id"]
+        )
+    return data
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Compact binary form of an agent output: JSON, with tagged DataFrames and Documents,
+    then zlib-compressed. Other types raise TypeError. Unlike pickle, decoding never runs
+    code, so a writable backend cannot take over the replicas reading from it.
+    """
+    return zlib.compress(json.dumps(_to_json(value)).encode(), 1)
+
+
+def decode_value(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data), object_hook=_from_json)
+
+
+class SharedCache(Generic[V]):
+    """
+    A `TTLCache` counterpart whose entries live in a `CacheBackend` shared by all API
+    replicas, under the key prefix `<prefix>:<namespace>:`. Values are stored in
+    `encode_value` form. A backend outage degrades to cache misses.
+
+    `get_or_compute` protects against stampedes: within a process one caller computes a
+    missing key while the others wait, and across replicas the first to take the key's
+    lock computes it while the others poll for its result for up to `lock_timeout`
+    seconds before computing it themselves. Waiters stop as soon as the lock is released
+    without a stored result (an uncacheable value or a failed computation).
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        ttl: float,
+        prefix: str = "alphasynth",
+        lock_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._flights = _Flights()
+        track_cache(namespace, self)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{self.namespace}:{key}"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        with self._lock:
+            self.errors += 1
+        logger.warning(f"Cache {operation} in '{self.namespace}' failed: {error}")
+
+    def _fetch(self, key: str) -> V | None:
+        try:
+            data = self.backend.get(self._key(key))
+            return None if data is None else decode_value(data)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    def get(self, key: str) -> V | None:
+        value = self._fetch(key)
+        self._count(value is not None)
+        return value
+
+    def peek(self, key: str) -> V | None:
+        """The stored value for `key`, without counting a lookup."""
+        return self._fetch(key)
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None:
+        try:
+            self.backend.set(self._key(key), encode_value(value), self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self._failed("set", e)
+
+    def pop(self, key: str) -> V | None:
+        value = self._fetch(key)
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            self._failed("delete", e)
+        return value
+
+    def _wait_for(self, key: str, lock_key: str) -> V | None:
+        """
+        Polls for a value another replica is computing, within the request deadline, until
+        its lock is released.
+        """
+        try:
+            waited = clamp_timeout(self.lock_timeout) or 0.0
+        except DeadlineExceeded:
+            return None
+        give_up_at = time.monotonic() + waited
+        while time.monotonic() < give_up_at:
+            time.sleep(self.poll_interval)
+            try:
+                held = self.backend.get(lock_key) is not None
+            except Exception as e:
+                self._failed("lock", e)
+                return None
+            if not held:
+                return self._fetch(key)
+        return None
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], V],
+        cacheable: Callable[[V], bool] = lambda _: True,
+        ttl: float | None = None,
+    ) -> V:
+        """Returns the cached value, or computes and caches it, at most once at a time."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        with self._flights.lead(key, self._fetch) as value:
+            if value is not None:
+                return value
+            lock_key = f"{self._key(key)}:lock"
+            token = uuid.uuid4().bytes
+            try:
+                locked = self.backend.add(lock_key, token, self.lock_timeout)
+            except Exception as e:
+                self._failed("lock", e)
+                locked = True
+            if not locked:
+                value = self._wait_for(key, lock_key)
+                if value is not None:
+                    return value
+            try:
+                value = compute()
+                if cacheable(value):
+                    self.set(key, value, ttl)
+                return value
+            finally:
+                if locked:
+                    with suppress(Exception):
+                        if self.backend.get(lock_key) == token:
+                            self.backend.delete(lock_key)
+
+
+def make_cache(name: str, ttl: float) -> Cache[Any]:
+    """
+    The cache an agent stores `name` entries in: shared by all replicas through the
+    backend at `ALPHASYNTH_CACHE_URL` if one is configured, otherwise in this process.
+    """
+    settings = get_settings()
+    if not settings.cache_url:
+        return TTLCache(ttl=ttl, name=name)
+    return SharedCache(
+        get_cache_backend(),
+        name,
+        ttl,
+        prefix=settings.cache_prefix,
+        lock_timeout=settings.cache_lock_timeout,
+    )
@@ -0,0 +1,206 @@
+import socket
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, BinaryIO, Protocol
+from urllib.parse import unquote, urlparse
+
+from .config import get_settings
+from .resilience import CircuitBreaker
+
+
+class CacheBackend(Protocol):
+    """Byte-level key/value store behind `SharedCache`. TTLs are in seconds."""
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Sets `key` only if it is absent; returns whether it was set."""
+        ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryBackend:
+    """In-process backend, for a single replica and for tests."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self._entries: dict[str, tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            self._entries.pop(key, None)
+            return None
+        return entry[1]
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._entries[key] = (self.clock() + ttl, value)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisError(RuntimeError):
+    pass
+
+
+def encode_command(*args: str | bytes) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+def read_reply(stream: BinaryIO) -> Any:
+    """Reads one RESP2 reply. Error replies are raised as `RedisError`."""
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Redis closed the connection.")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RedisError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Redis closed the connection.")
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        return None if count < 0 else [read_reply(stream) for _ in range(count)]
+    raise RedisError(f"Unexpected Redis reply {line!r}")
+
+
+class RedisBackend:
+    """
+    Minimal client for the Redis protocol (RESP2): GET, SET with PX/NX and DEL, enough for
+    the shared cache without a client library. Each thread keeps its own connection.
+    Accepts `redis://[:password@]host[:port][/db]` URLs.
+
+    After a connection error, commands fail immediately for `retry_after` seconds rather
+    than each waiting for its own connect timeout; then one command tries again.
+    """
+
+    def __init__(self, url: str, timeout: float = 0.5, retry_after: float = 5.0) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL '{url}'; expected redis://host:port/db.")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_after=retry_after)
+        self._local = threading.local()
+
+    def _connection(self) -> BinaryIO:
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._local.sock, self._local.stream = sock, sock.makefile("rwb")
+            try:
+                if self.password:
+                    self._send("AUTH", self.password)
+                if self.db:
+                    self._send("SELECT", str(self.db))
+            except Exception:
+                self._close()
+                raise
+        return self._local.stream
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = self._local.stream = None
+
+    def _send(self, *args: str | bytes) -> Any:
+        stream = self._local.stream
+        stream.write(encode_command(*args))
+        stream.flush()
+        return read_reply(stream)
+
+    def command(self, *args: str | bytes) -> Any:
+        if not self.breaker.allow():
+            raise ConnectionError(f"Cache backend {self.host}:{self.port} is unavailable.")
+        try:
+            self._connection()
+            reply = self._send(*args)
+        except RedisError:
+            # The server answered, so it is reachable.
+            self.breaker.record_success()
+            raise
+        except (OSError, ConnectionError):
+            # A connection with an unanswered command cannot be reused.
+            self._close()
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return reply
+
+    def get(self, key: str) -> bytes | None:
+        value = self.command("GET", key)
+        return None if value is None else bytes(value)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.command("SET", key, value, "PX", str(max(1, int(ttl * 1000))))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return self.command("SET", key, value, "PX", str(max(1, int(ttl * 1000))), "NX") == "OK"
+
+    def delete(self, key: str) -> None:
+        self.command("DEL", key)
+
+
+_lock = threading.Lock()
+_backend: CacheBackend | None = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """The process-wide backend for `ALPHASYNTH_CACHE_URL` (`memory://` or `redis://...`)."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            settings = get_settings()
+            url = settings.cache_url or "memory://"
+            if url.startswith("memory://"):
+                _backend = MemoryBackend()
+            else:
+                _backend = RedisBackend(
+                    url, timeout=settings.cache_timeout, retry_after=settings.cache_retry_after
+                )
+        return _backend
+
+
+def reset_cache_backend() -> None:
+    global _backend
+    with _lock:
+        _backend = None
@@ -0,0 +1,99 @@
+import logging
+import threading
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from .clients import get_chat_model
+from .deadline import DeadlineExceeded
+from .llm import invoke_llm, model_name
+from .metrics import LLM_CASCADE
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Returns why an answer is not good enough, or None to accept it.
+Validator = Callable[[str], str | None]
+
+
+class ModelCascade:
+    """
+    The chat models an agent may answer with, cheapest first. A prompt goes to the
+    cheapest model, and is sent to the next one only when the answer fails `validate`
+    or the call fails. The last, strongest model's answer is always returned.
+
+    Prompts estimated above `max_fast_prompt_tokens` skip straight to the strongest model.
+    Every escalation is counted on `/metrics` and logged with the agent's escalation rate.
+    """
+
+    def __init__(
+        self, agent: str, models: Sequence[str], max_fast_prompt_tokens: int | None = None
+    ) -> None:
+        if not models:
+            raise ValueError(f"The model cascade of '{agent}' needs at least one model.")
+        self.agent = agent
+        self.llms: list[Any] = [get_chat_model(model) for model in models]
+        self.max_fast_prompt_tokens = max_fast_prompt_tokens
+        self.calls = 0
+        # Calls that needed more than the cheapest model.
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def strongest(self) -> Any:
+        return self.llms[-1]
+
+    @strongest.setter
+    def strongest(self, llm: Any) -> None:
+        self.llms[-1] = llm
+
+    @property
+    def escalation_rate(self) -> float:
+        with self._lock:
+            return self.escalations / self.calls if self.calls else 0.0
+
+    def _escalate(self, llm: Any, reason: str, first: bool) -> None:
+        with self._lock:
+            self.escalations += first
+            rate = self.escalations / self.calls
+        LLM_CASCADE.inc(self.agent, model_name(llm), "escalated")
+        logger.info(
+            f"{self.agent}: escalating from {model_name(llm)} ({reason}); "
+            f"escalation rate {rate:.1%} over {self.calls} calls"
+        )
+
+    def invoke(
+        self,
+        prompt: str,
+        validate: Validator | None = None,
+        response_format: dict[str, Any] | None = None,
+    ) -> str:
+        with self._lock:
+            self.calls += 1
+        tiers = self.llms
+        limit = self.max_fast_prompt_tokens
+        if len(tiers) > 1 and limit is not None and estimate_tokens(prompt) > limit:
+            self._escalate(tiers[0], "prompt too large", first=True)
+            tiers = tiers[-1:]
+        for position, llm in enumerate(tiers[:-1]):
+            try:
+                answer = invoke_llm(llm, prompt, response_format)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                self._escalate(llm, f"call failed: {e}", first=position == 0)
+                continue
+            reason = validate(answer) if validate is not None else None
+            if reason is None:
+                LLM_CASCADE.inc(self.agent, model_name(llm), "accepted")
+                return answer
+            self._escalate(llm, reason, first=position == 0)
+        answer = invoke_llm(tiers[-1], prompt, response_format)
+        LLM_CASCADE.inc(self.agent, model_name(tiers[-1]), "accepted")
+        return answer
+
+
+def missing_sections(text: str, sections: Sequence[str]) -> str | None:
+    """A validator result naming the `sections` headings absent from a markdown answer."""
+    lowered = text.lower()
+    missing = [section for section in sections if section.lower() not in lowered]
+    return f"missing sections: {', '.join(missing)}" if missing else None
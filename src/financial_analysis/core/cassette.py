@@ -0,0 +1,246 @@
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+from .config import get_settings
+from .deadline import DeadlineExceeded, clamp_timeout
+from .fingerprint import fingerprint
+from .resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """A call made in replay mode that the cassette has no recording of."""
+
+
+class RecordedError(RuntimeError):
+    """Replays a recorded exception whose type cannot be raised again in this process."""
+
+
+def _error_type(error: BaseException) -> str:
+    return f"{type(error).__module__}:{type(error).__qualname__}"
+
+
+def _replay_error(error_type: str, message: str) -> Exception:
+    """The recorded exception, rebuilt from its type if that type is loaded here."""
+    module, _, qualname = error_type.partition(":")
+    cls: Any = sys.modules.get(module)
+    for name in qualname.split("."):
+        cls = getattr(cls, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        with suppress(Exception):
+            return cls(message)
+    return RecordedError(f"{error_type}: {message}")
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class Cassette:
+    """
+    On-disk recordings of external calls, keyed by (kind, fingerprint of the request).
+    In `record` mode every call is made and its response and latency are stored; in
+    `replay` mode responses are served from the recordings, after the recorded latency
+    or at once with `latency="zero"`. Payloads are stored as compressed JSON in SQLite.
+    Calls that raised are recorded with the exception's type and message and raise it
+    again on replay, except for deadline and open-circuit errors, which come from this
+    process rather than from the upstream.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", latency: str = "recorded") -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'; expected one of {MODES}.")
+        if latency not in ("recorded", "zero"):
+            raise ValueError(f"Unknown replay latency '{latency}'; expected recorded or zero.")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS calls (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                seconds REAL NOT NULL,
+                recorded_at REAL NOT NULL,
+                error TEXT,
+                PRIMARY KEY (kind, key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def put(
+        self, kind: str, key: str, payload: Any, seconds: float, error: str | None = None
+    ) -> None:
+        """Records a response, or with `error` (an exception type) the message it raised."""
+        blob = zlib.compress(json.dumps(payload, default=str).encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO calls (kind, key, payload, seconds, recorded_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, blob, seconds, time.time(), error),
+            )
+            self._conn.commit()
+
+    def get(self, kind: str, key: str) -> tuple[Any, float, str | None] | None:
+        """The recorded payload, latency and, for a call that raised, its exception type."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, seconds, error FROM calls WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1], row[2]
+
+    def entries(self, kind: str) -> list[tuple[Any, float]]:
+        """Every recording of `kind`, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload, seconds FROM calls WHERE kind = ? AND error IS NULL "
+                "ORDER BY recorded_at",
+                (kind,),
+            ).fetchall()
+        return [(json.loads(zlib.decompress(payload)), seconds) for payload, seconds in rows]
+
+    def call(
+        self,
+        kind: str,
+        request: Any,
+        fn: Callable[[], T],
+        encode: Callable[[T], Any] = _identity,
+        decode: Callable[[Any], T] = _identity,
+    ) -> T:
+        """Makes, records or replays the call `fn`, identified by `kind` and `request`."""
+        if self.mode == "off":
+            return fn()
+        key = fingerprint(kind, request)
+        if self.replaying:
+            recorded = self.get(kind, key)
+            if recorded is None:
+                raise CassetteMiss(f"No {kind} call recorded for {str(request)[:200]!r}.")
+            payload, seconds, error = recorded
+            if self.latency == "recorded" and seconds > 0:
+                time.sleep(clamp_timeout(seconds) or 0.0)
+            if error is not None:
+                raise _replay_error(error, payload)
+            return decode(payload)
+
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            if not isinstance(e, DeadlineExceeded | CircuitOpenError):
+                self._record(kind, key, str(e), time.perf_counter() - started, _error_type(e))
+            raise
+        self._record(kind, key, result, time.perf_counter() - started, encode=encode)
+        return result
+
+    def _record(
+        self,
+        kind: str,
+        key: str,
+        result: Any,
+        seconds: float,
+        error: str | None = None,
+        encode: Callable[[Any], Any] = _identity,
+    ) -> None:
+        try:
+            self.put(kind, key, encode(result), seconds, error)
+        except Exception as e:
+            logger.warning(f"Could not record {kind} call: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CassetteEmbeddings(Embeddings):
+    """Routes an embeddings model's calls through the active cassette."""
+
+    def __init__(self, embeddings: Embeddings, name: str = "embeddings") -> None:
+        self.embeddings = embeddings
+        self.name = name
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return cassette_call(
+            "embeddings", (self.name, texts), lambda: self.embeddings.embed_documents(texts)
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        return cassette_call(
+            "embeddings", (self.name, [text]), lambda: [self.embeddings.embed_query(text)]
+        )[0]
+
+
+_lock = threading.Lock()
+_cassette: Cassette | None = None
+_configured = False
+
+
+def get_cassette() -> Cassette | None:
+    """The process-wide cassette: the one installed with `set_cassette`, else from settings."""
+    global _cassette, _configured
+    with _lock:
+        if not _configured:
+            settings = get_settings()
+            if settings.cassette_mode != "off":
+                path = settings.cassette_path or Path(settings.state_dir) / "cassette.db"
+                _cassette = Cassette(path, settings.cassette_mode, settings.cassette_latency)
+            _configured = True
+        return _cassette
+
+
+def set_cassette(cassette: Cassette | None) -> None:
+    global _cassette, _configured
+    with _lock:
+        _cassette, _configured = cassette, True
+
+
+def reset_cassette() -> None:
+    """Forgets the installed cassette; the next `get_cassette` reads the settings again."""
+    global _cassette, _configured
+    with _lock:
+        _cassette, _configured = None, False
+
+
+def cassette_call(
+    kind: str,
+    request: Any,
+    fn: Callable[[], T],
+    encode: Callable[[T], Any] = _identity,
+    decode: Callable[[Any], T] = _identity,
+) -> T:
+    """Makes the call `fn` through the active cassette, or directly if there is none."""
+    cassette = get_cassette()
+    if cassette is None:
+        return fn()
+    return cassette.call(kind, request, fn, encode, decode)
@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import TYPE_CHECKING
+
+import httpx
+from dotenv import load_dotenv
+from pydantic import SecretStr
+
+from .config import get_settings
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+load_dotenv()
+
+_lock = threading.Lock()
+_http_client: httpx.Client | None = None
+_http_async_client: httpx.AsyncClient | None = None
+_chat_models: dict[tuple[str, str], "ChatOpenAI"] = {}
+_embeddings: dict[tuple[str, int | None, str], "OpenAIEmbeddings"] = {}
+
+
+def openai_api_key() -> SecretStr:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise OSError("OPENAI_API_KEY environment variable is not set.")
+    return SecretStr(api_key)
+
+
+def _limits_and_timeout() -> tuple[httpx.Limits, httpx.Timeout]:
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(settings.http_read_timeout, connect=settings.http_connect_timeout)
+    return limits, timeout
+
+
+def http_client() -> httpx.Client:
+    """The keep-alive connection pool shared by every synchronous OpenAI client."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            limits, timeout = _limits_and_timeout()
+            _http_client = httpx.Client(limits=limits, timeout=timeout)
+        return _http_client
+
+
+def http_async_client() -> httpx.AsyncClient:
+    """The keep-alive connection pool shared by every asynchronous OpenAI client."""
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None:
+            limits, timeout = _limits_and_timeout()
+            _http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return _http_async_client
+
+
+def get_chat_model(model: str) -> "ChatOpenAI":
+    """
+    The shared chat client for `model`. All agents asking for the same model get the same
+    instance, and all instances reuse the same connection pools.
+    """
+    from langchain_openai import ChatOpenAI
+
+    api_key = openai_api_key()
+    key = (model, api_key.get_secret_value())
+    sync_client, async_client = http_client(), http_async_client()
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatOpenAI(
+                model=model,
+                api_key=api_key,
+                max_retries=get_settings().llm_max_retries,
+                http_client=sync_client,
+                http_async_client=async_client,
+            )
+        return _chat_models[key]
+
+
+def get_embeddings(
+    model: str = "text-embedding-3-small", dimensions: int | None = None
+) -> "OpenAIEmbeddings":
+    """
+    The shared embeddings client for `model`, on the same connection pools. `dimensions`
+    asks a text-embedding-3 model for shortened vectors.
+    """
+    from langchain_openai import OpenAIEmbeddings
+
+    api_key = openai_api_key()
+    key = (model, dimensions, api_key.get_secret_value())
+    sync_client, async_client = http_client(), http_async_client()
+    with _lock:
+        if key not in _embeddings:
+            _embeddings[key] = OpenAIEmbeddings(
+                model=model,
+                dimensions=dimensions,
+                openai_api_key=api_key,
+                max_retries=get_settings().llm_max_retries,
+                http_client=sync_client,
+                http_async_client=async_client,
+            )
+        return _embeddings[key]
+
+
+def close_clients() -> None:
+    """Closes the shared pools and forgets every client built on them."""
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        # The async pool is left to the garbage collector: closing it needs the event loop
+        # that opened its connections, which may no longer be running.
+        _http_async_client = None
+        _chat_models.clear()
+        _embeddings.clear()
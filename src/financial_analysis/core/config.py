@@ -0,0 +1,118 @@
+import json
+import os
+import typing
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel
+
+ENV_PREFIX = "ALPHASYNTH_"
+
+
+class Settings(BaseModel):
+    """
+    Runtime settings for the orchestrator and its agents.
+
+    Every field can be overridden with an ``ALPHASYNTH_<FIELD_NAME>`` environment variable.
+    List fields take comma-separated values and dict fields take JSON.
+    """
+
+    news_cache_ttl: float = 900.0
+    news_analysis_ttl: float = 24 * 3600.0
+    news_query_timeout: float = 8.0
+    news_token_budget: int = 1500
+    market_cache_ttl: float = 300.0
+    fundamentals_cache_ttl: float = 6 * 3600.0
+    research_cache_ttl: float = 3600.0
+    cache_url: str | None = None
+    cache_prefix: str = "alphasynth"
+    cache_timeout: float = 0.5
+    cache_lock_timeout: float = 10.0
+    cache_retry_after: float = 5.0
+    retrieval_socket: str | None = None
+    retrieval_timeout: float = 10.0
+    retrieval_batch_window_ms: float = 5.0
+    retrieval_max_batch: int = 32
+    embedding_provider: str = "openai"
+    embedding_model: str | None = None
+    embedding_dim: int | None = None
+
+    state_dir: str = ".alphasynth"
+    report_fresh_for: float = 900.0
+    report_max_stale: float = 24 * 3600.0
+    max_reports: int = 1000
+    report_hit_half_life: float = 24 * 3600.0
+    stage_max_age: float = 7 * 24 * 3600.0
+    warmup_on_start: bool = False
+    required_agents: list[str] = ["market", "news", "risk", "synth"]
+    node_timeout: float = 120.0
+    default_deadline_ms: int | None = None
+    pipeline_workers: int = 16
+    digest_token_budget: int = 1200
+
+    breaker_failure_threshold: int = 5
+    breaker_reset_after: float = 30.0
+    hedge_percentiles: dict[str, float] = {"yfinance": 0.95, "duckduckgo": 0.95}
+    hedge_min_samples: int = 20
+    upstream_workers: int = 32
+
+    llm_rpm: dict[str, float] = {}
+    llm_tpm: dict[str, float] = {}
+    llm_max_concurrency: int = 16
+    llm_completion_tokens: int = 500
+    llm_max_retries: int = 2
+    llm_cascades: dict[str, list[str]] = {
+        "research": ["gpt-4o-mini", "gpt-4o"],
+        "risk": ["gpt-4o-mini", "gpt-4o"],
+        "synth": ["gpt-4o-mini", "gpt-4o"],
+    }
+    llm_cascade_max_prompt_tokens: dict[str, int] = {}
+    risk_min_confidence: str = "Medium"
+
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 5.0
+    http_read_timeout: float = 60.0
+
+    job_workers: int = 2
+    job_lease: float = 900.0
+    job_max_attempts: int = 3
+
+    profiling_enabled: bool = False
+    profiling_token: str | None = None
+    profile_keep: int = 50
+
+    cassette_mode: str = "off"
+    cassette_path: str | None = None
+    cassette_latency: str = "recorded"
+
+    watchlist: list[str] = []
+    prefetch_interval: float = 900.0
+    prefetch_concurrency: int = 8
+    prefetch_research_queries: list[str] = []
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] | None = None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values: dict[str, Any] = {}
+        for name, field in cls.model_fields.items():
+            raw = environ.get(f"{ENV_PREFIX}{name.upper()}")
+            if raw is not None:
+                values[name] = _parse_env_value(raw, field.annotation)
+        return cls(**values)
+
+
+def _parse_env_value(raw: str, annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin is list:
+        return [item.strip() for item in raw.split(",") if item.strip()]
+    if origin is dict:
+        return json.loads(raw)
+    return raw
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings.from_env()
@@ -0,0 +1,59 @@
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started after the request deadline has passed."""
+
+
+def current_deadline() -> float | None:
+    """The active deadline as a `time.monotonic()` timestamp, if any."""
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(at: float | None) -> Iterator[None]:
+    """Applies a deadline to the enclosed work. Nested scopes can only tighten it."""
+    current = _deadline.get()
+    if at is None or (current is not None and current <= at):
+        yield
+        return
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_after(seconds: float | None) -> AbstractContextManager[None]:
+    return deadline_scope(None if seconds is None else time.monotonic() + seconds)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline() -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+
+
+def clamp_timeout(timeout: float | None) -> float | None:
+    """Shortens `timeout` to the time left before the deadline, failing if none is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,47 @@
+import threading
+from collections.abc import Callable
+from typing import Generic, TypeVar, cast
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Builds a value with `factory` on first use, at most once even under concurrent
+    access. A failed build is remembered in `error` and retried on the next `get`.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str = "") -> None:
+        self.factory = factory
+        self.name = name
+        self.error: str | None = None
+        self._value: T | None = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        self._value = self.factory()
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+                    self.error = None
+                    self._loaded = True
+        return cast(T, self._value)
+
+    def status(self) -> str:
+        if self._loaded:
+            return "loaded"
+        return f"error: {self.error}" if self.error else "not_loaded"
+
+
+def resolve(value: T | Lazy[T]) -> T:
+    """Returns `value`, building it first if it is a `Lazy`."""
+    return value.get() if isinstance(value, Lazy) else value
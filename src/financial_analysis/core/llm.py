@@ -0,0 +1,90 @@
+import json
+import time
+from typing import Any
+
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+from .cassette import cassette_call
+from .config import get_settings
+from .deadline import clamp_timeout
+from .metrics import LLM_SECONDS, LLM_TOKENS
+from .resilience import upstream
+from .scheduler import get_scheduler
+from .tokens import estimate_tokens
+
+
+def model_name(llm: Any) -> str:
+    name = getattr(llm, "model_name", None)
+    return name if isinstance(name, str) else "default"
+
+
+def used_tokens(response: Any) -> int | None:
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and isinstance(usage.get("total_tokens"), int):
+        return int(usage["total_tokens"])
+    return None
+
+
+def record_usage(model: str, response: Any) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        return
+    for kind, key in (("prompt", "input_tokens"), ("completion", "output_tokens")):
+        if isinstance(usage.get(key), int):
+            LLM_TOKENS.inc(model, kind, amount=usage[key])
+
+
+def json_schema_format(model: type[BaseModel]) -> dict[str, Any]:
+    """The `response_format` that makes the API answer with JSON valid for `model`."""
+    schema = model.model_json_schema()
+    schema["additionalProperties"] = False
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": schema, "strict": True},
+    }
+
+
+def encode_message(message: Any) -> dict[str, Any]:
+    return {"content": message.content, "usage_metadata": message.usage_metadata}
+
+
+def decode_message(data: dict[str, Any]) -> AIMessage:
+    return AIMessage(content=data["content"], usage_metadata=data["usage_metadata"])
+
+
+def invoke_llm(llm: Any, prompt: str, response_format: dict[str, Any] | None = None) -> str:
+    """
+    Sends a single human message to a chat model once the LLM scheduler admits it, bounded
+    by the request deadline and guarded by the OpenAI circuit breaker. Under an active
+    cassette the call is recorded or replayed by (model, prompt).
+
+    `response_format` is passed to the API as is, e.g. a JSON schema the answer must follow.
+    """
+    model = model_name(llm)
+    estimated = estimate_tokens(prompt) + get_settings().llm_completion_tokens
+    scheduler = get_scheduler()
+    started = time.perf_counter()
+    with scheduler.slot(model, estimated):
+        kwargs: dict[str, Any] = {}
+        timeout = clamp_timeout(None)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        key: tuple[str, ...] = (model, prompt)
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+            key = (*key, json.dumps(response_format, sort_keys=True))
+        response = cassette_call(
+            "llm",
+            key,
+            lambda: upstream("openai").call(llm.invoke, [HumanMessage(content=prompt)], **kwargs),
+            encode_message,
+            decode_message,
+        )
+    LLM_SECONDS.observe(time.perf_counter() - started, model)
+    record_usage(model, response)
+
+    actual = used_tokens(response)
+    if actual is not None:
+        scheduler.settle(model, estimated, actual)
+    return str(response.content)
@@ -0,0 +1,305 @@
+import bisect
+import functools
+import threading
+import time
+import weakref
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, ParamSpec, Protocol, TypeVar
+
+from .profiling import profile_span
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[Labels, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                line = f"{self.name}{_format_labels(self.labelnames, labels)}"
+                lines.append(f"{line} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[labels] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(labels, []))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    label_text = _format_labels(self.labelnames, labels, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(self._sums[labels])}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A gauge whose samples are read from `collect` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels,
+        collect: Callable[[], dict[Labels, float]],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.collect().items()):
+            line = f"{self.name}{_format_labels(self.labelnames, labels)}"
+            lines.append(f"{line} {_format_value(value)}")
+        return lines
+
+
+class CounterFunc(Gauge):
+    """A counter whose totals are read from `collect` at scrape time; they never decrease."""
+
+    kind = "counter"
+
+
+class _Metric(Protocol):
+    def render(self) -> list[str]: ...
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+class _CacheStats(Protocol):
+    hits: int
+    misses: int
+
+
+_caches: dict[str, weakref.WeakSet[Any]] = defaultdict(weakref.WeakSet)
+
+
+def track_cache(name: str, cache: _CacheStats) -> None:
+    """Exports the hit and miss counts of `cache`, summed with other caches of that name."""
+    _caches[name].add(cache)
+
+
+def _cache_counts() -> dict[str, tuple[int, int]]:
+    totals: dict[str, tuple[int, int]] = {}
+    for name, caches in list(_caches.items()):
+        members = list(caches)
+        totals[name] = (sum(c.hits for c in members), sum(c.misses for c in members))
+    return totals
+
+
+def _cache_requests() -> dict[Labels, float]:
+    samples: dict[Labels, float] = {}
+    for name, (hits, misses) in _cache_counts().items():
+        samples[(name, "hit")] = hits
+        samples[(name, "miss")] = misses
+    return samples
+
+
+def _cache_hit_ratio() -> dict[Labels, float]:
+    return {
+        (name,): hits / (hits + misses)
+        for name, (hits, misses) in _cache_counts().items()
+        if hits + misses
+    }
+
+
+REGISTRY = Registry()
+
+SPAN_SECONDS = REGISTRY.register(
+    Histogram("alphasynth_span_seconds", "Duration of instrumented agent methods.", ("span",))
+)
+SPAN_ERRORS = REGISTRY.register(
+    Counter("alphasynth_span_errors_total", "Instrumented calls that raised.", ("span",))
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram("alphasynth_stage_seconds", "Duration of pipeline DAG nodes.", ("stage",))
+)
+STAGE_RESULTS = REGISTRY.register(
+    Counter(
+        "alphasynth_stage_results_total",
+        "Fingerprinted pipeline stages by whether their stored output was reused.",
+        ("stage", "result"),
+    )
+)
+REPORT_REQUESTS = REGISTRY.register(
+    Counter(
+        "alphasynth_report_requests_total",
+        "Report requests by whether a fresh, stale or newly computed report was served.",
+        ("result",),
+    )
+)
+LLM_SECONDS = REGISTRY.register(
+    Histogram("alphasynth_llm_seconds", "Latency of LLM calls, including queueing.", ("model",))
+)
+LLM_TOKENS = REGISTRY.register(
+    Counter("alphasynth_llm_tokens_total", "LLM tokens used per model.", ("model", "kind"))
+)
+RISK_ASSESSMENTS = REGISTRY.register(
+    Counter(
+        "alphasynth_risk_assessments_total",
+        "Risk assessments by outcome: parsed, repaired, invalid (also after the repair) or "
+        "error (the LLM call failed).",
+        ("result",),
+    )
+)
+LLM_CASCADE = REGISTRY.register(
+    Counter(
+        "alphasynth_llm_cascade_total",
+        "Answers per agent and model in a model cascade, by whether they were accepted or "
+        "escalated to the next model.",
+        ("agent", "model", "result"),
+    )
+)
+REGISTRY.register(
+    CounterFunc(
+        "alphasynth_cache_requests_total",
+        "Lookups per in-memory cache since start.",
+        ("cache", "result"),
+        _cache_requests,
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "alphasynth_cache_hit_ratio",
+        "Share of lookups per in-memory cache that were hits.",
+        ("cache",),
+        _cache_hit_ratio,
+    )
+)
+
+_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    """
+    Collects the spans recorded by the enclosed work, including DAG nodes started from
+    it, into the yielded dict as total seconds per span once the block exits.
+    """
+    spans: list[tuple[str, float]] = []
+    totals: dict[str, float] = {}
+    token = _timings.set(spans)
+    try:
+        yield totals
+    finally:
+        _timings.reset(token)
+        for name, seconds in list(spans):
+            totals[name] = round(totals.get(name, 0.0) + seconds, 6)
+
+
+def record_span(name: str, seconds: float) -> None:
+    spans = _timings.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+def timed(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Records each call's duration in `alphasynth_span_seconds` and the request's timings,
+    and profiles the call when the request is being profiled.
+    """
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            started = time.perf_counter()
+            try:
+                with profile_span(name):
+                    return fn(*args, **kwargs)
+            except Exception:
+                SPAN_ERRORS.inc(name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                SPAN_SECONDS.observe(elapsed, name)
+                record_span(name, elapsed)
+
+        return wrapper
+
+    return decorator
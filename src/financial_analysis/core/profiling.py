@@ -0,0 +1,175 @@
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# From Python 3.12, cProfile hooks every thread and only one profiler can be enabled at a
+# time; before that, each thread needs a profiler of its own.
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class ProfilerBusy(RuntimeError):
+    """Another request is being profiled."""
+
+
+@dataclass
+class SpanTime:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall, 6),
+            "cpu_seconds": round(self.cpu, 6),
+            "wait_seconds": round(max(0.0, self.wall - self.cpu), 6),
+        }
+
+
+@dataclass
+class RequestProfile:
+    """
+    The profile of one request: cProfile statistics of its threads, and per span the
+    wall-clock and thread CPU time. The difference is time spent waiting, mostly on the
+    network calls made on the span's behalf.
+    """
+
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.time)
+    wall: float = 0.0
+    spans: dict[str, SpanTime] = field(default_factory=dict)
+    stats: pstats.Stats | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_span(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            span = self.spans.setdefault(name, SpanTime())
+            span.calls += 1
+            span.wall += wall
+            span.cpu += cpu
+
+    def add_stats(self, profiler: cProfile.Profile) -> None:
+        # pstats rejects a profiler that recorded nothing.
+        with self._lock, suppress(TypeError):
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+    def top_functions(self, limit: int = 30) -> list[dict[str, Any]]:
+        if self.stats is None:
+            return []
+        rows = []
+        for (filename, line, function), entry in self.stats.stats.items():
+            _, calls, total, cumulative, _ = entry
+            rows.append(
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "calls": calls,
+                    "total_seconds": round(total, 6),
+                    "cumulative_seconds": round(cumulative, 6),
+                }
+            )
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:limit]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "started_at": self.started_at,
+            "wall_seconds": round(self.wall, 6),
+            "spans": {name: span.as_dict() for name, span in sorted(self.spans.items())},
+            "top_functions": self.top_functions(),
+        }
+
+
+_active: ContextVar[RequestProfile | None] = ContextVar("profile", default=None)
+_profiling = threading.local()
+_busy = threading.Lock()
+
+
+@contextmanager
+def profile_request() -> Iterator[RequestProfile]:
+    """
+    Profiles the enclosed work and the spans it runs, including those on DAG threads.
+    One request is profiled at a time; on Python 3.12+ the profile also sees whatever
+    else the process runs meanwhile. Raises `ProfilerBusy` if a profile is in progress.
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("Another request is being profiled; try again shortly.")
+    profile = RequestProfile()
+    token = _active.set(profile)
+    started = time.perf_counter()
+    try:
+        with profile_span("request", process_wide=PROCESS_WIDE_PROFILER):
+            yield profile
+    finally:
+        profile.wall = time.perf_counter() - started
+        _active.reset(token)
+        _busy.release()
+
+
+@contextmanager
+def profile_span(name: str, process_wide: bool = False) -> Iterator[None]:
+    """
+    Under `profile_request`, times the block as span `name`. Unless a profiler already
+    covers this thread, the block also runs under cProfile. Otherwise a no-op.
+    """
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    profiler = None
+    if (process_wide or not PROCESS_WIDE_PROFILER) and not getattr(_profiling, "active", False):
+        profiler = cProfile.Profile()
+        _profiling.active = True
+        profiler.enable()
+    wall_started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        profile.add_span(
+            name, time.perf_counter() - wall_started, time.thread_time() - cpu_started
+        )
+        if profiler is not None:
+            profiler.disable()
+            _profiling.active = False
+            profile.add_stats(profiler)
+
+
+class ProfileStore:
+    """Keeps the `keep` most recent request profiles on disk, as pstats dumps and summaries."""
+
+    def __init__(self, path: str | Path, keep: int = 50) -> None:
+        self.path = Path(path)
+        self.keep = keep
+
+    def save(self, profile: RequestProfile) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        if profile.stats is not None:
+            profile.stats.dump_stats(self.path / f"{profile.id}.prof")
+        (self.path / f"{profile.id}.json").write_text(json.dumps(profile.summary()))
+        summaries = sorted(self.path.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for old in summaries[: max(0, len(summaries) - self.keep)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".prof").unlink(missing_ok=True)
+
+    def summary(self, profile_id: str) -> dict[str, Any] | None:
+        path = self.path / f"{profile_id}.json"
+        if not profile_id.isalnum() or not path.exists():
+            return None
+        return dict(json.loads(path.read_text()))
+
+    def stats_path(self, profile_id: str) -> Path | None:
+        path = self.path / f"{profile_id}.prof"
+        return path if profile_id.isalnum() and path.exists() else None
@@ -0,0 +1,207 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, TypeVar
+
+from .config import get_settings
+from .deadline import DeadlineExceeded, clamp_timeout, expired
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """The `q` quantile (0-1) of the window, or None until `min_samples` were recorded."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_after` seconds. After that a single trial call is let through: its success
+    closes the circuit again, its failure reopens it, and a trial that ends without an
+    answer either way is `release`d so that the next call becomes the trial.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self.clock() - self.opened_at < self.reset_after:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_after or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release(self) -> None:
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class Upstream:
+    """
+    Guards the outbound calls to one upstream service. Calls are rejected while its
+    circuit breaker is open. When `hedge_percentile` is set, a duplicate call is sent once
+    the first has been outstanding longer than that percentile of recent latencies, and
+    the first successful answer wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker | None = None,
+        latencies: LatencyTracker | None = None,
+        hedge_percentile: float | None = None,
+        max_workers: int = 32,
+    ) -> None:
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = latencies or LatencyTracker()
+        self.hedge_percentile = hedge_percentile
+        self.hedges = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"upstream-{name}"
+        )
+
+    def hedge_after(self) -> float | None:
+        if not self.hedge_percentile:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def _submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        context = contextvars.copy_context()
+        return self.executor.submit(context.run, fn, *args, **kwargs)
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit for {self.name} is open; skipping the call.")
+        # Only the upstream's own errors count against it. A call ended by the caller's
+        # deadline says nothing about the upstream, so it just frees a half-open trial.
+        try:
+            result = self._race(fn, *args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, Exception) and not isinstance(e, DeadlineExceeded) and not expired():
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _race(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        started = time.monotonic()
+        pending = {self._submit(fn, *args, **kwargs)}
+        hedge_after = self.hedge_after()
+        error: BaseException | None = None
+
+        while pending:
+            timeout = clamp_timeout(None)
+            if hedge_after is not None:
+                timeout = hedge_after if timeout is None else min(timeout, hedge_after)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.record(time.monotonic() - started)
+                    return future.result()
+                error = future.exception()
+
+            if not done:
+                if hedge_after is None:
+                    raise DeadlineExceeded(f"Request deadline exceeded waiting for {self.name}.")
+                logger.info(f"Hedging {self.name} call after {hedge_after:.2f}s.")
+                self.hedges += 1
+                pending.add(self._submit(fn, *args, **kwargs))
+                hedge_after = None
+
+        raise error if error is not None else RuntimeError(f"Call to {self.name} failed.")
+
+
+_upstreams: dict[str, Upstream] = {}
+_registry_lock = threading.Lock()
+
+
+def upstream(name: str) -> Upstream:
+    """The shared guard for an upstream, configured from the settings on first use."""
+    with _registry_lock:
+        if name not in _upstreams:
+            settings = get_settings()
+            _upstreams[name] = Upstream(
+                name,
+                breaker=CircuitBreaker(
+                    failure_threshold=settings.breaker_failure_threshold,
+                    reset_after=settings.breaker_reset_after,
+                ),
+                latencies=LatencyTracker(min_samples=settings.hedge_min_samples),
+                hedge_percentile=settings.hedge_percentiles.get(name),
+                max_workers=settings.upstream_workers,
+            )
+        return _upstreams[name]
+
+
+def reset_upstreams() -> None:
+    """Forgets all breaker and latency state."""
+    with _registry_lock:
+        for guard in _upstreams.values():
+            guard.executor.shutdown(wait=False)
+        _upstreams.clear()
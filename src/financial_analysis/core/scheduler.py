@@ -0,0 +1,215 @@
+import itertools
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from .config import get_settings
+from .deadline import DeadlineExceeded, remaining
+
+
+class Priority(IntEnum):
+    """Scheduling classes for LLM calls; lower values are served first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+    PREFETCH = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.BATCH)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Runs the enclosed LLM calls, and the DAG nodes started from here, at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to one minute's worth of capacity."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.clock = clock
+        self.level = per_minute
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken; requests above capacity wait for a full bucket."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    model: str = field(compare=False)
+    tokens: int = field(compare=False)
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls process-wide. At most `max_concurrency` calls run at once, and each
+    model's calls are bounded by optional requests-per-minute and tokens-per-minute
+    buckets. Waiting calls are admitted by priority class, then in arrival order; a model
+    that is out of budget does not hold up calls to other models.
+    """
+
+    def __init__(
+        self,
+        rpm: dict[str, float] | None = None,
+        tpm: dict[str, float] | None = None,
+        max_concurrency: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self._rpm = {model: TokenBucket(limit, clock) for model, limit in (rpm or {}).items()}
+        self._tpm = {model: TokenBucket(limit, clock) for model, limit in (tpm or {}).items()}
+        self._cond = threading.Condition()
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.admitted: dict[str, int] = {p.name.lower(): 0 for p in Priority}
+        self.wait_seconds: dict[str, float] = {p.name.lower(): 0.0 for p in Priority}
+        self.max_wait_seconds: dict[str, float] = {p.name.lower(): 0.0 for p in Priority}
+
+    def _budget_wait(self, model: str, tokens: int) -> float:
+        waits = [0.0]
+        if model in self._rpm:
+            waits.append(self._rpm[model].wait_time(1))
+        if model in self._tpm:
+            waits.append(self._tpm[model].wait_time(tokens))
+        return max(waits)
+
+    def _next_admission(self, waiter: _Waiter) -> float | None:
+        """0 if `waiter` may run now, else seconds to wait (None: until notified)."""
+        if self.in_flight >= self.max_concurrency:
+            return None
+        seen_models: set[str] = set()
+        for other in sorted(self._waiters):
+            if other.model in seen_models:
+                continue
+            seen_models.add(other.model)
+            wait = self._budget_wait(other.model, other.tokens)
+            if other is waiter:
+                return wait
+            if wait <= 0:
+                return None
+        return None
+
+    @contextmanager
+    def slot(self, model: str, tokens: int, priority: Priority | None = None) -> Iterator[None]:
+        """
+        Blocks until the call may run and holds a concurrency slot for its duration.
+        Raises DeadlineExceeded if the request deadline passes while queued.
+        """
+        priority = current_priority() if priority is None else priority
+        waiter = _Waiter(int(priority), next(self._seq), model, tokens)
+        queued_at = self.clock()
+        with self._cond:
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    wait = self._next_admission(waiter)
+                    if wait is not None and wait <= 0:
+                        break
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded(
+                            "Request deadline exceeded waiting for an LLM slot."
+                        )
+                    timeouts = [t for t in (wait, left) if t is not None]
+                    self._cond.wait(min(timeouts) if timeouts else None)
+            finally:
+                self._waiters.remove(waiter)
+                self._cond.notify_all()
+
+            if model in self._rpm:
+                self._rpm[model].take(1)
+            if model in self._tpm:
+                self._tpm[model].take(tokens)
+            self.in_flight += 1
+            waited = self.clock() - queued_at
+            name = priority.name.lower()
+            self.admitted[name] += 1
+            self.wait_seconds[name] += waited
+            self.max_wait_seconds[name] = max(self.max_wait_seconds[name], waited)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def settle(self, model: str, estimated: int, actual: int) -> None:
+        """Corrects a model's token budget once the real usage of a call is known."""
+        with self._cond:
+            if model in self._tpm:
+                self._tpm[model].take(actual - estimated)
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            depth = {p.name.lower(): 0 for p in Priority}
+            for waiter in self._waiters:
+                depth[Priority(waiter.priority).name.lower()] += 1
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": depth,
+                "admitted": dict(self.admitted),
+                "mean_wait_seconds": {
+                    name: self.wait_seconds[name] / count if count else 0.0
+                    for name, count in self.admitted.items()
+                },
+                "max_wait_seconds": dict(self.max_wait_seconds),
+            }
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler, configured from the settings on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            settings = get_settings()
+            _scheduler = LLMScheduler(
+                rpm=settings.llm_rpm,
+                tpm=settings.llm_tpm,
+                max_concurrency=settings.llm_max_concurrency,
+            )
+        return _scheduler
+
+
+def reset_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
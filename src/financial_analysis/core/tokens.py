@@ -0,0 +1,19 @@
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_budget(items: list[str], max_tokens: int) -> list[str]:
+    """Keeps items in order until their estimated token count would exceed `max_tokens`."""
+    kept: list[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item)
+        if used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    return kept
@@ -0,0 +1,154 @@
+"""
+Embedding providers for the research index. An index can only be searched with the model
+that embedded it, so every index records the provider, model and dimensions that built
+it, and `load_index` refuses to open it with different ones.
+
+    openai   the OpenAI embeddings API, text-embedding-3-small by default
+    hashing  a local, deterministic feature-hashing embedder: no network calls and no
+             model files, so indexes can be built, served and benchmarked offline
+"""
+
+import json
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .index import normalize
+
+PROVIDERS = ("openai", "hashing")
+DEFAULT_MODELS = {"openai": "text-embedding-3-small", "hashing": "hashing-v1"}
+OPENAI_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+HASHING_DIM = 512
+# Plain FAISS stores record their embeddings next to the index; older ones record
+# nothing and were all built by scripts/vector_store.py with text-embedding-3-small.
+INFO_FILE = "embeddings.json"
+LEGACY_INFO = {"embedding_provider": "openai", "embedding_model": "text-embedding-3-small"}
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+class EmbeddingMismatch(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class EmbeddingSpec:
+    """Which embeddings an index is built and queried with. `dim` is None if unknown."""
+
+    provider: str
+    model: str
+    dim: int | None
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "embedding_provider": self.provider,
+            "embedding_model": self.model,
+            "embedding_dim": self.dim,
+        }
+
+    def check(self, info: Mapping[str, Any], source: str | Path) -> None:
+        """Raises EmbeddingMismatch unless the index `info` was built with these embeddings."""
+        recorded = {**LEGACY_INFO, **{k: v for k, v in info.items() if v is not None}}
+        provider, model = recorded["embedding_provider"], recorded["embedding_model"]
+        dim = recorded.get("embedding_dim", recorded.get("full_dim"))
+        if (
+            provider != self.provider
+            or model != self.model
+            or (dim is not None and self.dim is not None and dim != self.dim)
+        ):
+            raise EmbeddingMismatch(
+                f"{source} was embedded with {provider}/{model} ({dim or '?'} dimensions), "
+                f"but the configured embeddings are {self.provider}/{self.model} "
+                f"({self.dim or '?'} dimensions). Rebuild the index, or set "
+                f"ALPHASYNTH_EMBEDDING_PROVIDER, ALPHASYNTH_EMBEDDING_MODEL and "
+                f"ALPHASYNTH_EMBEDDING_DIM to match it."
+            )
+
+
+def embedding_spec(
+    provider: str = "openai", model: str | None = None, dim: int | None = None
+) -> EmbeddingSpec:
+    """The spec for `provider`, with its default model and that model's dimensions."""
+    if provider not in PROVIDERS:
+        raise ValueError(f"Embedding provider must be one of {', '.join(PROVIDERS)}.")
+    model = model or DEFAULT_MODELS[provider]
+    if dim is None:
+        dim = HASHING_DIM if provider == "hashing" else OPENAI_DIMS.get(model)
+    return EmbeddingSpec(provider, model, dim)
+
+
+def get_embedding_model(spec: EmbeddingSpec) -> Embeddings:
+    """The embeddings model for `spec`; OpenAI models are the shared clients."""
+    if spec.provider == "hashing":
+        return HashingEmbeddings(spec.dim or HASHING_DIM)
+
+    from ..core.clients import get_embeddings
+
+    native = OPENAI_DIMS.get(spec.model)
+    return get_embeddings(spec.model, dimensions=spec.dim if spec.dim != native else None)
+
+
+def read_info(path: str | Path) -> dict[str, Any]:
+    """The embeddings recorded for the plain FAISS store at `path`, if any."""
+    info_path = Path(path) / INFO_FILE
+    return dict(json.loads(info_path.read_text())) if info_path.exists() else {}
+
+
+def write_info(path: str | Path, spec: EmbeddingSpec) -> None:
+    (Path(path) / INFO_FILE).write_text(json.dumps(spec.info(), indent=2))
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    digest = int.from_bytes(blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Hashes the words and word pairs of a text into `dim` signed buckets, damps repeated
+    terms logarithmically and normalizes the result. Texts sharing vocabulary get close
+    vectors. Hashing uses blake2b rather than Python's salted `hash`, so vectors are the
+    same in every process and on every machine.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM, batch_size: int = 256) -> None:
+        self.dim = dim
+        self.batch_size = batch_size
+
+    def _features(self, text: str) -> list[str]:
+        tokens = _TOKEN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:], strict=False)]
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        rows: list[int] = []
+        columns: list[int] = []
+        signs: list[float] = []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = _bucket(feature, self.dim)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(counts, (rows, columns), signs)
+        return normalize(np.sign(counts) * np.log1p(np.abs(counts)))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self.embed_batch(texts[start : start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
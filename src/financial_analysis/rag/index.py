@@ -0,0 +1,265 @@
+"""
+Two-stage vector index. A compact first stage holds every vector truncated to its
+leading `dim` components (text-embedding-3 vectors are trained so their prefixes remain
+useful embeddings), renormalized and optionally stored as float16 or int8. A search
+takes `oversample * k` candidates from it. The candidates are then rescored with the
+full-precision vectors, which stay on disk and are read through a memory map. Documents
+live in SQLite and are only read for the results.
+
+On-disk layout of an index directory:
+
+    index.json       format, dimensions, quantization and candidate oversampling
+    first_stage.faiss  FAISS index over the truncated vectors
+    vectors.npy      full-precision, normalized float32 vectors
+    documents.db     document id, text and metadata per vector
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+    from .embeddings import EmbeddingSpec
+
+FORMAT = "two_stage"
+QUANTIZATIONS = ("none", "fp16", "int8")
+METADATA_FILE = "index.json"
+EMBED_BATCH = 512
+TRAIN_SAMPLE = 100_000
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length, so inner products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """The leading `dim` components of each vector, renormalized."""
+    return normalize(np.asarray(vectors)[..., :dim])
+
+
+def _first_stage(dim: int, quantization: str) -> Any:
+    import faiss
+
+    if quantization == "none":
+        return faiss.IndexFlatIP(dim)
+    kind = (
+        faiss.ScalarQuantizer.QT_fp16 if quantization == "fp16" else faiss.ScalarQuantizer.QT_8bit
+    )
+    return faiss.IndexScalarQuantizer(dim, kind, faiss.METRIC_INNER_PRODUCT)
+
+
+class TwoStageIndex:
+    """
+    Answers `similarity_search` like the FAISS store it replaces, and can be served by the
+    retrieval sidecar. Build one with `build` or `from_texts`; `load_index` opens it.
+    """
+
+    def __init__(
+        self, path: str | Path, embeddings: Embeddings | None, oversample: int | None = None
+    ) -> None:
+        import faiss
+
+        self.path = Path(path)
+        self.embeddings = embeddings
+        self.metadata: dict[str, Any] = json.loads((self.path / METADATA_FILE).read_text())
+        if self.metadata.get("format") != FORMAT:
+            raise ValueError(f"{self.path} is not a two-stage index.")
+        self.dim: int = self.metadata["dim"]
+        self.oversample: int = oversample or self.metadata["oversample"]
+        self.first_stage = faiss.read_index(str(self.path / "first_stage.faiss"))
+        self.vectors: np.ndarray = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self._db = sqlite3.connect(str(self.path / "documents.db"), check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build(
+        path: str | Path,
+        vectors: np.ndarray,
+        documents: Iterable[Document],
+        dim: int | None = None,
+        quantization: str = "int8",
+        oversample: int = 10,
+        info: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Writes an index over `vectors` (one row per document) to `path`. `dim` defaults
+        to the full dimension; `info` is recorded in the index metadata.
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {', '.join(QUANTIZATIONS)}.")
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        vectors_path = (path / "vectors.npy").resolve()
+        if not (isinstance(vectors, np.memmap) and Path(str(vectors.filename)) == vectors_path):
+            full = np.lib.format.open_memmap(
+                vectors_path, mode="w+", dtype=np.float32, shape=vectors.shape
+            )
+            for start in range(0, len(vectors), TRAIN_SAMPLE):
+                full[start : start + TRAIN_SAMPLE] = normalize(
+                    vectors[start : start + TRAIN_SAMPLE]
+                )
+            vectors = full
+        if isinstance(vectors, np.memmap):
+            vectors.flush()
+        full_dim = vectors.shape[1]
+        dim = min(dim or full_dim, full_dim)
+
+        import faiss
+
+        first_stage = _first_stage(dim, quantization)
+        if not first_stage.is_trained:
+            step = max(1, len(vectors) // TRAIN_SAMPLE)
+            first_stage.train(truncate(vectors[::step], dim))
+        for start in range(0, len(vectors), TRAIN_SAMPLE):
+            first_stage.add(truncate(vectors[start : start + TRAIN_SAMPLE], dim))
+        faiss.write_index(first_stage, str(path / "first_stage.faiss"))
+
+        db = sqlite3.connect(str(path / "documents.db"))
+        db.execute("DROP TABLE IF EXISTS documents")
+        db.execute(
+            "CREATE TABLE documents "
+            "(position INTEGER PRIMARY KEY, id TEXT, page_content TEXT, metadata TEXT)"
+        )
+        db.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, ?)",
+            (
+                (i, d.id or uuid.uuid4().hex, d.page_content, json.dumps(d.metadata))
+                for i, d in enumerate(documents)
+            ),
+        )
+        count = db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        db.commit()
+        db.close()
+        if count != len(vectors):
+            raise ValueError(f"Got {count} documents for {len(vectors)} vectors.")
+
+        metadata = {
+            "format": FORMAT,
+            "count": count,
+            "full_dim": full_dim,
+            "dim": dim,
+            "quantization": quantization,
+            "oversample": oversample,
+            **(info or {}),
+        }
+        (path / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+
+    @classmethod
+    def from_texts(
+        cls,
+        path: str | Path,
+        texts: Sequence[str],
+        embeddings: Embeddings,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+        dim: int | None = None,
+        quantization: str = "int8",
+        oversample: int = 10,
+        info: dict[str, Any] | None = None,
+    ) -> "TwoStageIndex":
+        """Embeds `texts` in batches straight into the on-disk vectors, then builds."""
+        path = Path(path).resolve()
+        path.mkdir(parents=True, exist_ok=True)
+        full: np.ndarray | None = None
+        for start in range(0, len(texts), EMBED_BATCH):
+            batch = normalize(
+                np.array(embeddings.embed_documents(list(texts[start : start + EMBED_BATCH])))
+            )
+            if full is None:
+                full = np.lib.format.open_memmap(
+                    path / "vectors.npy",
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(len(texts), batch.shape[1]),
+                )
+            full[start : start + len(batch)] = batch
+        if full is None:
+            raise ValueError("Cannot build an index without texts.")
+        metadatas = metadatas or [{} for _ in texts]
+        documents = (
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas, strict=True)
+        )
+        cls.build(path, full, documents, dim, quantization, oversample, info)
+        return cls(path, embeddings)
+
+    def __len__(self) -> int:
+        return int(self.first_stage.ntotal)
+
+    def memory_bytes(self) -> int:
+        """Bytes the first stage holds in memory; full vectors are only paged in."""
+        return int(self.first_stage.sa_code_size()) * len(self)
+
+    def _documents(self, positions: Sequence[int]) -> dict[int, Document]:
+        marks = ",".join("?" * len(positions))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT position, id, page_content, metadata FROM documents "  # noqa: S608
+                f"WHERE position IN ({marks})",
+                [int(p) for p in positions],
+            ).fetchall()
+        return {
+            row[0]: Document(id=row[1], page_content=row[2], metadata=json.loads(row[3]))
+            for row in rows
+        }
+
+    def search_positions(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Positions and full-precision scores of the top `k` vectors for each query row."""
+        queries = normalize(np.atleast_2d(queries))
+        candidates = min(len(self), max(k, k * self.oversample))
+        _, first = self.first_stage.search(truncate(queries, self.dim), candidates)
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, (query, found) in enumerate(zip(queries, first, strict=True)):
+            found = np.sort(found[found >= 0])
+            rescored = self.vectors[found] @ query
+            best = np.argsort(-rescored)[:k]
+            positions[row, : len(best)] = found[best]
+            scores[row, : len(best)] = rescored[best]
+        return positions, scores
+
+    def similarity_search_by_vector(
+        self, embedding: Sequence[float], k: int = 4
+    ) -> list[Document]:
+        positions, _ = self.search_positions(np.array(embedding, dtype=np.float32), k)
+        found = [int(p) for p in positions[0] if p >= 0]
+        documents = self._documents(found)
+        return [documents[p] for p in found]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        if self.embeddings is None:
+            raise RuntimeError("The index has no embeddings model attached.")
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k)
+
+
+def load_index(
+    path: str | Path, embeddings: Embeddings, spec: "EmbeddingSpec | None" = None
+) -> "FAISS | TwoStageIndex":
+    """
+    Opens the index at `path`: a two-stage index, or a plain LangChain FAISS store. With
+    `spec`, raises EmbeddingMismatch if the index was built with other embeddings.
+    """
+    from .embeddings import read_info
+
+    two_stage = (Path(path) / METADATA_FILE).exists()
+    if spec is not None:
+        info = json.loads((Path(path) / METADATA_FILE).read_text()) if two_stage else None
+        spec.check(info if info is not None else read_info(path), path)
+    if two_stage:
+        return TwoStageIndex(path, embeddings)
+
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS.load_local(str(path), embeddings=embeddings, allow_dangerous_deserialization=True)
@@ -0,0 +1,267 @@
+"""
+Retrieval sidecar: loads the FAISS index once and serves similarity searches to every
+API worker over a Unix socket, so the index and docstore are held in memory only once.
+
+Run it next to `uvicorn --workers N` and point the workers at it:
+
+    python -m financial_analysis.rag.sidecar --socket /run/alphasynth/retrieval.sock
+    ALPHASYNTH_RETRIEVAL_SOCKET=/run/alphasynth/retrieval.sock uvicorn ... --workers 4
+
+The protocol is one JSON object per line: requests carry `query` and `k`, responses
+carry `documents` (id, page_content, metadata) or `error`.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from langchain_core.documents import Document
+
+from ..core.deadline import clamp_timeout
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+    from .index import TwoStageIndex
+
+logger = logging.getLogger(__name__)
+
+
+def document_to_dict(document: Document) -> dict[str, Any]:
+    return {
+        "id": document.id,
+        "page_content": document.page_content,
+        "metadata": document.metadata,
+    }
+
+
+def document_from_dict(data: dict[str, Any]) -> Document:
+    return Document(
+        id=data.get("id"), page_content=data["page_content"], metadata=data["metadata"]
+    )
+
+
+@dataclass
+class _Pending:
+    query: str
+    k: int
+    done: threading.Event = field(default_factory=threading.Event)
+    documents: list[dict[str, Any]] = field(default_factory=list)
+    error: str | None = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_SocketServer"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                pending = self.server.retrieval.submit(str(request["query"]), int(request["k"]))
+                response: dict[str, Any] = (
+                    {"error": pending.error}
+                    if pending.error is not None
+                    else {"documents": pending.documents}
+                )
+            except (ValueError, KeyError) as e:
+                response = {"error": f"Bad request: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _SocketServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    retrieval: "RetrievalServer"
+
+
+class RetrievalServer:
+    """
+    Serves one in-memory vector store over a Unix socket. Queries arriving within
+    `batch_window` seconds of each other are embedded with a single embeddings call
+    (identical queries once) before each is searched in the index.
+    """
+
+    def __init__(
+        self,
+        vectorstore: "FAISS | TwoStageIndex",
+        socket_path: str | Path,
+        batch_window: float = 0.005,
+        max_batch: int = 32,
+    ) -> None:
+        self.vectorstore = vectorstore
+        self.socket_path = str(socket_path)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue: queue.Queue[_Pending] = queue.Queue()
+        self._server: _SocketServer | None = None
+        self._batcher: threading.Thread | None = None
+
+    def submit(self, query: str, k: int) -> _Pending:
+        """Queues a search for the next batch and waits for its result."""
+        pending = _Pending(query=query, k=k)
+        self._queue.put(pending)
+        pending.done.wait()
+        return pending
+
+    def _next_batch(self) -> list[_Pending]:
+        batch = [self._queue.get()]
+        closes_at = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            left = closes_at - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=left))
+            except queue.Empty:
+                break
+        return batch
+
+    def search_batch(self, batch: list[_Pending]) -> None:
+        try:
+            queries = list(dict.fromkeys(pending.query for pending in batch))
+            embeddings = self.vectorstore.embeddings
+            if embeddings is None:
+                raise RuntimeError("The vector store has no embeddings model attached.")
+            vectors = dict(zip(queries, embeddings.embed_documents(queries), strict=True))
+            for pending in batch:
+                documents = self.vectorstore.similarity_search_by_vector(
+                    vectors[pending.query], k=pending.k
+                )
+                pending.documents = [document_to_dict(d) for d in documents]
+        except Exception as e:
+            logger.warning(f"Retrieval batch of {len(batch)} failed: {e}")
+            for pending in batch:
+                pending.error = str(e)
+        finally:
+            self.batches += 1
+            for pending in batch:
+                pending.done.set()
+
+    def _batch_loop(self) -> None:
+        while True:
+            self.search_batch(self._next_batch())
+
+    def start(self) -> None:
+        """Binds the socket and serves in background threads."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        self._server = _SocketServer(self.socket_path, _Handler)
+        self._server.retrieval = self
+        if self._batcher is None:
+            # The batch loop outlives stop()/start() cycles and idles on the empty queue.
+            self._batcher = threading.Thread(
+                target=self._batch_loop, name="retrieval-batch", daemon=True
+            )
+            self._batcher.start()
+        threading.Thread(
+            target=self._server.serve_forever, name="retrieval-server", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class RetrievalClient:
+    """
+    Stands in for the FAISS store in `ResearchAgent`: `similarity_search` is answered by
+    the retrieval sidecar. Each thread keeps its own connection to it.
+    """
+
+    def __init__(self, socket_path: str | Path, timeout: float = 10.0) -> None:
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> Any:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = sock.makefile("rwb")
+            self._local.sock, self._local.conn = sock, conn
+        return conn
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = self._local.conn = None
+
+    def _request(self, query: str, k: int) -> dict[str, Any]:
+        conn = self._connection()
+        try:
+            self._local.sock.settimeout(clamp_timeout(self.timeout))
+            conn.write(json.dumps({"query": query, "k": k}).encode() + b"\n")
+            conn.flush()
+            line = conn.readline()
+            if not line:
+                raise ConnectionError("Retrieval sidecar closed the connection.")
+        except OSError:
+            # A connection with an unanswered request cannot be reused.
+            self._close()
+            raise
+        return dict(json.loads(line))
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        try:
+            response = self._request(query, k)
+        except ConnectionError:
+            # The sidecar may have restarted since this thread connected; retry once.
+            response = self._request(query, k)
+        if "error" in response:
+            raise RuntimeError(f"Retrieval sidecar failed: {response['error']}")
+        return [document_from_dict(d) for d in response["documents"]]
+
+
+def main() -> None:
+    from ..core.config import get_settings
+    from .embeddings import embedding_spec, get_embedding_model
+    from .index import load_index
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve the FAISS index to API workers.")
+    parser.add_argument("--socket", default=settings.retrieval_socket, required=False)
+    parser.add_argument("--index", default="vectorstore", help="Index directory under rag/.")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket or ALPHASYNTH_RETRIEVAL_SOCKET is required.")
+
+    logging.basicConfig(level=logging.INFO)
+    index_path = Path(__file__).resolve().parent / args.index
+    spec = embedding_spec(
+        settings.embedding_provider, settings.embedding_model, settings.embedding_dim
+    )
+    vectorstore = load_index(index_path, get_embedding_model(spec), spec)
+    server = RetrievalServer(
+        vectorstore,
+        args.socket,
+        batch_window=settings.retrieval_batch_window_ms / 1000,
+        max_batch=settings.retrieval_max_batch,
+    )
+    server.start()
+    logger.info(f"Serving {index_path} on {args.socket}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
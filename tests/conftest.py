@@ -0,0 +1,23 @@
+import pytest
+
+from src.financial_analysis.core.cache_backend import reset_cache_backend
+from src.financial_analysis.core.cassette import reset_cassette
+from src.financial_analysis.core.clients import close_clients
+from src.financial_analysis.core.resilience import reset_upstreams
+from src.financial_analysis.core.scheduler import reset_scheduler
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_state():
+    """Keeps shared clients, breaker, latency, scheduler, cache and cassette state from leaking."""
+    close_clients()
+    reset_upstreams()
+    reset_scheduler()
+    reset_cassette()
+    reset_cache_backend()
+    yield
+    close_clients()
+    reset_upstreams()
+    reset_scheduler()
+    reset_cassette()
+    reset_cache_backend()
@@ -0,0 +1,81 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.financial_analysis.api.agents import AgentRegistry
+from src.financial_analysis.core.config import Settings
+from src.financial_analysis.core.lazy import Lazy, resolve
+
+
+def test_lazy_builds_once_under_concurrent_access():
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    lazy = Lazy(factory, "thing")
+    results = []
+
+    def use():
+        barrier.wait()
+        results.append(lazy.get())
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1  # noqa: S101
+    assert all(result is results[0] for result in results)  # noqa: S101
+    assert lazy.status() == "loaded"  # noqa: S101
+
+
+def test_lazy_records_failure_and_retries():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("no index")
+        return "agent"
+
+    lazy = Lazy(factory)
+    assert lazy.status() == "not_loaded"  # noqa: S101
+
+    with pytest.raises(FileNotFoundError):
+        lazy.get()
+    assert lazy.status() == "error: FileNotFoundError: no index"  # noqa: S101
+
+    assert resolve(lazy) == "agent"  # noqa: S101
+    assert resolve("plain") == "plain"  # noqa: S101
+
+
+@patch(
+    "langchain_community.vectorstores.FAISS.load_local",
+    side_effect=Exception("Missing index"),
+)
+def test_warmup_reports_each_agent_and_isolates_failures(mock_load, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    agents = AgentRegistry(Settings())
+    assert not any(agent.loaded for agent in agents.all)  # noqa: S101
+
+    status = agents.warmup()
+
+    assert status["research"].startswith("error: FileNotFoundError")  # noqa: S101
+    for name in ("market", "news", "risk", "synth"):
+        assert status[name] == "loaded"  # noqa: S101
+    assert agents.failed == ["research"]  # noqa: S101
+    assert agents.ready  # noqa: S101
+    agents.settings = Settings(required_agents=["research", "market"])
+    assert not agents.ready  # noqa: S101
+
+
+def test_unbuilt_agents_count_as_ready():
+    agents = AgentRegistry(Settings())
+
+    assert agents.ready  # noqa: S101
+    assert agents.failed == []  # noqa: S101
@@ -0,0 +1,38 @@
+from src.financial_analysis.core.cache import TTLCache
+from src.financial_analysis.core.fingerprint import fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1  # noqa: S101
+    clock.now = 11
+    assert cache.get("a") is None  # noqa: S101
+    assert (cache.hits, cache.misses) == (1, 1)  # noqa: S101
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None  # noqa: S101
+    assert cache.get("a") == 1  # noqa: S101
+    assert len(cache) == 2  # noqa: S101
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint({"b": 1, "a": 2}) == fingerprint({"a": 2, "b": 1})  # noqa: S101
+    assert fingerprint("a") != fingerprint("b")  # noqa: S101
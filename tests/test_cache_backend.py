@@ -0,0 +1,229 @@
+import pickle
+import socketserver
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+
+from src.financial_analysis.core.cache import SharedCache, TTLCache, decode_value, encode_value
+from src.financial_analysis.core.cache_backend import MemoryBackend, RedisBackend
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Answers GET, SET [PX ms] [NX] and DEL like Redis, from the server's dict."""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.execute(args))
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.data: dict[bytes, tuple[float, bytes]] = {}
+        self.lock = threading.Lock()
+
+    def execute(self, args: list[bytes]) -> bytes:
+        command, key = args[0].upper(), args[1]
+        with self.lock:
+            if key in self.data and self.data[key][0] <= time.monotonic():
+                del self.data[key]
+            entry = self.data.get(key)
+            if command == b"GET":
+                return (
+                    b"$-1\r\n" if entry is None else b"$%d\r\n%s\r\n" % (len(entry[1]), entry[1])
+                )
+            if command == b"DEL":
+                return f":{int(self.data.pop(key, None) is not None)}\r\n".encode()
+            options = [arg.upper() for arg in args[3:]]
+            if b"NX" in options and entry is not None:
+                return b"$-1\r\n"
+            ttl = float(args[options.index(b"PX") + 4]) / 1000 if b"PX" in options else 1e9
+            self.data[key] = (time.monotonic() + ttl, args[2])
+            return b"+OK\r\n"
+
+
+@pytest.fixture
+def redis_url():
+    server = FakeRedis()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, redis_url):
+    return MemoryBackend() if request.param == "memory" else RedisBackend(redis_url)
+
+
+def test_backend_round_trip_and_expiry(backend):
+    backend.set("a", b"\x00binary", ttl=0.05)
+
+    assert backend.get("a") == b"\x00binary"  # noqa: S101
+    time.sleep(0.1)
+    assert backend.get("a") is None  # noqa: S101
+
+
+def test_backend_add_only_sets_absent_keys(backend):
+    assert backend.add("lock", b"first", ttl=10)  # noqa: S101
+    assert not backend.add("lock", b"second", ttl=10)  # noqa: S101
+    backend.delete("lock")
+    assert backend.add("lock", b"third", ttl=10)  # noqa: S101
+    assert backend.get("lock") == b"third"  # noqa: S101
+
+
+def test_shared_cache_namespaces_and_round_trips_agent_outputs(backend):
+    bars = SharedCache(backend, "market_bars", ttl=60)
+    retrieval = SharedCache(backend, "retrieval", ttl=60)
+    frame = pd.DataFrame({"close": [1.0, 2.0]}, index=pd.to_datetime(["2024-01-02", "2024-01-03"]))
+    documents = [Document(page_content="Revenue grew.", metadata={"page": 3})]
+
+    bars.set("AAPL", frame)
+    retrieval.set("AAPL", documents)
+
+    pd.testing.assert_frame_equal(bars.get("AAPL"), frame)
+    assert retrieval.get("AAPL") == documents  # noqa: S101
+    assert backend.get("alphasynth:retrieval:AAPL") is not None  # noqa: S101
+
+
+def test_values_round_trip_without_pickle():
+    frame = pd.DataFrame(
+        {"close": [1.5, float("nan")], "volume": [100, 200]},
+        index=pd.DatetimeIndex(["2024-01-02", "2024-01-03"], name="Date", tz="America/New_York"),
+    )
+    fundamentals = {"sector": "Technology", "market_cap": 3_000_000_000_000, "forward_pe": 28.5}
+
+    pd.testing.assert_frame_equal(decode_value(encode_value(frame)), frame)
+    assert decode_value(encode_value(fundamentals)) == fundamentals  # noqa: S101
+    with pytest.raises(TypeError):
+        encode_value(object())
+
+
+def test_pickled_entries_are_not_loaded(backend):
+    cache = SharedCache(backend, "retrieval", ttl=60)
+    backend.set("alphasynth:retrieval:AAPL", zlib.compress(pickle.dumps(["doc"])), 60)
+
+    assert cache.get("AAPL") is None  # noqa: S101
+    assert cache.errors == 1  # noqa: S101
+
+
+def test_replicas_compute_a_missing_key_once(backend):
+    replicas = [SharedCache(backend, "retrieval", ttl=60) for _ in range(2)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["result"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(lambda i: replicas[i % 2].get_or_compute("query", compute), range(8))
+        )
+
+    assert results == [["result"]] * 8  # noqa: S101
+    assert len(calls) == 1  # noqa: S101
+
+
+def test_slow_computes_do_not_hold_up_other_keys(backend):
+    caches = [TTLCache(ttl=60), SharedCache(backend, "retrieval", ttl=60)]
+    release = threading.Event()
+    # Another replica is computing "waited", so the shared cache polls for it.
+    backend.add("alphasynth:retrieval:waited:lock", b"other", 2)
+    threading.Timer(2, release.set).start()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        slow = [pool.submit(caches[0].get_or_compute, "slow", release.wait)]
+        slow.append(pool.submit(caches[1].get_or_compute, "slow", release.wait))
+        slow.append(pool.submit(caches[1].get_or_compute, "waited", lambda: ["late"]))
+        time.sleep(0.05)
+        started = time.monotonic()
+        for cache in caches:
+            for i in range(100):
+                assert cache.get_or_compute(f"key{i}", lambda: ["fast"]) == ["fast"]  # noqa: S101
+        elapsed = time.monotonic() - started
+        release.set()
+        backend.delete("alphasynth:retrieval:waited:lock")
+        for future in slow:
+            future.result()
+
+    assert elapsed < 0.5  # noqa: S101
+
+
+def test_uncacheable_results_are_recomputed():
+    cache: TTLCache[str] = TTLCache(ttl=60)
+    results = iter(["error", "value", "unused"])
+
+    def compute():
+        return next(results)
+
+    assert cache.get_or_compute("k", compute, cacheable=lambda v: v != "error") == "error"  # noqa: S101
+    assert cache.get_or_compute("k", compute) == "value"  # noqa: S101
+    assert cache.get_or_compute("k", compute) == "value"  # noqa: S101
+
+
+def test_waiters_move_on_when_the_holder_stores_nothing(backend):
+    replicas = [SharedCache(backend, "news_analysis", ttl=60, lock_timeout=5) for _ in range(2)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "failed"
+
+    def lookup(replica):
+        return replica.get_or_compute("k", compute, cacheable=lambda v: v != "failed")
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(lookup, replicas[0])
+        time.sleep(0.05)
+        second = pool.submit(lookup, replicas[1])
+        results = [first.result(), second.result()]
+
+    assert results == ["failed", "failed"]  # noqa: S101
+    assert len(calls) == 2  # noqa: S101
+    assert time.monotonic() - started < 1  # noqa: S101
+
+
+def test_unreachable_backend_is_skipped_until_retry(monkeypatch):
+    backend = RedisBackend("redis://127.0.0.1:1/0", timeout=0.1, retry_after=60)
+    connects = []
+
+    def refuse(*args, **kwargs):
+        connects.append(1)
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr("socket.create_connection", refuse)
+    cache = SharedCache(backend, "retrieval", ttl=60)
+
+    for _ in range(5):
+        assert cache.get_or_compute("query", lambda: ["computed"]) == ["computed"]  # noqa: S101
+
+    assert len(connects) == 1  # noqa: S101
+    assert cache.errors >= 5  # noqa: S101
+
+
+def test_unreachable_backend_degrades_to_misses():
+    cache = SharedCache(RedisBackend("redis://127.0.0.1:1/0", timeout=0.1), "retrieval", ttl=60)
+
+    cache.set("query", ["result"])
+
+    assert cache.get("query") is None  # noqa: S101
+    assert cache.get_or_compute("query", lambda: ["computed"]) == ["computed"]  # noqa: S101
+    assert cache.errors >= 3  # noqa: S101
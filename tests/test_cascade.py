@@ -0,0 +1,95 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.financial_analysis.analysis.risk import RiskAgent
+from src.financial_analysis.analysis.synthesizer import check_note
+from src.financial_analysis.core.cascade import ModelCascade, missing_sections
+from src.financial_analysis.core.metrics import LLM_CASCADE
+
+
+@pytest.fixture(autouse=True)
+def set_openai_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+def fake_llm(name, *answers):
+    llm = MagicMock()
+    llm.model_name = name
+    llm.invoke.side_effect = [MagicMock(content=answer) for answer in answers]
+    return llm
+
+
+def cascade_of(agent, *llms, **kwargs):
+    cascade = ModelCascade(agent, ["gpt-4o-mini", "gpt-4o"], **kwargs)
+    cascade.llms = list(llms)
+    return cascade
+
+
+def test_a_valid_cheap_answer_is_not_escalated():
+    cheap, strong = fake_llm("cheap", "## Summary"), fake_llm("strong")
+    cascade = cascade_of("test-accept", cheap, strong)
+
+    answer = cascade.invoke("prompt", lambda text: missing_sections(text, ["Summary"]))
+
+    assert answer == "## Summary"  # noqa: S101
+    assert not strong.invoke.called  # noqa: S101
+    assert LLM_CASCADE.value("test-accept", "cheap", "accepted") == 1  # noqa: S101
+
+
+def test_invalid_or_failed_answers_escalate():
+    cheap = fake_llm("cheap", "no headings")
+    middle = fake_llm("middle")
+    middle.invoke.side_effect = RuntimeError("rate limited")
+    strong = fake_llm("strong", "## Summary")
+    cascade = cascade_of("test-escalate", cheap, middle, strong)
+
+    answer = cascade.invoke("prompt", lambda text: missing_sections(text, ["Summary"]))
+
+    assert answer == "## Summary"  # noqa: S101
+    assert cascade.escalation_rate == 1  # noqa: S101
+    assert LLM_CASCADE.value("test-escalate", "cheap", "escalated") == 1  # noqa: S101
+    assert LLM_CASCADE.value("test-escalate", "middle", "escalated") == 1  # noqa: S101
+
+
+def test_large_prompts_go_straight_to_the_strongest_model():
+    cheap, strong = fake_llm("cheap"), fake_llm("strong", "answer")
+    cascade = cascade_of("test-large", cheap, strong, max_fast_prompt_tokens=10)
+
+    assert cascade.invoke("x" * 100) == "answer"  # noqa: S101
+    assert not cheap.invoke.called  # noqa: S101
+
+
+def test_risk_escalates_unparseable_and_low_confidence_assessments():
+    def assessment(confidence):
+        return json.dumps(
+            {
+                "risk_score": 40,
+                "risk_drivers": ["Valuation"],
+                "confidence_level": confidence,
+                "quantitative_flag": "Neutral",
+            }
+        )
+
+    agent = RiskAgent(models=["gpt-4o-mini", "gpt-4o"], min_confidence="Medium")
+    agent.cascade.llms = [
+        fake_llm("cheap", "not json"),
+        fake_llm("middle", assessment("Low")),
+        fake_llm("strong", assessment("High")),
+    ]
+
+    result = agent.compute_risk("research", "market", "news")
+
+    assert result["confidence_level"] == "High"  # noqa: S101
+
+
+def test_check_note_requires_a_recommendation_and_every_section():
+    note = (
+        "Recommendation: **Hold**\n## Executive Summary\n## Key Observations\n"
+        "## Investment Thesis\n## Risk Summary\n## Suggested Next Steps\n"
+    )
+
+    assert check_note(note) is None  # noqa: S101
+    assert check_note(note.replace("Hold", "Maybe")) == "no recommendation"  # noqa: S101
+    assert check_note(note.replace("## Risk Summary\n", "")) == "missing sections: Risk Summary"  # noqa: S101
@@ -0,0 +1,157 @@
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from src.financial_analysis.analysis.market import MarketAgent
+from src.financial_analysis.analysis.news import NewsAgent
+from src.financial_analysis.core.cassette import (
+    Cassette,
+    CassetteEmbeddings,
+    CassetteMiss,
+    RecordedError,
+    set_cassette,
+)
+from src.financial_analysis.core.llm import invoke_llm
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "cassette.db"
+
+
+def replay(path, latency="zero"):
+    cassette = Cassette(path, mode="replay", latency=latency)
+    set_cassette(cassette)
+    return cassette
+
+
+def record(path):
+    cassette = Cassette(path, mode="record")
+    set_cassette(cassette)
+    return cassette
+
+
+def test_replay_serves_the_recorded_response(path):
+    fn = MagicMock(return_value={"answer": 42})
+    Cassette(path, mode="record").call("kind", ("a", 1), fn)
+
+    result = Cassette(path, mode="replay", latency="zero").call("kind", ("a", 1), fn)
+
+    assert result == {"answer": 42}  # noqa: S101
+    assert fn.call_count == 1  # noqa: S101
+
+
+def test_replay_of_an_unrecorded_call_raises(path):
+    cassette = Cassette(path, mode="replay")
+
+    with pytest.raises(CassetteMiss):
+        cassette.call("kind", "never recorded", lambda: "live")
+
+
+def test_replay_waits_for_the_recorded_latency(path):
+    def slow_call() -> str:
+        time.sleep(0.1)
+        return "value"
+
+    Cassette(path, mode="record").call("kind", "key", slow_call)
+    cassette = Cassette(path, mode="replay")
+
+    started = time.monotonic()
+    assert cassette.call("kind", "key", lambda: "live") == "value"  # noqa: S101
+    assert time.monotonic() - started >= 0.1  # noqa: S101
+
+
+def test_invoke_llm_replays_content_and_usage(path):
+    llm = MagicMock()
+    llm.model_name = "gpt-4o"
+    llm.invoke.return_value.content = "recorded answer"
+    llm.invoke.return_value.usage_metadata = {
+        "input_tokens": 10,
+        "output_tokens": 5,
+        "total_tokens": 15,
+    }
+    record(path)
+    invoke_llm(llm, "prompt")
+
+    replay(path)
+    llm.invoke.side_effect = AssertionError("must not call the LLM in replay")
+
+    assert invoke_llm(llm, "prompt") == "recorded answer"  # noqa: S101
+
+
+def test_market_data_round_trips_through_the_cassette(path):
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "testkey"}, clear=True):
+        recording, replaying = MarketAgent(), MarketAgent()
+    bars = pd.DataFrame(
+        {"Close": [100.0, 101.5], "Open": [99.0, 100.0]},
+        index=pd.to_datetime(["2024-01-02", "2024-01-03"]),
+    )
+    record(path)
+    with patch("yfinance.download", return_value=bars):
+        recorded = recording.load_market("AAPL")
+
+    replay(path)
+    with patch("yfinance.download", side_effect=AssertionError("live call")):
+        replayed = replaying.load_market("AAPL")
+
+    pd.testing.assert_frame_equal(replayed, recorded, check_freq=False)
+
+
+def test_recorded_errors_are_raised_again_on_replay(path):
+    class LocalError(Exception):
+        pass
+
+    def fail(error):
+        raise error
+
+    recording = Cassette(path, mode="record")
+    for request, error in [("value", ValueError("bad ticker")), ("local", LocalError("gone"))]:
+        with pytest.raises(type(error)):
+            recording.call("kind", request, lambda error=error: fail(error))
+
+    replaying = Cassette(path, mode="replay", latency="zero")
+    with pytest.raises(ValueError, match="bad ticker"):
+        replaying.call("kind", "value", lambda: "live")
+    with pytest.raises(RecordedError, match="LocalError: gone"):
+        replaying.call("kind", "local", lambda: "live")
+
+
+def test_missing_market_data_replays_as_an_empty_frame(path):
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "testkey"}, clear=True):
+        recording, replaying = MarketAgent(), MarketAgent()
+    record(path)
+    with patch("yfinance.download", return_value=pd.DataFrame()):
+        assert recording.load_market("NOSUCH").empty  # noqa: S101
+
+    replay(path)
+    with patch("yfinance.download", side_effect=AssertionError("live call")):
+        assert replaying.load_market("NOSUCH").empty  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_news_search_is_replayed(mock_run, path):
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "testkey"}, clear=True):
+        recording, replaying = NewsAgent(), NewsAgent()
+    mock_run.return_value = "Apple beats earnings. Shares rise."
+    record(path)
+    recorded = recording.fetch_live_news("Apple")
+
+    replay(path)
+    mock_run.side_effect = AssertionError("live call")
+
+    assert replaying.fetch_live_news("Apple") == recorded  # noqa: S101
+
+
+def test_embeddings_are_replayed(path):
+    embeddings = MagicMock()
+    embeddings.embed_query.return_value = [0.1, 0.2]
+    record(path)
+    CassetteEmbeddings(embeddings, "test").embed_query("revenue")
+
+    replay(path)
+    embeddings.embed_query.side_effect = AssertionError("live call")
+
+    assert CassetteEmbeddings(embeddings, "test").embed_query("revenue") == [0.1, 0.2]  # noqa: S101
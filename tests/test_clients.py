@@ -0,0 +1,33 @@
+import pytest
+
+from src.financial_analysis.core.clients import (
+    get_chat_model,
+    get_embeddings,
+    http_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def set_openai_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+def test_same_model_returns_shared_client():
+    assert get_chat_model("gpt-4o-mini") is get_chat_model("gpt-4o-mini")  # noqa: S101
+    assert get_chat_model("gpt-4o-mini") is not get_chat_model("gpt-4o")  # noqa: S101
+
+
+def test_all_clients_share_one_connection_pool():
+    chat = get_chat_model("gpt-4o-mini")
+    embeddings = get_embeddings()
+
+    assert chat.http_client is http_client()  # noqa: S101
+    assert embeddings.http_client is http_client()  # noqa: S101
+    assert chat.http_async_client is embeddings.http_async_client  # noqa: S101
+
+
+def test_missing_api_key_raises(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY")
+
+    with pytest.raises(OSError, match="OPENAI_API_KEY"):
+        get_chat_model("gpt-4o-mini")
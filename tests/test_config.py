@@ -0,0 +1,13 @@
+from src.financial_analysis.core.config import Settings
+
+
+def test_settings_defaults():
+    settings = Settings.from_env({})
+
+    assert settings.news_cache_ttl == 900.0  # noqa: S101
+
+
+def test_settings_read_prefixed_environment():
+    settings = Settings.from_env({"ALPHASYNTH_NEWS_CACHE_TTL": "60"})
+
+    assert settings.news_cache_ttl == 60.0  # noqa: S101
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+
+from src.financial_analysis.api.dag import DagError, DagExecutor, Node
+from src.financial_analysis.core.deadline import remaining
+
+
+def test_runs_nodes_in_dependency_order():
+    dag = DagExecutor(
+        [
+            Node("double", lambda x: x * 2, ("x",)),
+            Node("add", lambda x, double: x + double, ("x", "double")),
+        ],
+        external_inputs=("x",),
+    )
+
+    result = dag.run({"x": 3})
+
+    assert result.outputs == {"double": 6, "add": 9}  # noqa: S101
+    assert set(result.timings) == {"double", "add"}  # noqa: S101
+    assert result.errors == {}  # noqa: S101
+
+
+def test_ready_nodes_run_concurrently():
+    barrier = threading.Barrier(3, timeout=2)
+
+    def gatherer():
+        barrier.wait()
+        return True
+
+    dag = DagExecutor(
+        [
+            Node("a", gatherer),
+            Node("b", gatherer),
+            Node("c", gatherer),
+            Node("join", lambda a, b, c: a and b and c, ("a", "b", "c")),
+        ]
+    )
+
+    result = dag.run()
+
+    assert result.outputs["join"] is True  # noqa: S101
+
+
+def test_timed_out_node_fails_and_dependents_are_skipped():
+    release = threading.Event()
+    dag = DagExecutor(
+        [
+            Node("slow", lambda: release.wait(5), timeout=0.1),
+            Node("fast", lambda: "ok"),
+            Node("after", lambda slow: slow, ("slow",)),
+        ]
+    )
+
+    started = time.perf_counter()
+    result = dag.run()
+    release.set()
+
+    assert time.perf_counter() - started < 2  # noqa: S101
+    assert result.outputs == {"fast": "ok"}  # noqa: S101
+    assert "timed out" in result.errors["slow"]  # noqa: S101
+    assert "skipped" in result.errors["after"]  # noqa: S101
+
+
+def test_node_timeout_starts_when_the_node_runs():
+    dag = DagExecutor(
+        [
+            Node("first", lambda: time.sleep(0.2) or "first"),
+            Node("queued", lambda: time.sleep(0.05) or "queued", timeout=0.15),
+        ],
+        max_workers=1,
+    )
+
+    result = dag.run()
+
+    assert result.outputs == {"first": "first", "queued": "queued"}  # noqa: S101
+
+
+def test_node_abandoned_while_queued_never_runs():
+    release = threading.Event()
+    calls = []
+    dag = DagExecutor(
+        [
+            Node("stuck", lambda: release.wait(1), timeout=0.05),
+            Node("queued", lambda: calls.append(1), deadline_share=0.5),
+        ],
+        max_workers=1,
+    )
+
+    result = dag.run(deadline=time.monotonic() + 0.2)
+    release.set()
+    dag.executor.submit(lambda: None).result()
+
+    assert "timed out" in result.errors["queued"]  # noqa: S101
+    assert calls == []  # noqa: S101
+
+
+def test_node_exception_is_recorded():
+    def boom():
+        raise RuntimeError("boom")
+
+    result = DagExecutor([Node("boom", boom)]).run()
+
+    assert result.errors["boom"] == "RuntimeError: boom"  # noqa: S101
+
+
+def test_rejects_cycles_and_unknown_inputs():
+    with pytest.raises(DagError, match="Cycle"):
+        DagExecutor([Node("a", lambda b: b, ("b",)), Node("b", lambda a: a, ("a",))])
+    with pytest.raises(DagError, match="unknown"):
+        DagExecutor([Node("a", lambda missing: missing, ("missing",))])
+
+
+def test_allow_missing_node_runs_with_none_for_failed_input():
+    def broken():
+        raise ValueError("boom")
+
+    dag = DagExecutor(
+        [
+            Node("ok", lambda: 1),
+            Node("broken", broken),
+            Node("join", lambda ok, broken: (ok, broken), ("ok", "broken"), allow_missing=True),
+        ]
+    )
+
+    result = dag.run()
+
+    assert result.outputs["join"] == (1, None)  # noqa: S101
+    assert "boom" in result.errors["broken"]  # noqa: S101
+
+
+def test_deadline_share_bounds_a_node_and_is_visible_inside_it():
+    release = threading.Event()
+    seen = {}
+
+    def slow():
+        release.wait(2)
+
+    def report():
+        seen["remaining"] = remaining()
+        return True
+
+    dag = DagExecutor(
+        [
+            Node("slow", slow, deadline_share=0.5),
+            Node("report", report),
+            Node("after", lambda slow, report: report, ("slow", "report"), allow_missing=True),
+        ]
+    )
+
+    started = time.monotonic()
+    result = dag.run(deadline=started + 0.4)
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert "timed out" in result.errors["slow"]  # noqa: S101
+    assert result.outputs["after"] is True  # noqa: S101
+    assert elapsed < 0.4  # noqa: S101
+    assert 0 < seen["remaining"] <= 0.4  # noqa: S101
+
+
+def test_on_complete_reports_each_node_output():
+    completed = []
+    dag = DagExecutor(
+        [
+            Node("double", lambda x: x * 2, ("x",)),
+            Node("add", lambda double: double + 1, ("double",)),
+        ],
+        external_inputs=("x",),
+    )
+
+    dag.run({"x": 3}, on_complete=lambda name, output: completed.append((name, output)))
+
+    assert completed == [("double", 6), ("add", 7)]  # noqa: S101
@@ -0,0 +1,76 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.financial_analysis.core.deadline import (
+    DeadlineExceeded,
+    check_deadline,
+    clamp_timeout,
+    current_deadline,
+    deadline_after,
+    deadline_scope,
+)
+from src.financial_analysis.core.llm import invoke_llm
+
+
+def test_no_deadline_leaves_timeouts_unchanged():
+    assert current_deadline() is None  # noqa: S101
+    assert clamp_timeout(5.0) == 5.0  # noqa: S101
+    assert clamp_timeout(None) is None  # noqa: S101
+    check_deadline()
+
+
+def test_clamp_timeout_shortens_to_remaining_time():
+    with deadline_after(1.0):
+        timeout = clamp_timeout(10.0)
+
+    assert timeout is not None  # noqa: S101
+    assert 0 < timeout <= 1.0  # noqa: S101
+    assert current_deadline() is None  # noqa: S101
+
+
+def test_nested_scope_only_tightens_deadline():
+    with deadline_after(1.0):
+        outer = current_deadline()
+        with deadline_after(60.0):
+            assert current_deadline() == outer  # noqa: S101
+        with deadline_after(0.1):
+            assert current_deadline() < outer  # noqa: S101
+        assert current_deadline() == outer  # noqa: S101
+
+
+def test_expired_deadline_raises():
+    with deadline_scope(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            check_deadline()
+        with pytest.raises(DeadlineExceeded):
+            clamp_timeout(5.0)
+
+
+def test_invoke_llm_passes_timeout_only_under_a_deadline():
+    llm = MagicMock()
+    llm.invoke.return_value.content = "ok"
+
+    assert invoke_llm(llm, "prompt") == "ok"  # noqa: S101
+    assert "timeout" not in llm.invoke.call_args.kwargs  # noqa: S101
+
+    with deadline_after(2.0):
+        invoke_llm(llm, "prompt")
+    assert 0 < llm.invoke.call_args.kwargs["timeout"] <= 2.0  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    ("body", "headers"),
+    [({"deadline_ms": 0}, {}), ({"deadline_ms": -5}, {}), ({}, {"X-Request-Deadline-Ms": "0"})],
+)
+def test_non_positive_deadlines_are_rejected(body, headers):
+    from fastapi.testclient import TestClient
+
+    from src.financial_analysis.api.main import app
+
+    response = TestClient(app).post(
+        "/analyze", json={"query": "Risks?", "company": "AAPL", **body}, headers=headers
+    )
+
+    assert response.status_code == 422  # noqa: S101
@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock
+
+from langchain_core.documents import Document
+
+from src.financial_analysis.analysis.digest import (
+    Digest,
+    extract_facts,
+    label_sentiment,
+    market_digest,
+    news_digest,
+    render_digests,
+    research_digest,
+)
+from src.financial_analysis.analysis.market import MarketResult
+from src.financial_analysis.api.models import QueryIn
+from src.financial_analysis.api.pipeline import AnalysisPipeline, StageStore
+from src.financial_analysis.core.tokens import estimate_tokens
+
+RESEARCH = """
+* **Key Risks**:
+  - Supply chain concentration in one region.
+  - Revenue from services grew 12% to $85 billion.
+* **Business Overview/Strategy**:
+  - Expanding the wearables segment.
+"""
+
+
+def test_facts_with_figures_come_first():
+    facts = extract_facts(RESEARCH)
+
+    assert facts[0] == "Revenue from services grew 12% to $85 billion."  # noqa: S101
+    assert "Key Risks:" not in facts  # noqa: S101
+    assert len(facts) == 3  # noqa: S101
+
+
+def test_prose_without_bullets_is_split_into_sentences():
+    assert extract_facts("Shares rose. Margins fell 2%.") == [  # noqa: S101
+        "Margins fell 2%.",
+        "Shares rose.",
+    ]
+
+
+def test_sentiment_labels():
+    assert label_sentiment("Strong growth and an earnings beat.") == "bullish"  # noqa: S101
+    assert label_sentiment("A lawsuit and weak demand.") == "bearish"  # noqa: S101
+    assert label_sentiment("Strong demand, but a lawsuit.") == "mixed"  # noqa: S101
+    assert label_sentiment("The company held its meeting.") == "neutral"  # noqa: S101
+
+
+def test_digests_carry_numbers_sentiment_and_source_ids():
+    document = Document(page_content="10-K", id="c1", metadata={"company": "AAPL", "date": "2023"})
+    market = MarketResult(ticker="AAPL", last_price=110.0, ma_20=100.0, as_of="2024-01-02")
+
+    assert research_digest(RESEARCH, [document]).source_ids == ["AAPL-2023:c1"]  # noqa: S101
+    assert market_digest(market).numbers["price_vs_ma_20"] == 0.1  # noqa: S101
+    assert market_digest(market).sentiment == "bullish"  # noqa: S101
+    assert len(news_digest("Earnings beat.", ["a", "b"]).source_ids) == 2  # noqa: S101
+
+
+def test_render_keeps_headers_and_stays_within_budget():
+    digests = [
+        Digest(source="research", facts=[f"Research fact number {i}." for i in range(50)]),
+        Digest(source="news", facts=[f"News fact number {i}." for i in range(50)], error=None),
+        Digest(source="market", error="No market data found."),
+    ]
+
+    rendered = render_digests(digests, max_tokens=100)
+
+    assert sum(estimate_tokens(text) for text in rendered) <= 100  # noqa: S101
+    assert "Research fact number 0." in rendered[0]  # noqa: S101
+    assert "News fact number 0." in rendered[1]  # noqa: S101
+    assert "Error: No market data found." in rendered[2]  # noqa: S101
+
+
+def pipeline_agents():
+    research = MagicMock()
+    research.retrieve_documents.return_value = [Document(page_content="10-K text", id="c1")]
+    research.analyze_documents.return_value = RESEARCH + "filler text " * 500
+    market = MagicMock()
+    market.analyze.side_effect = lambda ticker, interpret: MarketResult(
+        ticker=ticker, last_price=110.0, ma_20=100.0, as_of="2024-01-02"
+    )
+    market.interpret.return_value = "Momentum is positive."
+    news = MagicMock()
+    news.fetch_live_news.return_value = "Apple beats earnings."
+    news.analyze_news.return_value = "- Earnings beat expectations."
+    risk = MagicMock()
+    risk.compute_risk.return_value = {"risk_score": 30, "quantitative_flag": "Neutral"}
+    synth = MagicMock()
+    synth.synthesize.return_value = "Recommendation: Buy"
+    return research, market, news, risk, synth
+
+
+def test_risk_and_synthesis_read_digests_within_the_budget(tmp_path):
+    agents = pipeline_agents()
+    pipeline = AnalysisPipeline(
+        *agents, StageStore(tmp_path / "stages.db"), digest_token_budget=300
+    )
+
+    pipeline.run(QueryIn(query="Buy?", company="AAPL"))
+
+    research, market, news = agents[3].compute_risk.call_args.args[:3]
+    assert sum(estimate_tokens(text) for text in (research, market, news)) <= 300  # noqa: S101
+    assert "Revenue from services grew 12%" in research  # noqa: S101
+    assert "filler" not in research  # noqa: S101
+    assert "Sentiment: bullish" in news  # noqa: S101
+    assert agents[4].synthesize.call_args.args[1] == research  # noqa: S101
+
+
+def test_zero_budget_passes_the_full_prose(tmp_path):
+    agents = pipeline_agents()
+    pipeline = AnalysisPipeline(*agents, StageStore(tmp_path / "stages.db"), digest_token_budget=0)
+
+    pipeline.run(QueryIn(query="Buy?", company="AAPL"))
+
+    assert "filler" in agents[3].compute_risk.call_args.args[0]  # noqa: S101
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from src.financial_analysis.analysis.research import ResearchAgent
+from src.financial_analysis.rag.embeddings import (
+    EmbeddingMismatch,
+    HashingEmbeddings,
+    embedding_spec,
+    get_embedding_model,
+    write_info,
+)
+from src.financial_analysis.rag.index import TwoStageIndex, load_index
+
+FILINGS = [
+    "Revenue from iPhone sales grew 6% in fiscal 2023.",
+    "The company faces litigation over patent infringement claims.",
+    "Supply chain disruptions in China could affect production.",
+    "Services revenue reached $85.2 billion.",
+]
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    embeddings = HashingEmbeddings(dim=128)
+
+    vectors = np.array(embeddings.embed_documents(FILINGS))
+
+    assert vectors.shape == (4, 128)  # noqa: S101
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)  # noqa: S101
+    assert embeddings.embed_query(FILINGS[0]) == vectors[0].tolist()  # noqa: S101
+
+
+def test_hashing_embeddings_rank_shared_vocabulary_first():
+    embeddings = HashingEmbeddings()
+    vectors = np.array(embeddings.embed_documents(FILINGS))
+
+    scores = vectors @ np.array(embeddings.embed_query("patent litigation claims"))
+
+    assert int(np.argmax(scores)) == 1  # noqa: S101
+
+
+def test_spec_defaults():
+    assert embedding_spec().info() == {  # noqa: S101
+        "embedding_provider": "openai",
+        "embedding_model": "text-embedding-3-small",
+        "embedding_dim": 1536,
+    }
+    assert embedding_spec("hashing", dim=64).dim == 64  # noqa: S101
+    with pytest.raises(ValueError, match="provider"):
+        embedding_spec("word2vec")
+
+
+def test_two_stage_index_refuses_other_embeddings(tmp_path):
+    spec = embedding_spec("hashing", dim=128)
+    embeddings = get_embedding_model(spec)
+    TwoStageIndex.from_texts(tmp_path, FILINGS, embeddings, info=spec.info())
+
+    index = load_index(tmp_path, embeddings, spec)
+
+    assert index.similarity_search("services revenue", k=1)[0].page_content == FILINGS[3]  # noqa: S101
+    with pytest.raises(EmbeddingMismatch, match="hashing/hashing-v1"):
+        load_index(tmp_path, embeddings, embedding_spec("openai"))
+    with pytest.raises(EmbeddingMismatch, match="128 dimensions"):
+        load_index(tmp_path, embeddings, embedding_spec("hashing", dim=256))
+
+
+def test_faiss_store_records_its_embeddings(tmp_path):
+    spec = embedding_spec("hashing", dim=64)
+    embeddings = get_embedding_model(spec)
+    FAISS.from_texts(FILINGS, embeddings).save_local(str(tmp_path / "recorded"))
+    write_info(tmp_path / "recorded", spec)
+    FAISS.from_texts(FILINGS, embeddings).save_local(str(tmp_path / "legacy"))
+
+    assert load_index(tmp_path / "recorded", embeddings, spec) is not None  # noqa: S101
+    # Stores without a record were built with text-embedding-3-small.
+    with pytest.raises(EmbeddingMismatch, match="openai/text-embedding-3-small"):
+        load_index(tmp_path / "legacy", embeddings, spec)
+
+
+def test_research_agent_retrieves_offline_with_hashing_embeddings(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    spec = embedding_spec("hashing")
+    TwoStageIndex.from_texts(tmp_path, FILINGS, get_embedding_model(spec), info=spec.info())
+
+    agent = ResearchAgent(index_path=str(tmp_path), embedding_provider="hashing")
+
+    documents = agent.retrieve_documents("supply chain in China", k=1)
+    assert documents[0].page_content == FILINGS[2]  # noqa: S101
+    with pytest.raises(EmbeddingMismatch):
+        ResearchAgent(index_path=str(tmp_path))
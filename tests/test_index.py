@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.financial_analysis.rag.index import TwoStageIndex, load_index, normalize
+from src.financial_analysis.rag.sidecar import RetrievalClient, RetrievalServer
+
+FULL_DIM = 256
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic pseudo-embeddings, stable across calls for the same text."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = sum(ord(c) * (i + 1) for i, c in enumerate(text))
+        return np.random.default_rng(seed).normal(size=FULL_DIM).tolist()
+
+
+def clustered(count, seed=0):
+    """Vectors whose energy is concentrated in the leading components, like text-embedding-3."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(count // 50, FULL_DIM))
+    vectors = centers[rng.integers(len(centers), size=count)] + rng.normal(
+        scale=0.5, size=(count, FULL_DIM)
+    )
+    return normalize(vectors * np.linspace(2.0, 0.2, FULL_DIM))
+
+
+def documents(count):
+    return [Document(page_content=f"chunk {i}", metadata={"i": i}) for i in range(count)]
+
+
+@pytest.mark.parametrize("quantization", ["none", "fp16", "int8"])
+def test_two_stage_search_matches_exact_search(tmp_path, quantization):
+    vectors = clustered(5000)
+    TwoStageIndex.build(
+        tmp_path, vectors, documents(5000), dim=64, quantization=quantization, oversample=10
+    )
+    index = TwoStageIndex(tmp_path, HashEmbeddings())
+    rng = np.random.default_rng(1)
+    queries = normalize(vectors[:50] + rng.normal(scale=0.05, size=(50, FULL_DIM)))
+
+    positions, _ = index.search_positions(queries, k=10)
+
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(positions, exact, strict=True)])
+    assert recall >= 0.95  # noqa: S101
+
+
+def test_int8_first_stage_is_a_fraction_of_the_full_vectors(tmp_path):
+    TwoStageIndex.build(tmp_path, clustered(1000), documents(1000), dim=64, quantization="int8")
+
+    index = TwoStageIndex(tmp_path, None)
+
+    assert index.memory_bytes() * 16 <= 1000 * FULL_DIM * 4  # noqa: S101
+    assert index.metadata["full_dim"] == FULL_DIM  # noqa: S101
+
+
+def test_mismatched_documents_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="documents"):
+        TwoStageIndex.build(tmp_path, clustered(100), documents(99))
+
+
+def test_from_texts_round_trips_documents(tmp_path):
+    texts = [f"filing section {i}" for i in range(300)]
+    embeddings = HashEmbeddings()
+    TwoStageIndex.from_texts(
+        tmp_path, texts, embeddings, metadatas=[{"i": i} for i in range(300)], dim=64
+    )
+
+    index = load_index(tmp_path, embeddings)
+    found = index.similarity_search("filing section 42", k=3)
+
+    assert isinstance(index, TwoStageIndex)  # noqa: S101
+    assert found[0].page_content == "filing section 42"  # noqa: S101
+    assert found[0].metadata == {"i": 42}  # noqa: S101
+
+
+def test_sidecar_serves_a_two_stage_index(tmp_path):
+    texts = [f"risk factor {i}" for i in range(100)]
+    index = TwoStageIndex.from_texts(tmp_path / "index", texts, HashEmbeddings(), dim=32)
+    server = RetrievalServer(index, tmp_path / "retrieval.sock", batch_window=0.05)
+    server.start()
+    try:
+        found = RetrievalClient(server.socket_path).similarity_search("risk factor 7", k=2)
+    finally:
+        server.stop()
+
+    assert found[0].page_content == "risk factor 7"  # noqa: S101
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+from src.financial_analysis.api.jobs import JobRunner, JobStore
+from src.financial_analysis.api.models import QueryIn
+from src.financial_analysis.api.reports import Report, report_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return JobStore(tmp_path / "jobs.db", lease=60, max_attempts=2, clock=clock)
+
+
+@pytest.fixture
+def query():
+    return QueryIn(query="Is it a good time to buy?", company="AAPL")
+
+
+def make_report(q):
+    return Report(
+        key=report_key(q),
+        company=q.company,
+        query=q.query,
+        synthesis="Recommendation: Buy",
+        input_fingerprint="fp",
+        generated_at=1000.0,
+    )
+
+
+def test_submitted_job_runs_to_completion(store, query):
+    def run(q, on_stage):
+        on_stage("research", "Research analysis")
+        return make_report(q)
+
+    runner = JobRunner(store, run, workers=0)
+    job = runner.submit(query)
+    assert store.get(job.id).status == "queued"  # noqa: S101
+
+    runner.run_next()
+
+    done = store.get(job.id)
+    assert done.status == "done"  # noqa: S101
+    assert done.stages == {"research": "Research analysis"}  # noqa: S101
+    assert done.report.synthesis == "Recommendation: Buy"  # noqa: S101
+    assert runner.run_next() is None  # noqa: S101
+
+
+def test_partial_stage_outputs_are_visible_while_running(store, query):
+    seen = {}
+
+    def run(q, on_stage):
+        on_stage("market", "Market interpretation")
+        seen["job"] = store.get(job.id)
+        return make_report(q)
+
+    runner = JobRunner(store, run, workers=0)
+    job = runner.submit(query)
+    runner.run_next()
+
+    assert seen["job"].status == "running"  # noqa: S101
+    assert seen["job"].stages == {"market": "Market interpretation"}  # noqa: S101
+
+
+def test_failed_run_records_the_error(store, query):
+    def run(q, on_stage):
+        raise RuntimeError("pipeline failed")
+
+    runner = JobRunner(store, run, workers=0)
+    job = runner.submit(query)
+    runner.run_next()
+
+    failed = store.get(job.id)
+    assert failed.status == "failed"  # noqa: S101
+    assert failed.error == "pipeline failed"  # noqa: S101
+
+
+def test_job_of_a_dead_worker_is_claimed_again_after_its_lease(tmp_path, clock, query):
+    path = tmp_path / "jobs.db"
+    job = JobStore(path, lease=60, clock=clock).create(query)
+    assert JobStore(path, lease=60, clock=clock).claim().id == job.id  # noqa: S101
+
+    restarted = JobStore(path, lease=60, clock=clock)
+    assert restarted.claim() is None  # noqa: S101
+    clock.now += 61
+    reclaimed = restarted.claim()
+
+    assert reclaimed.id == job.id  # noqa: S101
+    assert reclaimed.attempts == 2  # noqa: S101
+
+
+def test_job_fails_after_max_attempts(store, clock, query):
+    job = store.create(query)
+    store.claim()
+    clock.now += 61
+    store.claim()
+    clock.now += 61
+
+    assert store.claim() is None  # noqa: S101
+    assert store.get(job.id).status == "failed"  # noqa: S101
+    assert store.counts()["failed"] == 1  # noqa: S101
+
+
+def test_worker_threads_pick_up_submitted_jobs(store, query):
+    runner = JobRunner(store, lambda q, on_stage: make_report(q), workers=2, poll_interval=0.05)
+    runner.start()
+    try:
+        job = runner.submit(query)
+        for _ in range(100):
+            if store.get(job.id).status == "done":
+                break
+            time.sleep(0.02)
+    finally:
+        runner.stop(timeout=2)
+
+    assert store.get(job.id).status == "done"  # noqa: S101
@@ -1,10 +1,11 @@
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
 import pandas as pd
 import pytest
 
-from src.financial_analysis.analysis.market import MarketAgent
+from src.financial_analysis.analysis.market import MarketAgent, MarketResult
+from src.financial_analysis.core.resilience import upstream
 
 
 @pytest.fixture
@@ -103,3 +104,94 @@ def test_analyze_ticker_fetch_exception(mock_download, agent):
 
     assert "CRITICAL ERROR FETCHING MARKET DATA FOR AAPL" in result  # noqa: S101
     assert "Network down" in result  # noqa: S101
+
+
+@patch("yfinance.download")
+@patch("yfinance.Ticker")
+@patch("langchain_openai.ChatOpenAI.invoke")
+def test_analyze_without_interpretation_skips_llm(mock_invoke, mock_ticker, mock_download, agent):
+    mock_download.return_value = pd.DataFrame({"Close": [float(100 + i) for i in range(25)]})
+    mock_ticker.return_value.info = {"sector": "Tech", "marketCap": 1000000, "forwardPE": 15}
+
+    result = agent.analyze("AAPL", interpret=False)
+
+    mock_invoke.assert_not_called()
+    assert result.interpretation is None  # noqa: S101
+    assert result.text == result.summary  # noqa: S101
+    assert "Current Price: $124.00" in result.text  # noqa: S101
+    assert result.ma_20 == pytest.approx(114.5)  # noqa: S101
+    assert result.quantitative_flag == "Price_Above_MA_Bullish"  # noqa: S101
+
+
+@patch("yfinance.download")
+def test_analyze_empty_data_sets_error(mock_download, agent):
+    mock_download.return_value = pd.DataFrame()
+
+    result = agent.analyze("AAPL")
+
+    assert result.error is not None  # noqa: S101
+    assert result.quantitative_flag == "Error"  # noqa: S101
+
+
+def test_quantitative_flag_from_indicators():
+    below = MarketResult(ticker="AAPL", last_price=90.0, ma_20=100.0)
+    no_ma = MarketResult(ticker="AAPL", last_price=90.0, ma_20=0.0)
+
+    assert below.quantitative_flag == "Price_Below_MA_Bearish"  # noqa: S101
+    assert below.features()["price_vs_ma_20"] == pytest.approx(-0.1)  # noqa: S101
+    assert no_ma.quantitative_flag == "Neutral"  # noqa: S101
+
+
+@patch("yfinance.download")
+def test_load_market_served_from_cache(mock_download, agent):
+    mock_download.return_value = pd.DataFrame({"Close": [100, 101, 102]})
+
+    agent.load_market("AAPL")
+    df = agent.load_market("AAPL")
+    df["ma_20"] = 0.0
+    agent.load_market("AAPL", refresh=True)
+
+    assert mock_download.call_count == 2  # noqa: S101
+    assert "ma_20" not in agent.load_market("AAPL").columns  # noqa: S101
+
+
+@patch("yfinance.Ticker")
+def test_fetch_fundamentals_errors_are_not_cached(mock_ticker, agent, caplog):
+    type(mock_ticker.return_value).info = PropertyMock(
+        side_effect=[Exception("rate limited"), {"sector": "Tech"}]
+    )
+
+    failed = agent.fetch_fundamentals("AAPL")
+    fetched = agent.fetch_fundamentals("AAPL")
+    cached = agent.fetch_fundamentals("AAPL")
+
+    assert failed["sector"] == "N/A"  # noqa: S101
+    assert fetched["sector"] == cached["sector"] == "Tech"  # noqa: S101
+    assert mock_ticker.call_count == 2  # noqa: S101
+    assert [r.levelname for r in caplog.records if "fundamentals" in r.message] == [  # noqa: S101
+        "WARNING"
+    ]
+
+
+@patch("yfinance.download")
+def test_open_yfinance_circuit_fails_fast(mock_download, agent):
+    mock_download.side_effect = ConnectionError("yfinance down")
+    for _ in range(upstream("yfinance").breaker.failure_threshold):
+        agent.analyze_ticker("AAPL")
+    mock_download.reset_mock()
+
+    result = agent.analyze_ticker("MSFT")
+
+    assert "CRITICAL ERROR FETCHING MARKET DATA" in result  # noqa: S101
+    assert "Circuit for yfinance is open" in result  # noqa: S101
+    mock_download.assert_not_called()
+
+
+@patch("yfinance.download")
+def test_empty_downloads_do_not_trip_the_yfinance_breaker(mock_download, agent):
+    mock_download.return_value = pd.DataFrame()
+    for _ in range(upstream("yfinance").breaker.failure_threshold + 1):
+        assert agent.load_market("NOSUCH", refresh=True).empty  # noqa: S101
+
+    assert upstream("yfinance").breaker.state == "closed"  # noqa: S101
+    assert mock_download.call_count == upstream("yfinance").breaker.failure_threshold + 1  # noqa: S101
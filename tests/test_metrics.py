@@ -0,0 +1,115 @@
+import contextvars
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.financial_analysis.core.cache import TTLCache
+from src.financial_analysis.core.llm import invoke_llm
+from src.financial_analysis.core.metrics import (
+    LLM_TOKENS,
+    REGISTRY,
+    SPAN_ERRORS,
+    SPAN_SECONDS,
+    Counter,
+    Histogram,
+    collect_timings,
+    timed,
+)
+
+
+def test_counter_renders_labelled_samples():
+    counter = Counter("requests_total", "Requests.", ("path",))
+    counter.inc("/a")
+    counter.inc("/a", amount=2)
+    counter.inc('say "hi"')
+
+    lines = counter.render()
+
+    assert "# TYPE requests_total counter" in lines  # noqa: S101
+    assert 'requests_total{path="/a"} 3' in lines  # noqa: S101
+    assert 'requests_total{path="say \\"hi\\""} 1' in lines  # noqa: S101
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("span",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "fetch")
+
+    lines = histogram.render()
+
+    assert 'latency_seconds_bucket{span="fetch",le="0.1"} 1' in lines  # noqa: S101
+    assert 'latency_seconds_bucket{span="fetch",le="1"} 3' in lines  # noqa: S101
+    assert 'latency_seconds_bucket{span="fetch",le="+Inf"} 4' in lines  # noqa: S101
+    assert 'latency_seconds_count{span="fetch"} 4' in lines  # noqa: S101
+    assert 'latency_seconds_sum{span="fetch"} 4.25' in lines  # noqa: S101
+
+
+def test_timed_records_spans_across_threads():
+    @timed("test_span")
+    def work() -> str:
+        return "done"
+
+    before = SPAN_SECONDS.count("test_span")
+    with collect_timings() as timings:
+        work()
+        # Like DAG nodes, a thread running in a copy of the request context is collected.
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+        worker.start()
+        worker.join()
+
+    assert SPAN_SECONDS.count("test_span") == before + 2  # noqa: S101
+    assert set(timings) == {"test_span"}  # noqa: S101
+
+
+def test_timed_counts_errors_and_reraises():
+    @timed("failing_span")
+    def fail() -> None:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        fail()
+
+    assert SPAN_ERRORS.value("failing_span") == 1  # noqa: S101
+
+
+def test_spans_outside_collection_are_not_collected():
+    @timed("unscoped_span")
+    def work() -> None:
+        return None
+
+    work()
+    with collect_timings() as timings:
+        pass
+
+    assert timings == {}  # noqa: S101
+
+
+def test_named_caches_export_hit_ratio():
+    cache: TTLCache[str] = TTLCache(ttl=60, name="test_cache")
+    cache.set("a", "value")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    text = REGISTRY.render()
+
+    assert "# TYPE alphasynth_cache_requests_total counter" in text  # noqa: S101
+    assert 'alphasynth_cache_requests_total{cache="test_cache",result="hit"} 2' in text  # noqa: S101
+    assert 'alphasynth_cache_hit_ratio{cache="test_cache"} 0.6666666666666666' in text  # noqa: S101
+
+
+def test_invoke_llm_counts_prompt_and_completion_tokens():
+    llm = MagicMock()
+    llm.model_name = "metrics-model"
+    llm.invoke.return_value.content = "ok"
+    llm.invoke.return_value.usage_metadata = {
+        "input_tokens": 120,
+        "output_tokens": 30,
+        "total_tokens": 150,
+    }
+
+    invoke_llm(llm, "prompt")
+
+    assert LLM_TOKENS.value("metrics-model", "prompt") == 120  # noqa: S101
+    assert LLM_TOKENS.value("metrics-model", "completion") == 30  # noqa: S101
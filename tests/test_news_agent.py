@@ -1,9 +1,12 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
 import pytest
 
-from src.financial_analysis.analysis.news import NewsAgent
+from src.financial_analysis.analysis.news import NewsAgent, snippet_fingerprint, split_snippets
 
 
 @pytest.fixture
@@ -84,3 +87,168 @@ def test_top_headlines_for_llm_failure(mock_invoke, mock_fetch, agent):
 
     assert "LLM analysis failed for news sentiment" in result  # noqa: S101
     assert "LLM timeout" in result  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_served_from_cache(mock_run, agent):
+    mock_run.return_value = "Apple launches new AI chip."
+
+    first = agent.fetch_live_news("Apple")
+    second = agent.fetch_live_news("apple")
+
+    assert first == second  # noqa: S101
+    assert mock_run.call_count == len(agent.queries_for("Apple"))  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_refetches_after_ttl(mock_run, agent):
+    now = [0.0]
+    agent.news_cache.clock = lambda: now[0]
+    mock_run.return_value = "Apple launches new AI chip."
+
+    agent.fetch_live_news("Apple")
+    now[0] = agent.news_cache.ttl + 1
+    agent.fetch_live_news("Apple")
+
+    assert mock_run.call_count == 2 * len(agent.queries_for("Apple"))  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_errors_are_not_cached(mock_run, agent):
+    mock_run.side_effect = Exception("Search API down")
+    agent.fetch_live_news("Apple")
+
+    mock_run.side_effect = None
+    mock_run.return_value = "Apple launches new AI chip."
+    result = agent.fetch_live_news("Apple")
+
+    assert "Apple launches new AI chip" in result  # noqa: S101
+
+
+@patch.object(NewsAgent, "fetch_live_news")
+@patch("langchain_openai.ChatOpenAI.invoke")
+def test_top_headlines_for_reuses_analysis_for_same_snippets(mock_invoke, mock_fetch, agent):
+    mock_fetch.side_effect = [
+        "Apple beats earnings.\nApple faces EU probe.",
+        "Apple faces EU probe.\nApple beats earnings.",
+    ]
+    mock_invoke.return_value.content = "### Key Themes"
+
+    first = agent.top_headlines_for("Apple")
+    second = agent.top_headlines_for("Apple")
+
+    assert first == second == "### Key Themes"  # noqa: S101
+    assert mock_invoke.call_count == 1  # noqa: S101
+
+
+@patch.object(NewsAgent, "fetch_live_news")
+@patch("langchain_openai.ChatOpenAI.invoke")
+def test_top_headlines_for_reruns_when_snippets_change(mock_invoke, mock_fetch, agent):
+    mock_fetch.side_effect = ["Apple beats earnings.", "Apple announces buyback."]
+    mock_invoke.return_value.content = "### Key Themes"
+
+    agent.top_headlines_for("Apple")
+    agent.top_headlines_for("Apple")
+
+    assert mock_invoke.call_count == 2  # noqa: S101
+
+
+def test_split_snippets_deduplicates_headlines():
+    snippets = split_snippets("Apple beats earnings. Apple  beats earnings.\nShares rise 3%.")
+
+    assert snippets == ["Apple beats earnings.", "Shares rise 3%."]  # noqa: S101
+    assert snippet_fingerprint(snippets) == snippet_fingerprint(snippets[::-1])  # noqa: S101
+
+
+def test_queries_for_includes_ticker_and_focus_topics(agent):
+    queries = agent.queries_for("Apple", ticker="AAPL")
+
+    assert any("AAPL" in q for q in queries)  # noqa: S101
+    assert any("earnings" in q for q in queries)  # noqa: S101
+    assert any("regulatory" in q for q in queries)  # noqa: S101
+    assert any("management" in q for q in queries)  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_merges_and_deduplicates_queries(mock_run, agent):
+    def fake_run(query):
+        if "earnings" in query:
+            return "Apple beats earnings. Shared headline."
+        if "regulatory" in query:
+            raise Exception("rate limited")
+        return "Shared headline."
+
+    mock_run.side_effect = fake_run
+
+    result = agent.fetch_live_news("Apple")
+
+    assert result.split("\n") == ["Shared headline.", "Apple beats earnings."]  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_drops_slow_queries(mock_run, agent):
+    release = threading.Event()
+
+    def fake_run(query):
+        if "management" in query:
+            release.wait(5)
+            return "Late headline."
+        return "Fast headline."
+
+    mock_run.side_effect = fake_run
+    agent.query_timeout = 0.2
+
+    result = agent.fetch_live_news("Apple")
+    release.set()
+
+    assert result == "Fast headline."  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_concurrent_fetches_do_not_queue_behind_each_other(mock_run, agent):
+    def fake_run(query):
+        time.sleep(0.2)
+        return f"Headline for {query.split()[0]}."
+
+    mock_run.side_effect = fake_run
+    agent.query_timeout = 1.0
+    companies = [f"Company{i}" for i in range(8)]
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(companies)) as pool:
+        results = list(pool.map(agent.fetch_live_news, companies))
+
+    assert time.monotonic() - started < 1.0  # noqa: S101
+    for company, result in zip(companies, results, strict=True):
+        assert f"Headline for {company}." in result  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_queued_searches_past_the_query_timeout_are_skipped(mock_run):
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "testkey"}, clear=True):
+        agent = NewsAgent(llm_model="gpt-4o-mini", query_timeout=0.3, search_workers=1)
+
+    def fake_run(query):
+        time.sleep(0.2)
+        return "Headline."
+
+    mock_run.side_effect = fake_run
+
+    started = time.monotonic()
+    result = agent.fetch_live_news("Apple")
+    elapsed = time.monotonic() - started
+    time.sleep(0.3)
+
+    assert result == "Headline."  # noqa: S101
+    assert elapsed < 0.5  # noqa: S101
+    assert mock_run.call_count < len(agent.queries_for("Apple"))  # noqa: S101
+
+
+@patch("langchain_community.tools.DuckDuckGoSearchRun.run")
+def test_fetch_live_news_truncates_to_token_budget(mock_run, agent):
+    mock_run.return_value = " ".join(f"Headline number {i} is here." for i in range(50))
+    agent.token_budget = 20
+
+    result = agent.fetch_live_news("Apple")
+
+    assert 0 < len(result.split("\n")) < 50  # noqa: S101
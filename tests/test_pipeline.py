@@ -0,0 +1,276 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from src.financial_analysis.analysis.market import MarketResult
+from src.financial_analysis.api.models import QueryIn
+from src.financial_analysis.api.pipeline import (
+    AnalysisPipeline,
+    StageRecord,
+    StageRecords,
+    StageStore,
+    is_failure,
+)
+from src.financial_analysis.core.deadline import DeadlineExceeded, deadline_after
+from src.financial_analysis.core.metrics import collect_timings
+
+
+@pytest.fixture
+def agents():
+    research = MagicMock()
+    research.retrieve_documents.return_value = [Document(page_content="10-K text", id="c1")]
+    research.analyze_documents.return_value = "Research analysis"
+
+    market = MagicMock()
+    market.analyze.side_effect = lambda ticker, interpret: MarketResult(
+        ticker=ticker, last_price=110.0, ma_20=100.0, as_of="2024-01-02"
+    )
+    market.interpret.return_value = "Market interpretation"
+
+    news = MagicMock()
+    news.fetch_live_news.return_value = "Apple beats earnings."
+    news.analyze_news.return_value = "News analysis"
+
+    risk = MagicMock()
+    risk.compute_risk.return_value = {"risk_score": 30, "quantitative_flag": "Neutral"}
+
+    synth = MagicMock()
+    synth.synthesize.return_value = "Recommendation: Buy"
+    return research, market, news, risk, synth
+
+
+@pytest.fixture
+def pipeline(agents, tmp_path):
+    return AnalysisPipeline(*agents, StageStore(tmp_path / "stages.db"))
+
+
+@pytest.fixture
+def query():
+    return QueryIn(query="Is it a good time to buy?", company="AAPL")
+
+
+def test_first_run_computes_every_stage(pipeline, query):
+    result = pipeline.run(query)
+
+    assert result.synthesis == "Recommendation: Buy"  # noqa: S101
+    assert result.market.text == "Market interpretation"  # noqa: S101
+    assert result.complete  # noqa: S101
+    assert not any(record.reused for record in result.stages.values())  # noqa: S101
+
+
+def test_repeat_run_reuses_all_llm_stages(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    first = pipeline.run(query)
+
+    second = pipeline.run(query)
+
+    assert second.synthesis == first.synthesis  # noqa: S101
+    assert second.input_fingerprint == first.input_fingerprint  # noqa: S101
+    for agent_method in (
+        research.analyze_documents,
+        market.interpret,
+        news.analyze_news,
+        risk.compute_risk,
+        synth.synthesize,
+    ):
+        assert agent_method.call_count == 1  # noqa: S101
+
+
+def test_news_change_only_reruns_downstream_stages(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    pipeline.run(query)
+    news.fetch_live_news.return_value = "Apple faces EU probe."
+
+    result = pipeline.run(query)
+
+    assert result.stages["research"].reused  # noqa: S101
+    assert result.stages["market_interpretation"].reused  # noqa: S101
+    assert not result.stages["news"].reused  # noqa: S101
+    assert not result.stages["risk"].reused  # noqa: S101
+    assert not result.stages["synthesis"].reused  # noqa: S101
+    assert research.analyze_documents.call_count == 1  # noqa: S101
+    assert synth.synthesize.call_count == 2  # noqa: S101
+
+
+def test_new_market_bar_reruns_interpretation(pipeline, agents, query):
+    _, market, _, _, _ = agents
+    pipeline.run(query)
+    market.analyze.side_effect = lambda ticker, interpret: MarketResult(
+        ticker=ticker, last_price=112.0, ma_20=101.0, as_of="2024-01-03"
+    )
+
+    result = pipeline.run(query)
+
+    assert not result.stages["market_interpretation"].reused  # noqa: S101
+    assert result.stages["research"].reused  # noqa: S101
+    assert market.interpret.call_count == 2  # noqa: S101
+
+
+def test_failed_stage_and_its_dependents_are_not_persisted(pipeline, agents, query):
+    research, _, _, risk, synth = agents
+    research.analyze_documents.return_value = "Final analysis failed: LLM down"
+
+    failed = pipeline.run(query)
+    research.analyze_documents.return_value = "Research analysis"
+    recovered = pipeline.run(query)
+
+    assert not failed.complete  # noqa: S101
+    assert not recovered.stages["risk"].reused  # noqa: S101
+    assert not recovered.stages["synthesis"].reused  # noqa: S101
+    assert recovered.complete  # noqa: S101
+
+
+def test_skipping_market_interpretation(pipeline, agents, query):
+    _, market, _, _, _ = agents
+
+    result = pipeline.run(query.model_copy(update={"interpret_market": False}))
+
+    market.interpret.assert_not_called()
+    assert "market_interpretation" not in result.stages  # noqa: S101
+
+
+def test_is_failure():
+    assert is_failure("LLM analysis failed for news sentiment.")  # noqa: S101
+    assert is_failure({"risk_score": 75, "error": "boom"})  # noqa: S101
+    assert not is_failure("Recommendation: Hold")  # noqa: S101
+
+
+def test_gatherers_run_concurrently_and_timings_are_recorded(pipeline, agents, query):
+    research, market, news, _, _ = agents
+    barrier = threading.Barrier(3, timeout=2)
+
+    def wait_then(value):
+        def call(*args, **kwargs):
+            barrier.wait()
+            return value
+
+        return call
+
+    research.retrieve_documents.side_effect = wait_then([Document(page_content="x", id="c1")])
+    news.fetch_live_news.side_effect = wait_then("Apple beats earnings.")
+    market_result = MarketResult(ticker="AAPL", last_price=1.0, ma_20=1.0)
+    market.analyze.side_effect = wait_then(market_result)
+
+    result = pipeline.run(query)
+
+    assert result.synthesis == "Recommendation: Buy"  # noqa: S101
+    assert set(result.timings) == {"research", "market", "news", "risk", "synthesis"}  # noqa: S101
+
+
+def test_failing_gatherer_still_synthesizes_partial_result(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    research.retrieve_documents.side_effect = RuntimeError("index missing")
+
+    result = pipeline.run(query)
+
+    assert result.synthesis == "Recommendation: Buy"  # noqa: S101
+    assert "index missing" in result.missing["research"]  # noqa: S101
+    assert not result.complete  # noqa: S101
+    assert "unavailable" in synth.synthesize.call_args.args[1]  # noqa: S101
+    assert not result.stages["risk"].ok  # noqa: S101
+
+
+def test_partial_result_is_not_persisted(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    research.retrieve_documents.side_effect = RuntimeError("index missing")
+    pipeline.run(query)
+    research.retrieve_documents.side_effect = None
+
+    result = pipeline.run(query)
+
+    assert result.complete  # noqa: S101
+    assert synth.synthesize.call_count == 2  # noqa: S101
+
+
+def test_slow_gatherer_is_dropped_at_its_deadline_share(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    release = threading.Event()
+    news.fetch_live_news.side_effect = lambda *args, **kwargs: release.wait(5) and ""
+
+    with deadline_after(0.5):
+        result = pipeline.run(query)
+    release.set()
+
+    assert "timed out" in result.missing["news"]  # noqa: S101
+    assert result.synthesis == "Recommendation: Buy"  # noqa: S101
+
+
+def test_missing_synthesis_raises_deadline_exceeded(pipeline, agents, query):
+    research, market, news, risk, synth = agents
+    release = threading.Event()
+    synth.synthesize.side_effect = lambda *args: release.wait(5) and ""
+
+    with deadline_after(0.3), pytest.raises(DeadlineExceeded):
+        pipeline.run(query)
+    release.set()
+
+
+def test_on_stage_receives_stage_outputs(pipeline, query):
+    outputs = {}
+
+    pipeline.run(query, on_stage=outputs.__setitem__)
+
+    assert outputs["market"] == "Market interpretation"  # noqa: S101
+    assert outputs["research"] == "Research analysis"  # noqa: S101
+    assert outputs["synthesis"] == "Recommendation: Buy"  # noqa: S101
+
+
+def test_run_reports_stage_timings_to_the_collector(pipeline, query):
+    with collect_timings() as timings:
+        pipeline.run(query)
+
+    assert {"stage.research", "stage.synthesis"} <= set(timings)  # noqa: S101
+
+
+def test_abandoned_gatherer_cannot_change_the_stage_records(agents, tmp_path, query):
+    _, _, news, _, synth = agents
+    release, finished = threading.Event(), threading.Event()
+
+    def slow_analysis(*args):
+        release.wait(2)
+        finished.set()
+        return "News analysis"
+
+    news.analyze_news.side_effect = slow_analysis
+    pipeline = AnalysisPipeline(*agents, StageStore(tmp_path / "stages.db"), node_timeout=0.2)
+
+    result = pipeline.run(query)
+    release.set()
+    finished.wait(2)
+
+    assert "news" in result.missing  # noqa: S101
+    assert "news" not in result.stages  # noqa: S101
+    assert not result.complete  # noqa: S101
+
+
+def test_closed_nodes_cannot_write_stage_records():
+    stages = StageRecords()
+    record = StageRecord(fingerprint="f", reused=False, ok=True)
+    stages.set("news_fetch", record)
+    snapshot = stages.snapshot()
+
+    stages.close("news")
+    stages.set("news", record)
+    stages.set("risk", record)
+
+    assert list(snapshot) == ["news_fetch"]  # noqa: S101
+    assert list(stages.snapshot()) == ["news_fetch", "risk"]  # noqa: S101
+
+
+def test_stage_store_deletes_expired_rows(tmp_path):
+    now = [0.0]
+    store = StageStore(tmp_path / "stages.db", max_age=10, clock=lambda: now[0], prune_every=2)
+    store.put("risk", "old", {"risk_score": 1})
+    now[0] = 11
+    store.put("risk", "new", {"risk_score": 2})
+
+    assert len(store) == 1  # noqa: S101
+    assert store.get("risk", "new") == {"risk_score": 2}  # noqa: S101
+
+    store.put("risk", "newer", {"risk_score": 3})
+    now[0] = 30
+    reopened = StageStore(tmp_path / "stages.db", max_age=10, clock=lambda: now[0])
+
+    assert len(reopened) == 0  # noqa: S101
@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+from src.financial_analysis.api.prefetch import WatchlistPrefetcher, parse_watchlist
+from src.financial_analysis.core.cache import TTLCache
+
+
+@pytest.fixture
+def market_agent():
+    agent = MagicMock()
+    agent.load_market.return_value = pd.DataFrame({"close": [1.0]})
+    return agent
+
+
+@pytest.fixture
+def news_agent():
+    agent = MagicMock()
+    agent.fetch_live_news.return_value = "Apple beats earnings."
+    return agent
+
+
+def test_parse_watchlist():
+    assert parse_watchlist(["aapl:Apple", " MSFT ", ""]) == [  # noqa: S101
+        ("AAPL", "Apple"),
+        ("MSFT", None),
+    ]
+
+
+def test_refresh_ticker_warms_every_agent_cache(market_agent, news_agent):
+    research_agent = MagicMock()
+    prefetcher = WatchlistPrefetcher(
+        ["AAPL:Apple"],
+        market_agent,
+        news_agent,
+        research_agent=research_agent,
+        research_queries=["{company} risk factors"],
+    )
+
+    prefetcher.run_once()
+
+    market_agent.load_market.assert_called_once_with("AAPL", period="60d", refresh=True)
+    market_agent.fetch_fundamentals.assert_called_once_with("AAPL", refresh=True)
+    news_agent.fetch_live_news.assert_called_once_with("Apple", ticker="AAPL", refresh=True)
+    news_agent.top_headlines_for.assert_called_once_with("Apple", ticker="AAPL")
+    research_agent.retrieve_documents.assert_called_once_with("Apple risk factors", k=4)
+
+
+def test_fundamentals_status_does_not_count_as_a_cache_lookup(market_agent, news_agent):
+    market_agent.fundamentals_cache = TTLCache(ttl=60)
+    market_agent.fundamentals_cache.set("AAPL", {"trailingPE": 30.0})
+    prefetcher = WatchlistPrefetcher(["AAPL"], market_agent, news_agent)
+
+    results = prefetcher.run_once()
+
+    assert results["AAPL"]["fundamentals"] is True  # noqa: S101
+    assert market_agent.fundamentals_cache.hits == 0  # noqa: S101
+    assert market_agent.fundamentals_cache.misses == 0  # noqa: S101
+
+
+def test_news_analysis_skipped_when_fetch_fails(market_agent, news_agent):
+    news_agent.fetch_live_news.return_value = "Error fetching news with DuckDuckGo: down"
+    prefetcher = WatchlistPrefetcher(["AAPL"], market_agent, news_agent)
+
+    results = prefetcher.run_once()
+
+    assert results["AAPL"]["news"] is False  # noqa: S101
+    news_agent.top_headlines_for.assert_not_called()
+
+
+def test_run_once_bounds_concurrency_and_isolates_failures(market_agent, news_agent):
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def slow_load(ticker, period, refresh):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        if ticker == "BAD":
+            raise RuntimeError("boom")
+        return pd.DataFrame({"close": [1.0]})
+
+    market_agent.load_market.side_effect = slow_load
+    tickers = [f"T{i}" for i in range(8)] + ["BAD"]
+    prefetcher = WatchlistPrefetcher(tickers, market_agent, news_agent, max_concurrency=3)
+
+    results = prefetcher.run_once()
+
+    assert in_flight[1] <= 3  # noqa: S101
+    assert results["BAD"]["ok"] is False  # noqa: S101
+    assert all(results[t]["ok"] for t in tickers[:-1])  # noqa: S101
+
+
+def test_start_and_stop_background_loop(market_agent, news_agent):
+    prefetcher = WatchlistPrefetcher(["AAPL"], market_agent, news_agent, interval=60)
+
+    prefetcher.start()
+    deadline = time.monotonic() + 2
+    while not prefetcher.last_run and time.monotonic() < deadline:
+        time.sleep(0.01)
+    prefetcher.stop(timeout=2)
+
+    assert prefetcher.last_run["tickers"]["AAPL"]["ok"] is True  # noqa: S101
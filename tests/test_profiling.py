@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from src.financial_analysis.api.dag import DagExecutor, Node
+from src.financial_analysis.core.metrics import timed
+from src.financial_analysis.core.profiling import (
+    ProfilerBusy,
+    ProfileStore,
+    RequestProfile,
+    profile_request,
+    profile_span,
+)
+
+
+@timed("busy_work")
+def busy_work() -> int:
+    return sum(i * i for i in range(200_000))
+
+
+@timed("network_wait")
+def network_wait() -> None:
+    time.sleep(0.1)
+
+
+def test_profile_span_is_a_no_op_outside_a_profiled_request():
+    with profile_span("anything"):
+        busy_work()
+
+
+def test_profile_separates_cpu_from_wait_across_dag_threads():
+    dag = DagExecutor(
+        [
+            Node("compute", busy_work),
+            Node("fetch", network_wait),
+        ]
+    )
+
+    with profile_request() as profile:
+        dag.run()
+
+    wait = profile.spans["stage.fetch"].as_dict()
+    assert wait["wait_seconds"] >= 0.09  # noqa: S101
+    assert wait["cpu_seconds"] < 0.05  # noqa: S101
+    assert profile.spans["busy_work"].cpu > 0  # noqa: S101
+    functions = [row["function"] for row in profile.top_functions(limit=100)]
+    assert any("busy_work" in function for function in functions)  # noqa: S101
+
+
+def test_nested_spans_are_timed_without_a_second_profiler():
+    with profile_request() as profile, profile_span("outer"):
+        busy_work()
+
+    assert set(profile.spans) == {"request", "outer", "busy_work"}  # noqa: S101
+
+
+def test_only_one_request_is_profiled_at_a_time():
+    with profile_request(), pytest.raises(ProfilerBusy), profile_request():
+        pass
+
+
+def test_store_keeps_the_most_recent_profiles(tmp_path):
+    store = ProfileStore(tmp_path, keep=2)
+    saved = []
+    for _ in range(3):
+        with profile_request() as profile:
+            busy_work()
+        store.save(profile)
+        saved.append(profile.id)
+        time.sleep(0.01)
+
+    assert store.summary(saved[0]) is None  # noqa: S101
+    assert store.summary(saved[2])["spans"]["busy_work"]["calls"] == 1  # noqa: S101
+    assert store.stats_path(saved[2]) is not None  # noqa: S101
+
+
+def test_store_rejects_ids_that_are_not_plain_names(tmp_path):
+    store = ProfileStore(tmp_path)
+    store.save(RequestProfile(id="abc"))
+
+    assert store.summary("../abc") is None  # noqa: S101
+    assert store.summary("abc") is not None  # noqa: S101
@@ -0,0 +1,209 @@
+import threading
+
+import pytest
+
+from src.financial_analysis.api.models import QueryIn
+from src.financial_analysis.api.reports import (
+    MaterializedReports,
+    Report,
+    ReportStore,
+    report_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReportStore(tmp_path / "reports.db")
+
+
+@pytest.fixture
+def query():
+    return QueryIn(query="Is it a good time to buy?", company="AAPL")
+
+
+def make_compute(clock, calls):
+    def compute(q):
+        calls.append(q)
+        return Report(
+            key=report_key(q),
+            company=q.company,
+            query=q.query,
+            synthesis=f"Report #{len(calls)}",
+            input_fingerprint="abc",
+            generated_at=clock(),
+        )
+
+    return compute
+
+
+def test_report_key_normalizes_query():
+    a = QueryIn(query="Is it  a good time?", company="aapl")
+    b = QueryIn(query="is it a good time?", company="AAPL")
+
+    assert report_key(a) == report_key(b)  # noqa: S101
+    assert report_key(a) != report_key(b.model_copy(update={"k": 8}))  # noqa: S101
+
+
+def test_store_round_trip_counts_hits_and_persists(tmp_path, store):
+    store.put(
+        Report(
+            key="k",
+            company="AAPL",
+            query="q",
+            synthesis="s",
+            input_fingerprint="f",
+            generated_at=1.0,
+        )
+    )
+    store.get("k")
+
+    reopened = ReportStore(tmp_path / "reports.db")
+    report = reopened.get("k")
+
+    assert report.synthesis == "s"  # noqa: S101
+    # The request that computed the report, then two lookups.
+    assert report.hits == 3  # noqa: S101
+
+
+def test_store_evicts_least_requested(store):
+    store.max_reports = 2
+    for key in ("a", "b"):
+        store.put(
+            Report(
+                key=key,
+                company="X",
+                query="q",
+                synthesis=key,
+                input_fingerprint="f",
+                generated_at=1.0,
+            )
+        )
+    store.get("a")
+    store.put(
+        Report(
+            key="c", company="X", query="q", synthesis="c", input_fingerprint="f", generated_at=2.0
+        )
+    )
+
+    assert len(store) == 2  # noqa: S101
+    assert store.get("b") is None  # noqa: S101
+    assert store.most_requested(1)[0].key == "a"  # noqa: S101
+
+
+def test_new_hot_report_survives_a_store_full_of_requested_ones(tmp_path, clock):
+    store = ReportStore(tmp_path / "reports.db", max_reports=10, hit_half_life=3600, clock=clock)
+
+    def put(key):
+        store.put(
+            Report(
+                key=key,
+                company="X",
+                query="q",
+                synthesis=key,
+                input_fingerprint="f",
+                generated_at=clock(),
+            )
+        )
+
+    for i in range(10):
+        put(f"old-{i}")
+        for _ in range(5):
+            store.get(f"old-{i}")
+    clock.now += 4 * 3600
+
+    put("hot")
+    assert store.get("hot") is not None  # noqa: S101
+    for _ in range(3):
+        store.get("hot")
+    for i in range(5):
+        put(f"new-{i}")
+
+    assert len(store) == 10  # noqa: S101
+    assert store.get("hot") is not None  # noqa: S101
+    assert store.most_requested(1)[0].key == "hot"  # noqa: S101
+
+
+def test_fresh_report_served_without_recompute(store, clock, query):
+    calls = []
+    reports = MaterializedReports(store, make_compute(clock, calls), fresh_for=60, clock=clock)
+
+    first, _ = reports.serve(query)
+    clock.now += 30
+    second, stale = reports.serve(query)
+
+    assert second.synthesis == first.synthesis  # noqa: S101
+    assert stale is False  # noqa: S101
+    assert len(calls) == 1  # noqa: S101
+
+
+def test_stale_report_served_and_refreshed_in_background(store, clock, query):
+    calls = []
+    release = threading.Event()
+    compute = make_compute(clock, calls)
+
+    def slow_compute(q):
+        if calls:
+            release.wait(5)
+        return compute(q)
+
+    reports = MaterializedReports(store, slow_compute, fresh_for=60, clock=clock)
+    reports.serve(query)
+    clock.now += 120
+
+    served, stale = reports.serve(query)
+    scheduled_again = reports.refresh_in_background(query)
+    release.set()
+    reports.executor.shutdown(wait=True)
+
+    assert (served.synthesis, stale) == ("Report #1", True)  # noqa: S101
+    assert scheduled_again is False  # noqa: S101
+    assert store.get(report_key(query)).synthesis == "Report #2"  # noqa: S101
+
+
+def test_too_old_or_disallowed_stale_reports_recompute_inline(store, clock, query):
+    calls = []
+    reports = MaterializedReports(
+        store, make_compute(clock, calls), fresh_for=60, max_stale=600, clock=clock
+    )
+    reports.serve(query)
+
+    clock.now += 120
+    no_stale, stale = reports.serve(query.model_copy(update={"allow_stale": False}))
+    clock.now += 1000
+    expired, _ = reports.serve(query)
+
+    assert (no_stale.synthesis, stale) == ("Report #2", False)  # noqa: S101
+    assert expired.synthesis == "Report #3"  # noqa: S101
+
+
+def test_incomplete_reports_are_not_materialized(store, clock, query):
+    reports = MaterializedReports(
+        store,
+        lambda q: Report(
+            key=report_key(q),
+            company="AAPL",
+            query=q.query,
+            synthesis="x",
+            input_fingerprint="f",
+            generated_at=clock(),
+            complete=False,
+        ),
+        clock=clock,
+    )
+
+    reports.serve(query)
+
+    assert len(store) == 0  # noqa: S101
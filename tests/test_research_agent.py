@@ -35,9 +35,9 @@ def mock_faiss():
 # -------------------------------------------------------------------
 
 
-@patch("src.financial_analysis.analysis.research.FAISS.load_local")
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_research_agent_initialization_success(
     mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss
 ):
@@ -53,11 +53,11 @@ def test_research_agent_initialization_success(
 
 
 @patch(
-    "src.financial_analysis.analysis.research.FAISS.load_local",
+    "langchain_community.vectorstores.FAISS.load_local",
     side_effect=Exception("Missing index"),
 )
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_research_agent_init_fails_if_vectorstore_missing(
     mock_embeddings, mock_chatopenai, mock_faiss_load
 ):
@@ -71,9 +71,9 @@ def test_research_agent_init_fails_if_vectorstore_missing(
 # -------------------------------------------------------------------
 
 
-@patch("src.financial_analysis.analysis.research.FAISS.load_local")
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_retrieve_documents(mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss):
     mock_faiss_load.return_value = mock_faiss
     agent = ResearchAgent()
@@ -85,14 +85,30 @@ def test_retrieve_documents(mock_embeddings, mock_chatopenai, mock_faiss_load, m
     mock_faiss.similarity_search.assert_called_once_with("revenue risk", k=1)
 
 
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
+def test_retrieve_documents_reuses_cached_results(
+    mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss
+):
+    mock_faiss_load.return_value = mock_faiss
+    agent = ResearchAgent()
+
+    agent.retrieve_documents("revenue risk", k=1)
+    results = agent.retrieve_documents("revenue risk", k=1)
+
+    assert len(results) == 1  # noqa: S101
+    mock_faiss.similarity_search.assert_called_once_with("revenue risk", k=1)
+
+
 # -------------------------------------------------------------------
 # SUMMARIZATION TESTS
 # -------------------------------------------------------------------
 
 
-@patch("src.financial_analysis.analysis.research.FAISS.load_local")
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_summarize_chunk(mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss):
     mock_faiss_load.return_value = mock_faiss
 
@@ -113,9 +129,9 @@ def test_summarize_chunk(mock_embeddings, mock_chatopenai, mock_faiss_load, mock
 # -------------------------------------------------------------------
 
 
-@patch("src.financial_analysis.analysis.research.FAISS.load_local")
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_analyze_happy_path(mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss):
     mock_faiss_load.return_value = mock_faiss
 
@@ -131,9 +147,9 @@ def test_analyze_happy_path(mock_embeddings, mock_chatopenai, mock_faiss_load, m
     assert mock_llm.invoke.called  # noqa: S101
 
 
-@patch("src.financial_analysis.analysis.research.FAISS.load_local")
-@patch("src.financial_analysis.analysis.research.ChatOpenAI")
-@patch("src.financial_analysis.analysis.research.OpenAIEmbeddings")
+@patch("langchain_community.vectorstores.FAISS.load_local")
+@patch("langchain_openai.ChatOpenAI")
+@patch("langchain_openai.OpenAIEmbeddings")
 def test_analyze_llm_failure_returns_fallback(
     mock_embeddings, mock_chatopenai, mock_faiss_load, mock_faiss
 ):
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from src.financial_analysis.core.deadline import DeadlineExceeded, deadline_after
+from src.financial_analysis.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    Upstream,
+    upstream,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise ConnectionError("upstream down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    guard = Upstream("test", breaker=CircuitBreaker(failure_threshold=2))
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        failing()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            guard.call(flaky)
+
+    with pytest.raises(CircuitOpenError):
+        guard.call(flaky)
+    assert len(calls) == 2  # noqa: S101
+    assert guard.breaker.state == "open"  # noqa: S101
+
+
+def test_breaker_lets_one_trial_through_after_reset_period():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()  # noqa: S101
+
+    clock.now = 31
+    assert breaker.state == "half_open"  # noqa: S101
+    assert breaker.allow()  # noqa: S101
+    assert not breaker.allow()  # noqa: S101
+
+    breaker.record_success()
+    assert breaker.state == "closed"  # noqa: S101
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=30, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 31
+    assert breaker.allow()  # noqa: S101
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"  # noqa: S101
+
+
+def test_trial_cut_short_by_the_deadline_is_released():
+    clock = FakeClock()
+    guard = Upstream("test", breaker=CircuitBreaker(failure_threshold=1, clock=clock))
+    with pytest.raises(ConnectionError):
+        guard.call(failing)
+    clock.now = 31
+    release = threading.Event()
+
+    with deadline_after(0.05), pytest.raises(DeadlineExceeded):
+        guard.call(release.wait, 2)
+    release.set()
+
+    assert guard.breaker.state == "half_open"  # noqa: S101
+    assert guard.call(lambda: "ok") == "ok"  # noqa: S101
+    assert guard.breaker.state == "closed"  # noqa: S101
+
+
+def test_short_deadline_callers_leave_the_breaker_closed():
+    guard = Upstream("test", breaker=CircuitBreaker(failure_threshold=1))
+    release = threading.Event()
+
+    for _ in range(3):
+        with deadline_after(0.02), pytest.raises(DeadlineExceeded):
+            guard.call(release.wait, 2)
+    with deadline_after(0.02), pytest.raises(DeadlineExceeded):
+        guard.call(lambda: (time.sleep(0.05), failing()))
+    release.set()
+
+    assert guard.breaker.state == "closed"  # noqa: S101
+    assert guard.breaker.failures == 0  # noqa: S101
+
+
+def test_success_resets_the_failure_count():
+    guard = Upstream("test", breaker=CircuitBreaker(failure_threshold=2))
+    with pytest.raises(ConnectionError):
+        guard.call(failing)
+    guard.call(lambda: "ok")
+    with pytest.raises(ConnectionError):
+        guard.call(failing)
+
+    assert guard.breaker.state == "closed"  # noqa: S101
+
+
+def test_latency_percentile_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(0.1)
+    tracker.record(0.2)
+    assert tracker.percentile(0.5) is None  # noqa: S101
+
+    tracker.record(0.3)
+
+    assert tracker.percentile(0.5) == 0.2  # noqa: S101
+
+
+def test_slow_call_is_hedged_and_fastest_answer_wins():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(0.05)
+    guard = Upstream("test", latencies=tracker, hedge_percentile=0.95)
+    release = threading.Event()
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(2)
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    result = guard.call(call)
+    release.set()
+
+    assert result == "fast"  # noqa: S101
+    assert guard.hedges == 1  # noqa: S101
+    assert time.monotonic() - started < 1  # noqa: S101
+
+
+def test_fast_call_is_not_hedged():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(1.0)
+    guard = Upstream("test", latencies=tracker, hedge_percentile=0.95)
+
+    assert guard.call(lambda: "ok") == "ok"  # noqa: S101
+    assert guard.hedges == 0  # noqa: S101
+
+
+def test_registry_shares_one_guard_per_upstream():
+    assert upstream("openai") is upstream("openai")  # noqa: S101
+    assert upstream("openai").hedge_percentile is None  # noqa: S101
+    assert upstream("yfinance").hedge_percentile == 0.95  # noqa: S101
@@ -3,7 +3,9 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from src.financial_analysis.analysis.market import MarketResult
 from src.financial_analysis.analysis.risk import RiskAgent
+from src.financial_analysis.core.metrics import RISK_ASSESSMENTS
 
 
 @pytest.fixture
@@ -86,18 +88,55 @@ def test_compute_risk_with_extra_text(set_openai_key, valid_inputs, mock_llm_wit
     assert result["quantitative_flag"] == "Neutral"  # noqa: S101
 
 
-def test_compute_risk_invalid_json_returns_fallback(
-    set_openai_key, valid_inputs, mock_llm_invalid_json
+def test_compute_risk_invalid_json_returns_error_without_score(
+    set_openai_key, valid_inputs, mock_llm_invalid_json, caplog
 ):
     agent = RiskAgent()
     agent.llm = mock_llm_invalid_json
+    invalid = RISK_ASSESSMENTS.value("invalid")
 
     result = agent.compute_risk(**valid_inputs)
 
-    assert result["risk_score"] == 75  # noqa: S101
+    assert result["risk_score"] is None  # noqa: S101
+    assert result["risk_drivers"] == []  # noqa: S101
     assert result["confidence_level"] == "Low"  # noqa: S101
     assert result["quantitative_flag"] == "Error"  # noqa: S101
     assert "error" in result  # noqa: S101
+    assert mock_llm_invalid_json.invoke.call_count == 2  # noqa: S101
+    assert RISK_ASSESSMENTS.value("invalid") == invalid + 1  # noqa: S101
+    assert any(  # noqa: S101
+        r.levelname == "ERROR" and r.name.endswith("analysis.risk") for r in caplog.records
+    )
+
+
+def test_answer_is_bound_to_the_assessment_schema(set_openai_key, valid_inputs, mock_llm_success):
+    agent = RiskAgent()
+    agent.llm = mock_llm_success
+
+    agent.compute_risk(**valid_inputs)
+
+    response_format = mock_llm_success.invoke.call_args.kwargs["response_format"]
+    assert response_format["json_schema"]["name"] == "RiskAssessment"  # noqa: S101
+    assert response_format["json_schema"]["strict"]  # noqa: S101
+    prompt = mock_llm_success.invoke.call_args[0][0][0].content
+    assert '"properties"' not in prompt  # noqa: S101
+
+
+def test_invalid_assessment_is_repaired_once(set_openai_key, valid_inputs, mock_llm_success):
+    valid = mock_llm_success.invoke.return_value
+    invalid = MagicMock(content=json.dumps({"risk_score": 150, "risk_drivers": ["Debt"]}))
+    agent = RiskAgent()
+    agent.llm = MagicMock()
+    agent.llm.invoke.side_effect = [invalid, valid]
+    repaired = RISK_ASSESSMENTS.value("repaired")
+
+    result = agent.compute_risk(**valid_inputs)
+
+    assert result["risk_score"] == 35  # noqa: S101
+    repair_prompt = agent.llm.invoke.call_args[0][0][0].content
+    assert "risk_score" in repair_prompt  # noqa: S101
+    assert "less than or equal to 100" in repair_prompt  # noqa: S101
+    assert RISK_ASSESSMENTS.value("repaired") == repaired + 1  # noqa: S101
 
 
 def test_schema_validation_failure_returns_fallback(set_openai_key, valid_inputs):
@@ -124,3 +163,31 @@ def test_missing_openai_key_raises_error(monkeypatch):
 
     with pytest.raises(OSError):  # noqa: PT011
         RiskAgent()
+
+
+def test_compute_risk_uses_deterministic_market_flag(
+    set_openai_key, valid_inputs, mock_llm_success
+):
+    agent = RiskAgent()
+    agent.llm = mock_llm_success
+    market = MarketResult(ticker="AAPL", last_price=90.0, ma_20=100.0, ret_5d=-0.02)
+
+    result = agent.compute_risk(**valid_inputs, market=market)
+
+    assert result["quantitative_flag"] == "Price_Below_MA_Bearish"  # noqa: S101
+    assert result["market_features"]["price_vs_ma_20"] == pytest.approx(-0.1)  # noqa: S101
+    prompt = mock_llm_success.invoke.call_args[0][0][0].content
+    assert "Use exactly 'Price_Below_MA_Bearish'" in prompt  # noqa: S101
+
+
+def test_fallback_keeps_deterministic_market_flag(
+    set_openai_key, valid_inputs, mock_llm_invalid_json
+):
+    agent = RiskAgent()
+    agent.llm = mock_llm_invalid_json
+    market = MarketResult(ticker="AAPL", last_price=110.0, ma_20=100.0)
+
+    result = agent.compute_risk(**valid_inputs, market=market)
+
+    assert result["quantitative_flag"] == "Price_Above_MA_Bullish"  # noqa: S101
+    assert "error" in result  # noqa: S101
@@ -0,0 +1,145 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.financial_analysis.core.deadline import DeadlineExceeded, deadline_after
+from src.financial_analysis.core.llm import invoke_llm
+from src.financial_analysis.core.scheduler import (
+    LLMScheduler,
+    Priority,
+    TokenBucket,
+    current_priority,
+    get_scheduler,
+    priority_scope,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)
+    bucket.take(60)
+
+    assert bucket.wait_time(30) == pytest.approx(30)  # noqa: S101
+    clock.now = 30
+    assert bucket.wait_time(30) == 0  # noqa: S101
+
+
+def test_priority_scope_is_restored():
+    assert current_priority() == Priority.BATCH  # noqa: S101
+    with priority_scope(Priority.INTERACTIVE):
+        assert current_priority() == Priority.INTERACTIVE  # noqa: S101
+    assert current_priority() == Priority.BATCH  # noqa: S101
+
+
+def run_queued(scheduler, priority, order, started):
+    def target():
+        started.release()
+        with scheduler.slot("gpt-4o", 10, priority=priority):
+            order.append(priority)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_interactive_calls_are_admitted_before_queued_prefetch():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+    started = threading.Semaphore(0)
+
+    with scheduler.slot("gpt-4o", 10):
+        prefetch = run_queued(scheduler, Priority.PREFETCH, order, started)
+        started.acquire()
+        time.sleep(0.05)
+        interactive = run_queued(scheduler, Priority.INTERACTIVE, order, started)
+        started.acquire()
+        time.sleep(0.05)
+        assert scheduler.stats()["queue_depth"]["prefetch"] == 1  # noqa: S101
+        assert scheduler.stats()["queue_depth"]["interactive"] == 1  # noqa: S101
+
+    prefetch.join(2)
+    interactive.join(2)
+    assert order == [Priority.INTERACTIVE, Priority.PREFETCH]  # noqa: S101
+
+
+def test_requests_per_minute_budget_delays_calls():
+    scheduler = LLMScheduler(rpm={"gpt-4o": 600})
+    with scheduler.slot("gpt-4o", 10):
+        pass
+    for _ in range(599):
+        scheduler._rpm["gpt-4o"].take(1)
+
+    started = time.monotonic()
+    with scheduler.slot("gpt-4o", 10):
+        pass
+
+    assert time.monotonic() - started >= 0.05  # noqa: S101
+    assert scheduler.stats()["max_wait_seconds"]["batch"] >= 0.05  # noqa: S101
+
+
+def test_exhausted_model_does_not_block_other_models():
+    scheduler = LLMScheduler(tpm={"gpt-4o": 100})
+    scheduler._tpm["gpt-4o"].take(100)
+    stop = threading.Event()
+
+    def exhausted_call():
+        with (
+            deadline_after(0.5),
+            pytest.raises(DeadlineExceeded),
+            scheduler.slot("gpt-4o", 50),
+        ):
+            stop.wait()
+
+    blocked = threading.Thread(target=exhausted_call)
+    blocked.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    with scheduler.slot("gpt-3.5-turbo", 50):
+        pass
+
+    assert time.monotonic() - started < 0.3  # noqa: S101
+    assert scheduler.stats()["queue_depth"]["batch"] == 1  # noqa: S101
+    blocked.join(2)
+
+
+def test_queued_call_gives_up_at_the_deadline():
+    scheduler = LLMScheduler(rpm={"gpt-4o": 1})
+    with scheduler.slot("gpt-4o", 10):
+        pass
+
+    with deadline_after(0.1), pytest.raises(DeadlineExceeded), scheduler.slot("gpt-4o", 10):
+        pass
+
+
+def test_settle_charges_actual_token_usage():
+    clock = FakeClock()
+    scheduler = LLMScheduler(tpm={"gpt-4o": 1000}, clock=clock)
+    with scheduler.slot("gpt-4o", 100):
+        pass
+
+    scheduler.settle("gpt-4o", estimated=100, actual=700)
+
+    assert scheduler._tpm["gpt-4o"].level == pytest.approx(300)  # noqa: S101
+
+
+def test_invoke_llm_goes_through_the_scheduler():
+    llm = MagicMock()
+    llm.model_name = "gpt-4o"
+    llm.invoke.return_value.content = "ok"
+    llm.invoke.return_value.usage_metadata = {"total_tokens": 1200}
+
+    with priority_scope(Priority.INTERACTIVE):
+        assert invoke_llm(llm, "prompt") == "ok"  # noqa: S101
+
+    assert get_scheduler().stats()["admitted"]["interactive"] == 1  # noqa: S101
@@ -0,0 +1,89 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+from src.financial_analysis.analysis.research import ResearchAgent
+from src.financial_analysis.rag.sidecar import RetrievalClient, RetrievalServer
+
+
+@pytest.fixture
+def vectorstore():
+    store = MagicMock()
+    store.embeddings.embed_documents.side_effect = lambda queries: [
+        [float(len(q))] for q in queries
+    ]
+    store.similarity_search_by_vector.side_effect = lambda vector, k: [
+        Document(id=f"c{i}", page_content=f"chunk {i}", metadata={"len": vector[0]})
+        for i in range(k)
+    ]
+    return store
+
+
+@pytest.fixture
+def server(vectorstore, tmp_path):
+    server = RetrievalServer(vectorstore, tmp_path / "retrieval.sock", batch_window=0.2)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_client_returns_documents_from_sidecar(server):
+    client = RetrievalClient(server.socket_path)
+
+    documents = client.similarity_search("revenue risk", k=2)
+
+    assert [d.id for d in documents] == ["c0", "c1"]  # noqa: S101
+    assert documents[0].metadata == {"len": 12.0}  # noqa: S101
+
+
+def test_concurrent_queries_share_one_embedding_call(server, vectorstore):
+    client = RetrievalClient(server.socket_path)
+    queries = ["risk", "risk", "margins", "debt"]
+    results = {}
+
+    def search(i, query):
+        results[i] = client.similarity_search(query, k=1)
+
+    threads = [threading.Thread(target=search, args=item) for item in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4  # noqa: S101
+    assert server.batches == 1  # noqa: S101
+    vectorstore.embeddings.embed_documents.assert_called_once()
+    assert sorted(vectorstore.embeddings.embed_documents.call_args.args[0]) == [  # noqa: S101
+        "debt",
+        "margins",
+        "risk",
+    ]
+
+
+def test_sidecar_errors_are_raised_to_the_caller(server, vectorstore):
+    vectorstore.embeddings.embed_documents.side_effect = RuntimeError("embeddings down")
+    client = RetrievalClient(server.socket_path)
+
+    with pytest.raises(RuntimeError, match="embeddings down"):
+        client.similarity_search("risk", k=1)
+
+
+def test_client_reconnects_after_sidecar_restart(server, vectorstore):
+    client = RetrievalClient(server.socket_path)
+    client.similarity_search("risk", k=1)
+    server.stop()
+    server.start()
+
+    assert len(client.similarity_search("risk", k=1)) == 1  # noqa: S101
+
+
+@patch("langchain_community.vectorstores.FAISS.load_local")
+def test_research_agent_uses_sidecar_instead_of_loading_index(mock_load, server, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    agent = ResearchAgent(retrieval_socket=server.socket_path)
+
+    assert len(agent.retrieve_documents("risk", k=3)) == 3  # noqa: S101
+    mock_load.assert_not_called()